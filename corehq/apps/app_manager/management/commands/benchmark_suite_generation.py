@@ -0,0 +1,81 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import time
+
+from django.core.management import BaseCommand
+from six.moves import range
+
+from corehq.apps.app_manager.dbaccessors import get_app
+from corehq.apps.app_manager.models import BuildProfile, DetailColumn
+from corehq.apps.app_manager.tests.app_factory import AppFactory
+
+
+class Command(BaseCommand):
+    """Time suite.xml generation for the default build and every build
+    profile of an app, with and without reusing the elements generated for
+    each module between suites.
+
+    By default a large app with long case lists is generated. Pass
+    --domain and --app-id to use an existing app instead.
+
+    Usage: ./manage.py benchmark_suite_generation --modules 150 --columns 40 --profiles 4
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--domain')
+        parser.add_argument('--app-id')
+        parser.add_argument('--modules', type=int, default=100)
+        parser.add_argument('--forms', type=int, default=3)
+        parser.add_argument('--columns', type=int, default=30)
+        parser.add_argument('--profiles', type=int, default=3)
+
+    def handle(self, domain, app_id, modules, forms, columns, profiles, **options):
+        if app_id:
+            app = get_app(domain, app_id)
+        else:
+            app = _make_app(modules, forms, columns, profiles)
+        build_profile_ids = [None] + sorted(app.build_profiles)
+
+        for name, reuse_modules in [('uncached', False), ('cached', True)]:
+            app.get_suite_module_cache().clear()
+            start = time.time()
+            for build_profile_id in build_profile_ids:
+                if not reuse_modules:
+                    app.get_suite_module_cache().clear()
+                app.create_suite(build_profile_id)
+            duration = time.time() - start
+            print("{:<10} {} suites in {:.2f}s ({:.2f}s per suite)".format(
+                name, len(build_profile_ids), duration, duration / len(build_profile_ids)
+            ))
+
+
+def _make_app(num_modules, num_forms, num_columns, num_profiles):
+    factory = AppFactory(domain='benchmark-suite', build_version='2.40.0')
+    for i in range(num_modules):
+        case_type = 'case{}'.format(i)
+        module, form = factory.new_basic_module('m{}'.format(i), case_type)
+        factory.form_opens_case(form)
+        for j in range(1, num_forms):
+            factory.form_requires_case(factory.new_form(module), case_type)
+
+        module.case_details.short.columns = _make_columns(num_columns)
+        module.case_details.long.columns = _make_columns(num_columns)
+
+    app = factory.app
+    for i in range(num_profiles):
+        app.build_profiles['profile{}'.format(i)] = BuildProfile(name='profile{}'.format(i), langs=['en'])
+    return app
+
+
+def _make_columns(num_columns):
+    return [
+        DetailColumn(
+            header={'en': 'Property {}'.format(i)},
+            model='case',
+            field='property_{}'.format(i),
+            format='plain',
+        )
+        for i in range(num_columns)
+    ]
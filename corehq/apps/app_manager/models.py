@@ -14,11 +14,13 @@ import json
 import types
 import re
 import datetime
+import threading
 import uuid
 from collections import defaultdict, namedtuple, Counter
 from functools import wraps
 from copy import deepcopy
 from mimetypes import guess_type
+from six.moves.queue import Queue, Empty
 from six.moves.urllib.request import urlopen
 from six.moves.urllib.parse import urljoin
 
@@ -26,6 +28,7 @@ from couchdbkit import MultipleResultsFound
 import itertools
 from lxml import etree
 from django.core.cache import cache
+from django.db import connections
 from django.utils.translation import override, ugettext as _, ugettext
 from django.utils.translation import ugettext_lazy
 from couchdbkit.exceptions import BadValueError
@@ -1199,10 +1202,13 @@ class FormBase(DocumentSchema):
         xform.set_version(self.get_version())
         xform.add_missing_instances(app.domain)
 
-    def render_xform(self, build_profile_id=None):
+    def build_xform(self, build_profile_id=None):
         xform = XForm(self.source)
         self.add_stuff_to_xform(xform, build_profile_id)
-        return xform.render()
+        return xform
+
+    def render_xform(self, build_profile_id=None):
+        return self.build_xform(build_profile_id).render()
 
     @quickcache(['self.source', 'langs', 'include_triggers', 'include_groups', 'include_translations'])
     def get_questions(self, langs, include_triggers=False,
@@ -5486,6 +5492,48 @@ def validate_detail_screen_field(field):
         raise ValueError("Invalid Sort Field")
 
 
+def validate_forms(forms):
+    """
+    Fill the validation cache of forms that have not been validated yet,
+    sending up to ``settings.APP_BUILD_MAX_CONCURRENT_VALIDATIONS`` forms to
+    the validation service at once. Errors are not raised here; they are
+    cached or raised again when each form is rendered.
+    """
+    forms = [form for form in forms if form.get_validation_cache() is None]
+    concurrency = min(settings.APP_BUILD_MAX_CONCURRENT_VALIDATIONS, len(forms))
+    if concurrency < 2:
+        # forms are validated one at a time when they are rendered
+        return
+
+    pending = Queue()
+    for form in forms:
+        pending.put(form)
+
+    def validate_pending():
+        try:
+            while True:
+                try:
+                    form = pending.get_nowait()
+                except Empty:
+                    return
+                try:
+                    form.validate_form()
+                except XFormException:
+                    pass
+        finally:
+            # connections are per thread
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=validate_pending, name='validate-forms-{}'.format(i))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
 class SavedAppBuild(ApplicationBase):
     def to_saved_build_json(self, timezone):
         data = super(SavedAppBuild, self).to_json().copy()
@@ -5618,17 +5666,41 @@ class Application(ApplicationBase, TranslationMixin, HQMediaMixin):
     def fetch_xform(self, module_id=None, form_id=None, form=None, build_profile_id=None):
         if not form:
             form = self.get_module(module_id).get_form(form_id)
-        return form.validate_form().render_xform(build_profile_id).encode('utf-8')
+        cache_key = self._get_built_form_cache_key(form, build_profile_id)
+        built_forms = self._get_built_form_cache()
+        if cache_key in built_forms:
+            return built_forms[cache_key]
+        source = form.validate_form().render_xform(build_profile_id).encode('utf-8')
+        self._cache_built_form(form, build_profile_id, source)
+        return source
+
+    @memoized
+    def _get_built_form_cache(self):
+        return {}
+
+    def _get_built_form_cache_key(self, form, build_profile_id):
+        # the build profile only affects a form through its languages
+        return form.unique_id, tuple(self.get_build_langs(build_profile_id)), form.get_version()
+
+    def _cache_built_form(self, form, build_profile_id, source):
+        # Only builds are cached since they are not edited after they are
+        # made, so the rendered form only changes with its version and langs.
+        if self.copy_of:
+            self._get_built_form_cache()[self._get_built_form_cache_key(form, build_profile_id)] = source
 
     def set_form_versions(self, previous_version, force_new_version=False):
         """
         Set the 'version' property on each form as follows to the current app version if the form is new
         or has changed since the last build. Otherwise set it to the version from the last build.
+
+        Each form is only rendered once and the result is kept for create_all_files.
         """
         def _hash(val):
             return hashlib.md5(val).hexdigest()
 
         if previous_version:
+            if not force_new_version:
+                validate_forms(list(self.get_forms()))
             for form_stuff in self.get_forms(bare=False):
                 filename = 'files/%s' % self.get_form_filename(**form_stuff)
                 form = form_stuff["form"]
@@ -5647,9 +5719,15 @@ class Application(ApplicationBase, TranslationMixin, HQMediaMixin):
                         # so that that's not treated as the diff
                         previous_form_version = previous_form.get_version()
                         form.version = previous_form_version
-                        my_hash = _hash(self.fetch_xform(form=form))
-                        if previous_hash != my_hash:
+                        xform = form.validate_form().build_xform()
+                        source = xform.render().encode('utf-8')
+                        if previous_hash != _hash(source):
                             form.version = None
+                            # the version is the only thing that differs
+                            # from the form that was just rendered
+                            xform.set_version(form.get_version())
+                            source = xform.render().encode('utf-8')
+                        self._cache_built_form(form, None, source)
                 else:
                     form.version = None
 
@@ -5798,6 +5876,14 @@ class Application(ApplicationBase, TranslationMixin, HQMediaMixin):
         self.assert_app_v2()
         return SuiteGenerator(self, build_profile_id).generate_suite()
 
+    @memoized
+    def get_suite_module_cache(self):
+        """
+        Suite elements generated for each module, shared by the suites that
+        are generated from this object. See SuiteGenerator._get_module_contributions
+        """
+        return {}
+
     def create_media_suite(self, build_profile_id=None):
         return MediaSuiteGenerator(self, build_profile_id).generate_suite()
 
@@ -5927,10 +6013,12 @@ class Application(ApplicationBase, TranslationMixin, HQMediaMixin):
         for lang in ['default'] + langs_for_build:
             files["{prefix}{lang}/app_strings.txt".format(
                 prefix=prefix, lang=lang)] = self.create_app_strings(lang, build_profile_id)
-        for form_stuff in self.get_forms(bare=False):
-            def exclude_form(form):
-                return isinstance(form, ShadowForm) or form.is_a_disabled_release_form()
 
+        def exclude_form(form):
+            return isinstance(form, ShadowForm) or form.is_a_disabled_release_form()
+
+        validate_forms([form for form in self.get_forms() if not exclude_form(form)])
+        for form_stuff in self.get_forms(bare=False):
             if not exclude_form(form_stuff['form']):
                 filename = prefix + self.get_form_filename(**form_stuff)
                 form = form_stuff['form']
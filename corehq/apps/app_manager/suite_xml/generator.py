@@ -2,10 +2,13 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 from distutils.version import LooseVersion
+import hashlib
+import json
 
 import six.moves.urllib.request, six.moves.urllib.parse, six.moves.urllib.error
 
 from django.urls import reverse
+from lxml import etree
 
 from corehq.apps.app_manager.exceptions import MediaResourceError
 from corehq.apps.app_manager.suite_xml.post_process.menu import GridMenuHelper
@@ -26,6 +29,7 @@ from corehq.apps.app_manager.suite_xml.xml_models import Suite, MediaResource, L
 from corehq.apps.app_manager import id_strings
 from corehq.apps.app_manager.util import split_path
 from corehq.apps.hqmedia.models import HQMediaMapItem
+from memoized import memoized
 
 
 class SuiteGenerator(object):
@@ -70,13 +74,12 @@ class SuiteGenerator(object):
             training_menu = None
 
         for module in self.modules:
-            self.suite.entries.extend(entries.get_module_contributions(module))
-
-            self.suite.menus.extend(
-                menus.get_module_contributions(module, training_menu)
+            module_entries, module_menus, module_remote_requests = self._get_module_contributions(
+                module, entries, menus, remote_requests, training_menu
             )
-
-            self.suite.remote_requests.extend(remote_requests.get_module_contributions(module))
+            self.suite.entries.extend(module_entries)
+            self.suite.menus.extend(module_menus)
+            self.suite.remote_requests.extend(module_remote_requests)
 
         if training_menu:
             self.suite.menus.append(training_menu)
@@ -95,6 +98,46 @@ class SuiteGenerator(object):
         EntryInstances(self.suite, self.app, self.modules).update_suite()
         return self.suite.serializeDocument(pretty=True)
 
+    def _get_module_contributions(self, module, entries, menus, remote_requests, training_menu):
+        """
+        Entries, menus and remote requests don't depend on the build profile
+        so they are generated once per module and app state, and copied into
+        each suite that is generated from the same app, e.g. once for each
+        build profile. The post processors still run on every suite since
+        they update these elements in place.
+        """
+        cache = self.app.get_suite_module_cache()
+        key = (self._app_fingerprint, module.id)
+        if key in cache:
+            module_entries, module_menus, module_remote_requests, training_commands = [
+                [cls(etree.fromstring(xml)) for cls, xml in elements]
+                for elements in cache[key]
+            ]
+            if training_menu:
+                training_menu.commands.extend(training_commands)
+            return module_entries, module_menus, module_remote_requests
+
+        training_commands_before = len(training_menu.commands) if training_menu else 0
+        module_entries = list(entries.get_module_contributions(module))
+        module_menus = list(menus.get_module_contributions(module, training_menu))
+        module_remote_requests = list(remote_requests.get_module_contributions(module))
+        # the menu contributor adds the commands of training modules to the training menu
+        training_commands = list(training_menu.commands)[training_commands_before:] if training_menu else []
+        cache[key] = [
+            [(type(element), etree.tostring(element.node, with_tail=False)) for element in elements]
+            for elements in (module_entries, module_menus, module_remote_requests, training_commands)
+        ]
+        return module_entries, module_menus, module_remote_requests
+
+    @property
+    @memoized
+    def _app_fingerprint(self):
+        # Module contributions can depend on any part of the app
+        app_json = self.app.to_json()
+        for key in ('_rev', 'version', 'built_on', 'built_with', 'date_created', 'last_modified'):
+            app_json.pop(key, None)
+        return hashlib.md5(json.dumps(app_json, sort_keys=True).encode('utf-8')).hexdigest()
+
 
 class MediaSuiteGenerator(object):
     descriptor = "Media Suite File"
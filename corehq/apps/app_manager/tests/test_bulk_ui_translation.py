@@ -3,9 +3,11 @@ from __future__ import unicode_literals
 from distutils.version import StrictVersion
 from django.test import SimpleTestCase
 from io import BytesIO
+import openpyxl
 from corehq.apps.app_manager.models import Application
 from corehq.apps.app_manager.ui_translations import \
-    process_ui_translation_upload, get_default_translations_for_download
+    process_ui_translation_upload, get_default_translations_for_download, build_ui_translation_download_file
+from corehq.apps.app_manager.ui_translations.commcare_versioning import get_commcare_version_from_workbook
 from couchexport.export import export_raw
 import six
 
@@ -85,3 +87,12 @@ class BulkUiTranslation(SimpleTestCase):
         translations, error_properties, warnings = process_ui_translation_upload(self.app, f)
         self.assertEqual(translations["fra"]["home.start.demo"], "change_2")
         self.assertEqual(translations["en"]["home.start.demo"], "change_1")
+
+    def test_download_sets_commcare_version(self):
+        f = build_ui_translation_download_file(self.app)
+        f.seek(0)
+        workbook = openpyxl.load_workbook(f)
+        self.assertEqual(
+            get_commcare_version_from_workbook(workbook),
+            str(StrictVersion(self.app.build_version.vstring)),
+        )
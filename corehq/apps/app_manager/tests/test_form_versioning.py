@@ -108,6 +108,36 @@ class FormVersioningTest(TestCase):
         self.assertEqual(self.get_form_versions(xxx_build1), [1, 1])
         self.assertEqual(self.get_form_versions(xxx_build2), [2, 1])
 
+    @patch_default_builds
+    @patch('corehq.apps.app_manager.models.validate_xform', return_value=None)
+    def test_forms_rendered_once_per_build(self, mock):
+        add_build(version='2.7.0', build_number=20655)
+        domain = 'form-versioning-test'
+
+        app = Application.new_app(domain, 'Foo')
+        app.modules.append(Module(forms=[Form(), Form()]))
+        app.build_spec = BuildSpec.from_string('2.7.0/latest')
+        app.get_module(0).get_form(0).source = BLANK_TEMPLATE.format(xmlns='xmlns-0.0')
+        app.get_module(0).get_form(1).source = BLANK_TEMPLATE.format(xmlns='xmlns-1')
+        app.save()
+        build1 = app.make_build(previous_version=None)
+        build1.save()
+
+        app.get_module(0).get_form(0).source = BLANK_TEMPLATE.format(xmlns='xmlns-0.1')
+        app.save()
+        with patch.object(Form, 'add_stuff_to_xform', autospec=True,
+                          side_effect=Form.add_stuff_to_xform) as add_stuff_to_xform:
+            build2 = app.make_build(previous_version=build1)
+        build2.save()
+
+        self.assertEqual(add_stuff_to_xform.call_count, 2)
+        self.assertEqual(self.get_form_versions(build2), [2, 1])
+        self.assertIn('version="2"', build2.fetch_attachment('files/modules-0/forms-0.xml'))
+        self.assertEqual(
+            build1.fetch_attachment('files/modules-0/forms-1.xml'),
+            build2.fetch_attachment('files/modules-0/forms-1.xml'),
+        )
+
     @staticmethod
     def get_form_versions(build):
         from lxml import etree
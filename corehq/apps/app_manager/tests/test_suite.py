@@ -32,6 +32,7 @@ from corehq.apps.app_manager.models import (
     UpdateCaseAction,
     CustomInstance,
 )
+from corehq.apps.app_manager.suite_xml.sections.entries import EntriesContributor
 from corehq.apps.app_manager.tests.app_factory import AppFactory
 from corehq.apps.app_manager.tests.util import SuiteMixin, TestXmlMixin, commtrack_enabled
 from corehq.apps.app_manager.xpath import (
@@ -1133,6 +1134,21 @@ class SuiteTest(SimpleTestCase, TestXmlMixin, SuiteMixin):
             "entry[1]/instance"
         )
 
+    def test_module_contributions_reused(self):
+        factory = AppFactory()
+        m0, m0f0 = factory.new_basic_module('m0', 'case1')
+        factory.form_requires_case(m0f0, 'case1')
+        m1, m1f0 = factory.new_basic_module('m1', 'case2')
+        suite = factory.app.create_suite()
+
+        with mock.patch.object(EntriesContributor, 'get_module_contributions') as get_module_contributions:
+            self.assertXmlEqual(suite, factory.app.create_suite())
+        get_module_contributions.assert_not_called()
+
+        # changing the app generates the module contributions again
+        factory.form_requires_case(m1f0, 'case2')
+        self.assertNotEqual(suite, factory.app.create_suite())
+
 
 class InstanceTests(SimpleTestCase, TestXmlMixin, SuiteMixin):
     file_path = ('data', 'suite')
@@ -21,12 +21,20 @@ def get_commcare_version_from_workbook(workbook):
 
 
 def set_commcare_version_in_workbook(workbook, commcare_version):
+    assert isinstance(workbook, openpyxl.Workbook)
+    set_commcare_version_in_properties(workbook.properties, commcare_version)
+
+
+def set_commcare_version_in_properties(properties, commcare_version):
+    """
+    :param properties: the openpyxl DocumentProperties of a workbook, or of
+    an Excel2007ExportWriter
+    """
     try:
         commcare_version = str(StrictVersion(commcare_version))
     except ValueError:
         return
-    assert isinstance(workbook, openpyxl.Workbook)
-    keywords = workbook.properties.keywords
+    keywords = properties.keywords
     if keywords:
         keywords = [keyword for keyword in keywords.split(' ')
                     if not keyword.startswith(KEYWORD_PREFIX)]
@@ -34,4 +42,4 @@ def set_commcare_version_in_workbook(workbook, commcare_version):
         keywords = []
 
     keywords = ['{}{}'.format(KEYWORD_PREFIX, commcare_version)] + keywords
-    workbook.properties.keywords = ' '.join(keywords)
+    properties.keywords = ' '.join(keywords)
@@ -9,7 +9,7 @@ from django.utils.translation import ugettext as _
 from commcare_translations import load_translations
 from corehq.apps.app_manager import app_strings
 from corehq.apps.app_manager.ui_translations.commcare_versioning import \
-    get_commcare_version_from_workbook, set_commcare_version_in_workbook
+    get_commcare_version_from_workbook, set_commcare_version_in_properties
 from corehq.util.workbook_json.excel import WorkbookJSONReader, WorksheetNotFound
 from couchexport.export import export_raw_to_writer
 import six
@@ -94,7 +94,7 @@ def build_ui_translation_download_file(app):
 
     data = (("translations", tuple(rows)),)
     with export_raw_to_writer(headers, data, temp) as writer:
-        set_commcare_version_in_workbook(writer.book, commcare_version)
+        set_commcare_version_in_properties(writer.properties, commcare_version)
     return temp
 
 
@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
-from collections import namedtuple
+import sys
+import threading
+from collections import defaultdict, namedtuple
 
 from celery.schedules import crontab
 from celery.task import task
+from django.conf import settings
+from django.db import connections
 from corehq.apps.case_importer.exceptions import ImporterError
 from corehq.apps.case_importer.tracking.analytics import \
     get_case_upload_files_total_bytes
@@ -18,10 +22,11 @@ from corehq.apps.case_importer import util as importer_util
 from corehq.apps.locations.models import SQLLocation
 from corehq.apps.users.models import CouchUser
 from corehq.apps.export.tasks import add_inferred_export_properties
-from corehq.form_processor.interfaces.dbaccessors import CaseAccessors
 from couchdbkit.exceptions import ResourceNotFound
 from corehq.util.soft_assert import soft_assert
 from corehq.toggles import BULK_UPLOAD_DATE_OPENED
+from dimagi.utils.chunked import chunked
+import six
 import uuid
 from soil.progress import set_task_progress
 
@@ -75,9 +80,11 @@ def do_import(spreadsheet, config, domain, task=None, chunksize=CASEBLOCK_CHUNKS
     name_cache = {}
     caseblocks = []
     ids_seen = set()
+    lookups = importer_util.CaseLookups(domain)
 
     def _submit_caseblocks(domain, case_type, caseblocks):
         err = False
+        row_errors = []
         if caseblocks:
             try:
                 form, cases = submit_case_blocks(
@@ -89,17 +96,11 @@ def do_import(spreadsheet, config, domain, task=None, chunksize=CASEBLOCK_CHUNKS
                 )
 
                 if form.is_error:
-                    errors.add(
-                        error=ImportErrors.ImportErrorMessage,
-                        row_number=form.problem
-                    )
+                    row_errors.append(form.problem)
             except Exception:
                 err = True
                 for row_number, case in caseblocks:
-                    errors.add(
-                        error=ImportErrors.ImportErrorMessage,
-                        row_number=row_number
-                    )
+                    row_errors.append(row_number)
             else:
                 if record_form_callback:
                     record_form_callback(form.form_id)
@@ -118,181 +119,216 @@ def do_import(spreadsheet, config, domain, task=None, chunksize=CASEBLOCK_CHUNKS
                         'error adding inferred export properties in domain '
                         '({}): {}'.format(domain, ", ".join(properties))
                     )
-        return err
+        return err, row_errors
+
+    def _add_submission_errors(result):
+        err, row_errors = result
+        for row_number in row_errors:
+            errors.add(
+                error=ImportErrors.ImportErrorMessage,
+                row_number=row_number
+            )
 
-    row_count = spreadsheet.max_row
-    for i, row in enumerate(spreadsheet.iter_rows()):
-        if task:
-            set_task_progress(task, i, row_count)
-
-        # skip first row (header row)
-        if i == 0:
-            continue
-
-        search_id = importer_util.parse_search_id(config, columns, row)
-
-        fields_to_update = importer_util.populate_updated_fields(config, columns, row)
-        if not any(fields_to_update.values()):
-            # if the row was blank, just skip it, no errors
-            continue
-
-        if config.search_field == 'external_id' and not search_id:
-            # do not allow blank external id since we save this
-            errors.add(ImportErrors.BlankExternalId, i + 1)
-            continue
-
-        external_id = fields_to_update.pop('external_id', None)
-        parent_id = fields_to_update.pop('parent_id', None)
-        parent_external_id = fields_to_update.pop('parent_external_id', None)
-        parent_type = fields_to_update.pop('parent_type', config.case_type)
-        parent_ref = fields_to_update.pop('parent_ref', 'parent')
-        to_close = fields_to_update.pop('close', False)
-
-        if any([lookup_id and lookup_id in ids_seen for lookup_id in [search_id, parent_id, parent_external_id]]):
-            # clear out the queue to make sure we've processed any potential
-            # cases we want to look up
-            # note: these three lines are repeated a few places, and could be converted
-            # to a function that makes use of closures (and globals) to do the same thing,
-            # but that seems sketchier than just beeing a little RY
-            _submit_caseblocks(domain, config.case_type, caseblocks)
-            num_chunks += 1
-            caseblocks = []
-            ids_seen = set()  # also clear ids_seen, since all the cases will now be in the database
-
-        case, error = importer_util.lookup_case(
-            config.search_field,
-            search_id,
-            domain,
-            config.case_type
-        )
+    submitter = _CaseBlockSubmitter(
+        lambda caseblocks: _submit_caseblocks(domain, config.case_type, caseblocks),
+        on_complete=_add_submission_errors,
+        background=settings.CASE_IMPORTER_BACKGROUND_SUBMISSION,
+    )
 
-        if case:
-            if case.type != config.case_type:
-                continue
-        elif error == LookupErrors.NotFound:
-            if not config.create_new_cases:
+    row_count = spreadsheet.max_row
+    for chunk in chunked(enumerate(spreadsheet.iter_rows()), chunksize):
+        rows = []
+        for i, row in chunk:
+            if task:
+                set_task_progress(task, i, row_count)
+
+            # skip first row (header row)
+            if i == 0:
                 continue
-        elif error == LookupErrors.MultipleResults:
-            too_many_matches += 1
-            continue
 
-        uploaded_owner_name = fields_to_update.pop('owner_name', None)
-        uploaded_owner_id = fields_to_update.pop('owner_id', None)
+            search_id = importer_util.parse_search_id(config, columns, row)
 
-        if uploaded_owner_name:
-            # If an owner name was provided, replace the provided
-            # uploaded_owner_id with the id of the provided group or owner
-            try:
-                uploaded_owner_id = importer_util.get_id_from_name(uploaded_owner_name, domain, name_cache)
-            except SQLLocation.MultipleObjectsReturned:
-                errors.add(ImportErrors.DuplicateLocationName, i + 1)
+            fields_to_update = importer_util.populate_updated_fields(config, columns, row)
+            if not any(fields_to_update.values()):
+                # if the row was blank, just skip it, no errors
                 continue
 
-            if not uploaded_owner_id:
-                errors.add(ImportErrors.InvalidOwnerName, i + 1, 'owner_name')
-                continue
-        if uploaded_owner_id:
-            # If an owner_id mapping exists, verify it is a valid user
-            # or case sharing group
-            if importer_util.is_valid_id(uploaded_owner_id, domain, id_cache):
-                owner_id = uploaded_owner_id
-                id_cache[uploaded_owner_id] = True
-            else:
-                errors.add(ImportErrors.InvalidOwnerId, i + 1, 'owner_id')
-                id_cache[uploaded_owner_id] = False
-                continue
-        else:
-            # if they didn't supply an owner_id mapping, default to current
-            # user
-            owner_id = user_id
+            rows.append((i, search_id, fields_to_update))
 
-        extras = {}
-        if parent_id:
-            try:
-                parent_case = CaseAccessors(domain).get_case(parent_id)
+        # look up everything the chunk refers to up front while the previous
+        # chunk is being submitted
+        lookups.clear()
+        _prefetch_lookups(lookups, config, rows)
+        importer_util.prefetch_ids_from_names(
+            [fields_to_update.get('owner_name') for i, search_id, fields_to_update in rows],
+            domain,
+            name_cache,
+        )
 
-                if parent_case.domain == domain:
-                    extras['index'] = {
-                        parent_ref: (parent_case.type, parent_id)
-                    }
-            except ResourceNotFound:
-                errors.add(ImportErrors.InvalidParentId, i + 1, 'parent_id')
+        for i, search_id, fields_to_update in rows:
+            if config.search_field == 'external_id' and not search_id:
+                # do not allow blank external id since we save this
+                errors.add(ImportErrors.BlankExternalId, i + 1)
                 continue
-        elif parent_external_id:
-            parent_case, error = importer_util.lookup_case(
-                'external_id',
-                parent_external_id,
-                domain,
-                parent_type
-            )
-            if parent_case:
-                extras['index'] = {
-                    parent_ref: (parent_type, parent_case.case_id)
-                }
-
-        case_name = fields_to_update.pop('name', None)
 
-        if BULK_UPLOAD_DATE_OPENED.enabled(domain):
-            date_opened = fields_to_update.pop(CASE_TAG_DATE_OPENED, None)
-            if date_opened:
-                extras['date_opened'] = date_opened
-
-        if not case:
-            id = uuid.uuid4().hex
+            external_id = fields_to_update.pop('external_id', None)
+            parent_id = fields_to_update.pop('parent_id', None)
+            parent_external_id = fields_to_update.pop('parent_external_id', None)
+            parent_type = fields_to_update.pop('parent_type', config.case_type)
+            parent_ref = fields_to_update.pop('parent_ref', 'parent')
+            to_close = fields_to_update.pop('close', False)
+
+            lookup_ids = [search_id, parent_id, parent_external_id]
+            if any([lookup_id and lookup_id in ids_seen for lookup_id in lookup_ids]):
+                # clear out the queue to make sure we've processed any potential
+                # cases we want to look up
+                # note: these three lines are repeated a few places, and could be converted
+                # to a function that makes use of closures (and globals) to do the same thing,
+                # but that seems sketchier than just beeing a little RY
+                submitter.submit(caseblocks)
+                submitter.wait()
+                num_chunks += 1
+                caseblocks = []
+                # the cases created since the last submission are now in the database
+                lookups.forget(ids_seen)
+                ids_seen = set()
+
+            case, error = lookups.lookup_case(
+                config.search_field,
+                search_id,
+                config.case_type
+            )
 
-            if config.search_field == 'external_id':
-                extras['external_id'] = search_id
-            elif external_id:
-                extras['external_id'] = external_id
+            if case:
+                if case.type != config.case_type:
+                    continue
+            elif error == LookupErrors.NotFound:
+                if not config.create_new_cases:
+                    continue
+            elif error == LookupErrors.MultipleResults:
+                too_many_matches += 1
+                continue
 
-            try:
-                caseblock = CaseBlock(
-                    create=True,
-                    case_id=id,
-                    owner_id=owner_id,
-                    user_id=user_id,
-                    case_type=config.case_type,
-                    case_name=case_name or '',
-                    update=fields_to_update,
-                    **extras
-                )
-                caseblocks.append(RowAndCase(i, caseblock))
-                created_count += 1
-                if external_id:
-                    ids_seen.add(external_id)
-            except CaseBlockError:
-                errors.add(ImportErrors.CaseGeneration, i + 1)
-        else:
-            if external_id:
-                extras['external_id'] = external_id
+            uploaded_owner_name = fields_to_update.pop('owner_name', None)
+            uploaded_owner_id = fields_to_update.pop('owner_id', None)
+
+            if uploaded_owner_name:
+                # If an owner name was provided, replace the provided
+                # uploaded_owner_id with the id of the provided group or owner
+                try:
+                    uploaded_owner_id = importer_util.get_id_from_name(uploaded_owner_name, domain, name_cache)
+                except SQLLocation.MultipleObjectsReturned:
+                    errors.add(ImportErrors.DuplicateLocationName, i + 1)
+                    continue
+
+                if not uploaded_owner_id:
+                    errors.add(ImportErrors.InvalidOwnerName, i + 1, 'owner_name')
+                    continue
             if uploaded_owner_id:
-                extras['owner_id'] = owner_id
-            if to_close == 'yes':
-                extras['close'] = True
-            if case_name is not None:
-                extras['case_name'] = case_name
-
-            try:
-                caseblock = CaseBlock(
-                    create=False,
-                    case_id=case.case_id,
-                    update=fields_to_update,
-                    **extras
+                # If an owner_id mapping exists, verify it is a valid user
+                # or case sharing group
+                if importer_util.is_valid_id(uploaded_owner_id, domain, id_cache):
+                    owner_id = uploaded_owner_id
+                    id_cache[uploaded_owner_id] = True
+                else:
+                    errors.add(ImportErrors.InvalidOwnerId, i + 1, 'owner_id')
+                    id_cache[uploaded_owner_id] = False
+                    continue
+            else:
+                # if they didn't supply an owner_id mapping, default to current
+                # user
+                owner_id = user_id
+
+            extras = {}
+            if parent_id:
+                try:
+                    parent_case = lookups.get_case(parent_id)
+
+                    if parent_case.domain == domain:
+                        extras['index'] = {
+                            parent_ref: (parent_case.type, parent_id)
+                        }
+                except ResourceNotFound:
+                    errors.add(ImportErrors.InvalidParentId, i + 1, 'parent_id')
+                    continue
+            elif parent_external_id:
+                parent_case, error = lookups.lookup_case(
+                    'external_id',
+                    parent_external_id,
+                    parent_type
                 )
-                caseblocks.append(RowAndCase(i, caseblock))
-                match_count += 1
-            except CaseBlockError:
-                errors.add(ImportErrors.CaseGeneration, i + 1)
-
-        # check if we've reached a reasonable chunksize
-        # and if so submit
-        if len(caseblocks) >= chunksize:
-            _submit_caseblocks(domain, config.case_type, caseblocks)
-            num_chunks += 1
-            caseblocks = []
+                if parent_case:
+                    extras['index'] = {
+                        parent_ref: (parent_type, parent_case.case_id)
+                    }
+
+            case_name = fields_to_update.pop('name', None)
+
+            if BULK_UPLOAD_DATE_OPENED.enabled(domain):
+                date_opened = fields_to_update.pop(CASE_TAG_DATE_OPENED, None)
+                if date_opened:
+                    extras['date_opened'] = date_opened
+
+            if not case:
+                id = uuid.uuid4().hex
+
+                if config.search_field == 'external_id':
+                    extras['external_id'] = search_id
+                elif external_id:
+                    extras['external_id'] = external_id
+
+                try:
+                    caseblock = CaseBlock(
+                        create=True,
+                        case_id=id,
+                        owner_id=owner_id,
+                        user_id=user_id,
+                        case_type=config.case_type,
+                        case_name=case_name or '',
+                        update=fields_to_update,
+                        **extras
+                    )
+                    caseblocks.append(RowAndCase(i, caseblock))
+                    created_count += 1
+                    if external_id:
+                        ids_seen.add(external_id)
+                except CaseBlockError:
+                    errors.add(ImportErrors.CaseGeneration, i + 1)
+            else:
+                if external_id:
+                    extras['external_id'] = external_id
+                    # later lookups by this external id need to find the case
+                    lookups.forget([external_id])
+                if uploaded_owner_id:
+                    extras['owner_id'] = owner_id
+                if to_close == 'yes':
+                    extras['close'] = True
+                if case_name is not None:
+                    extras['case_name'] = case_name
+
+                try:
+                    caseblock = CaseBlock(
+                        create=False,
+                        case_id=case.case_id,
+                        update=fields_to_update,
+                        **extras
+                    )
+                    caseblocks.append(RowAndCase(i, caseblock))
+                    match_count += 1
+                except CaseBlockError:
+                    errors.add(ImportErrors.CaseGeneration, i + 1)
+
+            # check if we've reached a reasonable chunksize
+            # and if so submit
+            if len(caseblocks) >= chunksize:
+                submitter.submit(caseblocks)
+                num_chunks += 1
+                caseblocks = []
 
     # final purge of anything left in the queue
-    if _submit_caseblocks(domain, config.case_type, caseblocks):
+    submitter.submit(caseblocks)
+    err, row_errors = submitter.wait()
+    if err:
         match_count -= 1
     num_chunks += 1
     return {
@@ -304,6 +340,76 @@ def do_import(spreadsheet, config, domain, task=None, chunksize=CASEBLOCK_CHUNKS
     }
 
 
+def _prefetch_lookups(lookups, config, rows):
+    search_ids = [search_id for i, search_id, fields_to_update in rows]
+    if config.search_field == 'case_id':
+        lookups.prefetch_cases(search_ids)
+    elif config.search_field == importer_util.EXTERNAL_ID:
+        lookups.prefetch_external_ids(search_ids, config.case_type)
+
+    lookups.prefetch_cases([fields_to_update.get('parent_id') for i, search_id, fields_to_update in rows])
+
+    parent_external_ids = defaultdict(list)
+    for i, search_id, fields_to_update in rows:
+        if not fields_to_update.get('parent_id') and fields_to_update.get('parent_external_id'):
+            parent_type = fields_to_update.get('parent_type', config.case_type)
+            parent_external_ids[parent_type].append(fields_to_update['parent_external_id'])
+    for parent_type, external_ids in parent_external_ids.items():
+        lookups.prefetch_external_ids(external_ids, parent_type)
+
+
+class _CaseBlockSubmitter(object):
+    """
+    Submits chunks of caseblocks one at a time. With ``background`` set each
+    chunk is submitted in a separate thread so that the next chunk can be
+    read while it is processed.
+
+    ``on_complete`` is called with the result of each submission in the
+    calling thread.
+    """
+
+    def __init__(self, submit, on_complete, background=False):
+        self._submit = submit
+        self._on_complete = on_complete
+        self._background = background
+        self._thread = None
+        self._result = None
+        self._exc_info = None
+
+    def submit(self, caseblocks):
+        self.wait()
+        if not self._background:
+            self._result = self._submit(caseblocks)
+            self._on_complete(self._result)
+            return
+
+        self._thread = threading.Thread(target=self._submit_in_thread, args=(caseblocks,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _submit_in_thread(self, caseblocks):
+        try:
+            self._result = self._submit(caseblocks)
+        except BaseException:
+            self._exc_info = sys.exc_info()
+        finally:
+            # connections are per thread
+            connections.close_all()
+
+    def wait(self):
+        """
+        Wait for the last submission to finish and return its result
+        """
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            if self._exc_info is not None:
+                exc_info, self._exc_info = self._exc_info, None
+                six.reraise(*exc_info)
+            self._on_complete(self._result)
+        return self._result
+
+
 total_bytes = datadog_gauge_task(
     'commcare.case_importer.files.total_bytes',
     get_case_upload_files_total_bytes,
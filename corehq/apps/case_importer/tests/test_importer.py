@@ -1,12 +1,13 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.utils.dateparse import parse_datetime
+from mock import patch
 
 from casexml.apps.case.mock import CaseFactory, CaseStructure
 from casexml.apps.case.tests.util import delete_all_cases
 from corehq.apps.case_importer.const import ImportErrors
-from corehq.apps.case_importer.tasks import bulk_import_async, do_import
+from corehq.apps.case_importer.tasks import _CaseBlockSubmitter, bulk_import_async, do_import
 from corehq.apps.case_importer.util import ImporterConfig, WorksheetWrapper
 from corehq.apps.commtrack.tests.util import make_loc
 from corehq.apps.domain.shortcuts import create_domain
@@ -15,7 +16,7 @@ from corehq.apps.locations.models import LocationType
 from corehq.apps.users.models import WebUser
 from corehq.form_processor.interfaces.dbaccessors import CaseAccessors
 from corehq.form_processor.tests.utils import run_with_all_backends
-from corehq.util.workbook_reading import make_worksheet
+from corehq.util.workbook_reading import Cell, Worksheet, make_worksheet
 from corehq.util.test_utils import flag_enabled
 from corehq.util.timezones.conversions import PhoneTime
 import six
@@ -322,6 +323,25 @@ class ImporterTest(TestCase):
         for prop in ['age', 'sex', 'location']:
             self.assertTrue(prop in case.get_case_property(prop))
 
+    @run_with_all_backends
+    def test_external_id_lookups_are_batched(self):
+        cases = [self.factory.create_case(external_id='ext-{}'.format(i)) for i in range(3)]
+        config = self._config(['external_id', 'age'], search_field='external_id')
+        file = make_worksheet_wrapper(
+            ['external_id', 'age'],
+            ['ext-0', 'age-0'],
+            ['ext-1', 'age-1'],
+            ['ext-2', 'age-2'],
+        )
+        with patch.object(CaseAccessors, 'get_cases_by_external_id') as get_cases_by_external_id:
+            res = do_import(file, config, self.domain)
+        get_cases_by_external_id.assert_not_called()
+        self.assertEqual(0, res['created_count'])
+        self.assertEqual(3, res['match_count'])
+        for i, case in enumerate(cases):
+            case = self.accessor.get_case(case.case_id)
+            self.assertEqual('age-{}'.format(i), case.get_case_property('age'))
+
     @run_with_all_backends
     def testParentCase(self):
         headers = ['parent_id', 'name', 'case_id']
@@ -412,5 +432,39 @@ class ImporterTest(TestCase):
         self.assertEqual(case.opened_on, PhoneTime(parse_datetime(new_date)).done())
 
 
+class CaseBlockSubmitterTest(SimpleTestCase):
+
+    def test_submit_in_background(self):
+        results = []
+        submitter = _CaseBlockSubmitter(len, results.append, background=True)
+        submitter.submit(['a', 'b'])
+        submitter.submit(['c'])
+        self.assertEqual(1, submitter.wait())
+        self.assertEqual([2, 1], results)
+
+    def test_error_in_background(self):
+        def submit(caseblocks):
+            raise ValueError(caseblocks)
+
+        submitter = _CaseBlockSubmitter(submit, lambda result: None, background=True)
+        submitter.submit(['a'])
+        with self.assertRaises(ValueError):
+            submitter.wait()
+
+
+class WorksheetWrapperTest(SimpleTestCase):
+
+    def test_header_columns_read_first_row_only(self):
+        def iter_rows():
+            yield [Cell('name'), Cell(None), Cell('age')]
+            raise AssertionError('read past the header row')
+
+        worksheet = WorksheetWrapper(Worksheet(title='Sheet1', max_row=None, iter_rows=iter_rows))
+        self.assertEqual(['name', 'age'], worksheet.get_header_columns())
+
+    def test_header_columns_empty_sheet(self):
+        self.assertEqual([], make_worksheet_wrapper().get_header_columns())
+
+
 def make_worksheet_wrapper(*rows):
     return WorksheetWrapper(make_worksheet(rows))
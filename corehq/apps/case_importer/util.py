@@ -9,6 +9,7 @@ from couchdbkit import NoResultFound
 from corehq.apps.case_importer.const import LookupErrors, ImportErrors
 from corehq.apps.export.models import CaseExportDataSchema
 from corehq.apps.export.models.new import MAIN_TABLE
+from corehq.apps.groups.dbaccessors import stale_group_ids_by_names
 from corehq.apps.groups.models import Group
 from corehq.apps.case_importer.exceptions import (
     ImporterExcelFileEncrypted,
@@ -18,6 +19,7 @@ from corehq.apps.case_importer.exceptions import (
     InvalidCustomFieldNameException,
 )
 from corehq.apps.users.cases import get_wrapped_owner
+from corehq.apps.users.dbaccessors import get_user_ids_by_usernames
 from corehq.apps.users.models import CouchUser
 from corehq.apps.users.util import format_username
 from corehq.apps.locations.models import SQLLocation
@@ -113,13 +115,9 @@ class WorksheetWrapper(object):
             return cls(workbook.worksheets[0])
 
     def get_header_columns(self):
-        if self.max_row > 1:
-            # remove None columns the library sometimes returns
-            return list(filter(None, next(self.iter_rows())))
-
-        # if max_row is 1, there may be either 0 or 1 rows in the sheet
-        rows = list(self.iter_rows())
-        header_row = rows[0] if rows else []
+        # only read the first row; the rest of the sheet is never loaded
+        header_row = next(self.iter_rows(), [])
+        # remove None columns the library sometimes returns
         return list(filter(None, header_row))
 
     def _get_column_values(self, column_index):
@@ -293,6 +291,82 @@ def lookup_case(search_field, search_id, domain, case_type):
         return (None, LookupErrors.NotFound)
 
 
+class CaseLookups(object):
+    """
+    Answers ``lookup_case`` and parent case lookups for a chunk of rows from
+    cases fetched with one query per search field and case type, rather than
+    one query per row.
+
+    Lookups of ids that haven't been prefetched go to the database as usual.
+    """
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.case_accessors = CaseAccessors(domain)
+        self._cases_by_id = {}
+        # {external_id: {case_type: [case, ...]}}
+        self._cases_by_external_id = defaultdict(dict)
+
+    def prefetch_cases(self, case_ids):
+        case_ids = [case_id for case_id in set(case_ids) if case_id and case_id not in self._cases_by_id]
+        if not case_ids:
+            return
+        cases = {case.case_id: case for case in self.case_accessors.get_cases(case_ids)}
+        for case_id in case_ids:
+            self._cases_by_id[case_id] = cases.get(case_id)
+
+    def prefetch_external_ids(self, external_ids, case_type):
+        external_ids = [
+            external_id for external_id in set(external_ids)
+            if external_id and case_type not in self._cases_by_external_id.get(external_id, {})
+        ]
+        if not external_ids:
+            return
+        cases_by_external_id = defaultdict(list)
+        for case in self.case_accessors.get_cases_by_external_ids(external_ids, case_type=case_type):
+            cases_by_external_id[case.external_id].append(case)
+        for external_id in external_ids:
+            self._cases_by_external_id[external_id][case_type] = cases_by_external_id[external_id]
+
+    def get_case(self, case_id):
+        self.prefetch_cases([case_id])
+        case = self._cases_by_id.get(case_id)
+        if case is None:
+            raise CaseNotFound(case_id)
+        return case
+
+    def lookup_case(self, search_field, search_id, case_type):
+        """
+        Same as ``lookup_case``
+        """
+        if search_field == 'case_id':
+            self.prefetch_cases([search_id])
+            case = self._cases_by_id.get(search_id)
+            if case and case.domain == self.domain and case.type == case_type:
+                return (case, None)
+        elif search_field == EXTERNAL_ID:
+            self.prefetch_external_ids([search_id], case_type)
+            cases = self._cases_by_external_id[search_id].get(case_type, [])
+            if len(cases) > 1:
+                return (None, LookupErrors.MultipleResults)
+            elif cases:
+                return (cases[0], None)
+        return (None, LookupErrors.NotFound)
+
+    def clear(self):
+        self._cases_by_id.clear()
+        self._cases_by_external_id.clear()
+
+    def forget(self, ids):
+        """
+        Drop the results for ``ids``, e.g. once cases with these external ids
+        have been created, so that they are looked up again
+        """
+        for id_ in ids:
+            self._cases_by_id.pop(id_, None)
+            self._cases_by_external_id.pop(id_, None)
+
+
 def populate_updated_fields(config, columns, row):
     """
     Returns a dict map of fields that were marked to be updated
@@ -410,6 +484,28 @@ def get_id_from_name(name, domain, cache):
     return id
 
 
+def prefetch_ids_from_names(names, domain, cache):
+    """
+    Add the ids of the users and groups named in ``names`` to the ``cache``
+    used by ``get_id_from_name``. Names that aren't found are left for
+    ``get_id_from_name`` to look up one at a time since they may be
+    locations.
+    """
+    names = [name for name in set(names) if name and name not in cache]
+    if not names:
+        return
+
+    usernames = {
+        (name if '@' in name else format_username(name, domain)): name
+        for name in names
+    }
+    for username, user_id in get_user_ids_by_usernames(list(usernames)).items():
+        cache[usernames[username]] = user_id
+
+    group_names = [name for name in names if name not in cache]
+    cache.update(stale_group_ids_by_names(domain, group_names))
+
+
 def get_importer_error_message(e):
     if isinstance(e, ImporterRefError):
         # I'm not totally sure this is the right error, but it's what was being
@@ -26,11 +26,15 @@ class KafkaChangeFeed(ChangeFeed):
     """
     sequence_format = 'json'
 
-    def __init__(self, topics, group_id, strict=False, num_processes=1, process_num=0):
+    def __init__(self, topics, group_id, strict=False, num_processes=1, process_num=0, heartbeat_ms=None):
         """
         Create a change feed listener for a list of kafka topics, a group ID, and partition.
 
         See http://kafka.apache.org/documentation.html#introduction for a description of what these are.
+
+        :param heartbeat_ms: When iterating forever, yield ``None`` whenever no change has
+                             arrived for this many milliseconds. Used by pillows that process
+                             changes in chunks so that partial chunks don't wait indefinitely.
         """
         self._topics = topics
         self._group_id = group_id
@@ -38,6 +42,7 @@ class KafkaChangeFeed(ChangeFeed):
         self.strict = strict
         self.num_processes = num_processes
         self.process_num = process_num
+        self.heartbeat_ms = heartbeat_ms
 
     def __unicode__(self):
         return 'KafkaChangeFeed: topics: {}, group: {}'.format(self._topics, self._group_id)
@@ -66,7 +71,10 @@ class KafkaChangeFeed(ChangeFeed):
             raise ValueError("'since' must be None or a topic offset dictionary")
 
         # in milliseconds, -1 means wait forever for changes
-        timeout = -1 if forever else MIN_TIMEOUT
+        if forever:
+            timeout = self.heartbeat_ms or -1
+        else:
+            timeout = MIN_TIMEOUT
 
         start_from_latest = since is None
 
@@ -90,13 +98,18 @@ class KafkaChangeFeed(ChangeFeed):
             # this is how you tell the consumer to start from a certain point in the sequence
             consumer.set_topic_partitions(*offsets)
 
-        try:
-            for message in consumer:
-                self._processed_topic_offsets[(message.topic, message.partition)] = message.offset
-                yield change_from_kafka_message(message)
-        except ConsumerTimeout:
-            assert not forever, 'Kafka pillow should not timeout when waiting forever!'
-            # no need to do anything since this is just telling us we've reached the end of the feed
+        while True:
+            try:
+                for message in consumer:
+                    self._processed_topic_offsets[(message.topic, message.partition)] = message.offset
+                    yield change_from_kafka_message(message)
+            except ConsumerTimeout:
+                if forever and self.heartbeat_ms:
+                    yield None
+                    continue
+                assert not forever, 'Kafka pillow should not timeout when waiting forever!'
+                # no need to do anything since this is just telling us we've reached the end of the feed
+            break
 
     def get_current_checkpoint_offsets(self):
         # the way kafka works, the checkpoint should increment by 1 because
@@ -176,6 +189,8 @@ class KafkaCheckpointEventHandler(PillowCheckpointEventHandler):
 
     def fire_change_processed(self, change, context):
         if self.should_update_checkpoint(context):
+            # these are the offsets of the last change read from the feed, so this
+            # must only be fired once every change read so far has been processed
             updated_to = self.change_feed.get_current_checkpoint_offsets()
             self.update_checkpoint(updated_to)
             return True
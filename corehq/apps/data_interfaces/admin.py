@@ -16,7 +16,7 @@ class DomainCaseRuleRunAdmin(admin.ModelAdmin):
         'num_closes',
         'num_related_updates',
         'num_related_closes',
-        'dbs_completed',
+        'units_completed',
     ]
 
     search_fields = [
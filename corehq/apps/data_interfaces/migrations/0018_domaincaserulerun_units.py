@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2018-08-06 09:12
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_interfaces', '0017_alter_domaincaserulerun'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='domaincaserulerun',
+            old_name='dbs_completed',
+            new_name='units_completed',
+        ),
+        migrations.AddField(
+            model_name='domaincaserulerun',
+            name='units',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='domaincaserulerun',
+            name='cursors',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
+import json
 import jsonfield
 import pytz
 import re
@@ -62,6 +63,11 @@ ALLOWED_DATE_REGEX = re.compile('^\d{4}-\d{2}-\d{2}')
 AUTO_UPDATE_XMLNS = 'http://commcarehq.org/hq_case_update_rule'
 
 
+# Case properties with these names are read from the CommCareCaseSQL
+# columns rather than case_json, see CommCareCaseSQL.get_case_property
+_CASE_SQL_FIELD_NAMES = {field.name for field in CommCareCaseSQL._meta.fields} | {'_id'}
+
+
 def _try_date_conversion(date_or_string):
     if (
         isinstance(date_or_string, six.string_types) and
@@ -265,7 +271,41 @@ class AutomaticUpdateRule(models.Model):
             return cls._get_case_ids_from_es(domain, case_type, boundary_date=boundary_date)
 
     @classmethod
-    def _get_case_ids_from_postgres(cls, domain, case_type, boundary_date=None, db=None):
+    def get_case_ids_for_rules(cls, domain, case_type, rules, now, db=None, prefilter_timings=None):
+        """
+        Returns the ids, in order, of the cases that could match at least one
+        of the given rules, all of which must be for case_type.
+
+        For domains on the SQL backend the criteria that can be expressed in SQL
+        are applied in the database for each rule, so only the remaining criteria
+        have to be checked against each case in python. The result can still
+        include cases that don't match, but never leaves out a case that does.
+
+        :param prefilter_timings: optional dict which is updated with the number
+        of seconds spent querying for each rule, keyed by rule id
+        """
+        if not should_use_sql_backend(domain):
+            boundary_date = cls.get_boundary_date(rules, now)
+            return sorted(cls.get_case_ids(domain, case_type, boundary_date, db=db))
+
+        case_ids = set()
+        for rule in rules:
+            start = datetime.utcnow()
+            boundary_date = cls.get_boundary_date([rule], now)
+            case_ids.update(cls._get_case_ids_from_postgres(
+                domain,
+                case_type,
+                boundary_date=boundary_date,
+                db=db,
+                criteria_filters=rule.get_sql_criteria_filters(now),
+            ))
+            if prefilter_timings is not None:
+                prefilter_timings[rule.pk] = (datetime.utcnow() - start).total_seconds()
+
+        return sorted(case_ids)
+
+    @classmethod
+    def _get_case_ids_from_postgres(cls, domain, case_type, boundary_date=None, db=None, criteria_filters=None):
         q_expression = Q(
             domain=domain,
             type=case_type,
@@ -276,7 +316,16 @@ class AutomaticUpdateRule(models.Model):
         if boundary_date:
             q_expression = q_expression & Q(server_modified_on__lte=boundary_date)
 
-        if db:
+        if criteria_filters:
+            where = [where_clause for where_clause, params in criteria_filters]
+            params = [param for where_clause, params in criteria_filters for param in params]
+            for db_alias in ([db] if db else get_db_aliases_for_partitioned_query()):
+                queryset = (CommCareCaseSQL.objects.using(db_alias)
+                            .filter(q_expression)
+                            .extra(where=where, params=params))
+                for c_id in queryset.values_list('case_id', flat=True):
+                    yield c_id
+        elif db:
             for c_id in CommCareCaseSQL.objects.using(db).filter(q_expression).values_list('case_id', flat=True):
                 yield c_id
         else:
@@ -366,6 +415,21 @@ class AutomaticUpdateRule(models.Model):
         else:
             return self.run_actions_when_case_does_not_match(case)
 
+    def get_sql_criteria_filters(self, now):
+        """
+        Returns a list of (where_clause, params) tuples for the criteria that
+        can be checked against CommCareCaseSQL in the database. Criteria that
+        can't be translated are left out, so cases selected with these filters
+        must still be checked with criteria_match.
+        """
+        filters = []
+        for criteria in self.memoized_criteria:
+            sql_filter = criteria.definition.get_sql_filter(now)
+            if sql_filter:
+                filters.append(sql_filter)
+
+        return filters
+
     def criteria_match(self, case, now):
         if not self.migrated:
             raise self.MigrationError("Attempted to call new method on non-migrated model.")
@@ -522,6 +586,15 @@ class CaseRuleCriteriaDefinition(models.Model):
     def matches(self, case, now):
         raise NotImplementedError()
 
+    def get_sql_filter(self, now):
+        """
+        Returns a (where_clause, params) tuple that selects the rows of
+        CommCareCaseSQL which might match this criteria, or None if the
+        criteria can only be checked in python. The filter may select cases
+        that don't match, but must never leave out a case that does.
+        """
+        return None
+
 
 class MatchPropertyDefinition(CaseRuleCriteriaDefinition):
     # True when today < (the date in property_name + property_value days)
@@ -636,6 +709,43 @@ class MatchPropertyDefinition(CaseRuleCriteriaDefinition):
 
         return False
 
+    def _get_days_filter(self, now, operator, slack):
+        try:
+            days = int(self.property_value)
+        except (TypeError, ValueError):
+            return None
+
+        # Dates are compared on the YYYY-MM-DD prefix (see ALLOWED_DATE_REGEX)
+        # which allows for the time and timezone that check_days_* also take
+        # into account.
+        boundary = (now - timedelta(days=days) + slack).strftime('%Y-%m-%d')
+        return (
+            'left(case_json ->> %s, 10) COLLATE "C" {} %s'.format(operator),
+            [self.property_name, boundary]
+        )
+
+    def get_sql_filter(self, now):
+        if '/' in self.property_name or self.property_name in _CASE_SQL_FIELD_NAMES:
+            # parent and host references and case attributes stay in python
+            return None
+
+        if self.match_type in (self.MATCH_EQUAL, self.MATCH_NOT_EQUAL) and self.property_value is None:
+            return None
+
+        if self.match_type == self.MATCH_EQUAL:
+            return 'case_json @> %s::jsonb', [json.dumps({self.property_name: self.property_value})]
+        elif self.match_type == self.MATCH_NOT_EQUAL:
+            return 'NOT case_json @> %s::jsonb', [json.dumps({self.property_name: self.property_value})]
+        elif self.match_type == self.MATCH_HAS_VALUE:
+            # HAS_VALUE criteria are saved without a property_value
+            return "(case_json ->> %s) <> ''", [self.property_name]
+        elif self.match_type == self.MATCH_DAYS_AFTER:
+            return self._get_days_filter(now, '<=', timedelta(days=1))
+        elif self.match_type == self.MATCH_DAYS_BEFORE:
+            return self._get_days_filter(now, '>=', timedelta(days=-2))
+
+        return None
+
     def matches(self, case, now):
         return {
             self.MATCH_DAYS_BEFORE: self.check_days_before,
@@ -1415,15 +1525,91 @@ class DomainCaseRuleRun(models.Model):
     num_related_closes = models.IntegerField(default=0)
     num_creates = models.IntegerField(default=0)
 
-    dbs_completed = JSONField(default=list)
+    # Each run is split into units of work, one for each case type and db,
+    # which are processed in parallel. See get_unit.
+    units = JSONField(default=list)
+    units_completed = JSONField(default=list)
+
+    # The id of the last case processed for each unit that hasn't finished,
+    # so that a halted or crashed run can be resumed by the next run.
+    cursors = JSONField(default=dict)
 
     class Meta(object):
         index_together = (
             ('domain', 'started_on'),
         )
 
+    @staticmethod
+    def get_unit(case_type, db=None):
+        if db:
+            return '{}/{}'.format(db, case_type)
+        return case_type
+
+    @property
+    def total_updates(self):
+        return (
+            self.num_updates +
+            self.num_closes +
+            self.num_related_updates +
+            self.num_related_closes +
+            self.num_creates
+        )
+
+    @classmethod
+    def halt_unfinished_runs(cls, domain):
+        """
+        Marks the domain's runs that are still running as halted. Runs halt
+        on their own before the next daily run starts, so a run that is still
+        running by then has crashed, and is resumed like a halted run.
+        """
+        cls.objects.filter(domain=domain, status=cls.STATUS_RUNNING).update(
+            status=cls.STATUS_HALTED,
+            finished_on=datetime.utcnow(),
+        )
+
+    @classmethod
+    def get_resume_cursors(cls, domain):
+        """
+        Returns the cursors of the domain's last run if it was halted or crashed
+        before all of its units finished, otherwise an empty dict.
+
+        Crashed runs have to be marked as halted first, see halt_unfinished_runs.
+        """
+        last_run = cls.objects.filter(domain=domain).order_by('-started_on').first()
+        if last_run and last_run.status == cls.STATUS_HALTED:
+            return last_run.cursors
+
+        return {}
+
+    def _add_counts(self, cases_checked, result):
+        self.cases_checked += cases_checked
+        self.num_updates += result.num_updates
+        self.num_closes += result.num_closes
+        self.num_related_updates += result.num_related_updates
+        self.num_related_closes += result.num_related_closes
+        self.num_creates += result.num_creates
+
+    @classmethod
+    def checkpoint(cls, run_id, unit, cursor, cases_checked, result):
+        """
+        Adds the counts since the unit's last checkpoint to the run and saves
+        the id of the last case the unit processed.
+
+        :return: the run, whose total_updates includes the updates made by all
+        of its units so far
+        """
+        if not isinstance(result, CaseRuleActionResult):
+            raise TypeError("Expected an instance of CaseRuleActionResult")
+
+        with CriticalSection(['update-domain-case-rule-run-%s' % run_id]):
+            run = cls.objects.get(pk=run_id)
+            run._add_counts(cases_checked, result)
+            run.cursors[unit] = cursor
+            run.save()
+            return run
+
     @classmethod
-    def done(cls, run_id, status, cases_checked, result, db=None):
+    def done(cls, run_id, status, cases_checked, result, unit=None, cursor=None):
         if not isinstance(result, CaseRuleActionResult):
             raise TypeError("Expected an instance of CaseRuleActionResult")
 
@@ -1432,21 +1618,16 @@ class DomainCaseRuleRun(models.Model):
 
         with CriticalSection(['update-domain-case-rule-run-%s' % run_id]):
             run = cls.objects.get(pk=run_id)
+            run._add_counts(cases_checked, result)
 
-            run.cases_checked += cases_checked
-            run.num_updates += result.num_updates
-            run.num_closes += result.num_closes
-            run.num_related_updates += result.num_related_updates
-            run.num_related_closes += result.num_related_closes
-            run.num_creates += result.num_creates
-
-            if db:
-                run.dbs_completed.append(db)
-                all_dbs = get_db_aliases_for_partitioned_query()
+            if unit:
+                run.units_completed.append(unit)
+                if status == cls.STATUS_HALTED and cursor:
+                    run.cursors[unit] = cursor
+                else:
+                    run.cursors.pop(unit, None)
 
-                if set(all_dbs) == set(run.dbs_completed):
-                    run.finished_on = datetime.utcnow()
-            else:
+            if set(run.units) <= set(run.units_completed):
                 run.finished_on = datetime.utcnow()
 
             if status == cls.STATUS_HALTED:
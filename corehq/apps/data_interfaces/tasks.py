@@ -11,7 +11,9 @@ from corehq.apps.data_interfaces.models import (
 )
 from corehq.apps.domain_migration_flags.api import any_migrations_in_progress
 from corehq.apps.domain.models import Domain
+from corehq.util.datadog.gauges import datadog_histogram
 from corehq.util.decorators import serial_task
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from corehq.form_processor.interfaces.dbaccessors import CaseAccessors, FormAccessors
@@ -26,6 +28,7 @@ from corehq.sql_db.util import get_db_aliases_for_partitioned_query
 from .interfaces import FormManagementMode, BulkFormManagementInterface
 from .dispatcher import EditDataInterfaceDispatcher
 from corehq.util.log import send_HTML_email
+from dimagi.utils.chunked import chunked
 from dimagi.utils.couch import CriticalSection
 from dimagi.utils.logging import notify_error
 import six
@@ -34,6 +37,7 @@ import six
 logger = get_task_logger('data_interfaces')
 ONE_HOUR = 60 * 60
 HALT_AFTER = 23 * 60 * 60
+CHECKPOINT_INTERVAL = 1000
 
 
 @task(ignore_result=True)
@@ -85,7 +89,11 @@ def run_case_update_rules(now=None):
             run_case_update_rules_for_domain.delay(domain, now)
 
 
-def run_rules_for_case(case, rules, now):
+def run_rules_for_case(case, rules, now, rule_timings=None):
+    """
+    :param rule_timings: optional dict which is updated with the number of
+    seconds spent running each rule, keyed by rule id
+    """
     aggregated_result = CaseRuleActionResult()
     last_result = None
     for rule in rules:
@@ -97,7 +105,10 @@ def run_rules_for_case(case, rules, now):
             ):
                 case = CaseAccessors(case.domain).get_case(case.case_id)
 
+        start = datetime.utcnow()
         last_result = rule.run_rule(case, now)
+        if rule_timings is not None:
+            rule_timings[rule.pk] += (datetime.utcnow() - start).total_seconds()
         aggregated_result.add_result(last_result)
         if last_result.num_closes > 0:
             break
@@ -117,68 +128,116 @@ def check_data_migration_in_progress(domain, last_migration_check_time):
 def run_case_update_rules_for_domain(domain, now=None):
     now = now or datetime.utcnow()
 
+    rules = AutomaticUpdateRule.by_domain(domain, AutomaticUpdateRule.WORKFLOW_CASE_UPDATE)
+    case_types = sorted(set(rule.case_type for rule in rules))
+    if should_use_sql_backend(domain):
+        dbs = get_db_aliases_for_partitioned_query()
+    else:
+        dbs = [None]
+    units = [(case_type, db) for db in dbs for case_type in case_types]
+
+    DomainCaseRuleRun.halt_unfinished_runs(domain)
     run_record = DomainCaseRuleRun.objects.create(
         domain=domain,
         started_on=datetime.utcnow(),
         status=DomainCaseRuleRun.STATUS_RUNNING,
+        units=[DomainCaseRuleRun.get_unit(case_type, db=db) for case_type, db in units],
+        # pick up where the last run left off if it didn't finish
+        cursors=DomainCaseRuleRun.get_resume_cursors(domain),
     )
 
-    if should_use_sql_backend(domain):
-        for db in get_db_aliases_for_partitioned_query():
-            run_case_update_rules_for_domain_and_db.delay(domain, now, run_record.pk, db=db)
-    else:
-        # explicitly pass db=None so that the serial task decorator has access to db in the key generation
-        run_case_update_rules_for_domain_and_db.delay(domain, now, run_record.pk, db=None)
+    if not units:
+        DomainCaseRuleRun.done(run_record.pk, DomainCaseRuleRun.STATUS_FINISHED, 0, CaseRuleActionResult())
+        return
+
+    for case_type, db in units:
+        # explicitly pass db so that the serial task decorator has access to db in the key generation
+        run_case_update_rules_for_domain_and_db.delay(domain, now, run_record.pk, case_type, db=db)
 
 
 @serial_task(
-    '{domain}-{db}',
-    timeout=36 * 60 * 60,
+    '{domain}-{db}-{case_type}',
+    # a little longer than HALT_AFTER, so that the lock of a task that crashed
+    # expires before the next daily run
+    timeout=HALT_AFTER + 30 * 60,
     max_retries=0,
     queue='case_rule_queue',
 )
-def run_case_update_rules_for_domain_and_db(domain, now, run_id, db=None):
+def run_case_update_rules_for_domain_and_db(domain, now, run_id, case_type, db=None):
     domain_obj = Domain.get_by_name(domain)
     max_allowed_updates = domain_obj.auto_case_update_limit or settings.MAX_RULE_UPDATES_IN_ONE_RUN
     start_run = datetime.utcnow()
+    unit = DomainCaseRuleRun.get_unit(case_type, db=db)
+
+    run = DomainCaseRuleRun.objects.get(pk=run_id)
+    cursor = run.cursors.get(unit)
+    # the updates made by all units of the run, as of the last checkpoint
+    total_updates = run.total_updates
 
     last_migration_check_time = None
     cases_checked = 0
     case_update_result = CaseRuleActionResult()
 
     all_rules = list(AutomaticUpdateRule.by_domain(domain, AutomaticUpdateRule.WORKFLOW_CASE_UPDATE))
-    rules_by_case_type = AutomaticUpdateRule.organize_rules_by_case_type(all_rules)
-
-    for case_type, rules in six.iteritems(rules_by_case_type):
-        boundary_date = AutomaticUpdateRule.get_boundary_date(rules, now)
-        case_ids = list(AutomaticUpdateRule.get_case_ids(domain, case_type, boundary_date, db=db))
-
-        for case in CaseAccessors(domain).iter_cases(case_ids):
+    rules = [rule for rule in all_rules if rule.case_type == case_type]
+    prefilter_timings = {}
+    rule_timings = defaultdict(float)
+
+    case_ids = AutomaticUpdateRule.get_case_ids_for_rules(
+        domain, case_type, rules, now, db=db, prefilter_timings=prefilter_timings)
+    if cursor:
+        case_ids = [case_id for case_id in case_ids if case_id > cursor]
+
+    case_accessor = CaseAccessors(domain)
+    for case_ids_chunk in chunked(case_ids, 100):
+        # ordered so that the cursor is always the last case processed
+        for case in case_accessor.get_cases(list(case_ids_chunk), ordered=True):
             migration_in_progress, last_migration_check_time = check_data_migration_in_progress(domain,
                 last_migration_check_time)
 
             time_elapsed = datetime.utcnow() - start_run
             if (
                 time_elapsed.seconds > HALT_AFTER or
-                case_update_result.total_updates >= max_allowed_updates or
+                total_updates + case_update_result.total_updates >= max_allowed_updates or
                 migration_in_progress
             ):
                 DomainCaseRuleRun.done(run_id, DomainCaseRuleRun.STATUS_HALTED, cases_checked, case_update_result,
-                    db=db)
+                    unit=unit, cursor=cursor)
+                _record_rule_timings(domain, prefilter_timings, rule_timings)
                 notify_error("Halting rule run for domain %s." % domain)
                 return
 
-            case_update_result.add_result(run_rules_for_case(case, rules, now))
+            result = run_rules_for_case(case, rules, now, rule_timings=rule_timings)
+            case_update_result.add_result(result)
             cases_checked += 1
+            cursor = case.case_id
+
+            # Save progress often enough that a crashed run loses little work, and
+            # after every update so that other units see it in the update limit
+            if result.total_updates > 0 or cases_checked >= CHECKPOINT_INTERVAL:
+                run = DomainCaseRuleRun.checkpoint(run_id, unit, cursor, cases_checked, case_update_result)
+                total_updates = run.total_updates
+                cases_checked = 0
+                case_update_result = CaseRuleActionResult()
 
     run = DomainCaseRuleRun.done(run_id, DomainCaseRuleRun.STATUS_FINISHED, cases_checked, case_update_result,
-        db=db)
+        unit=unit)
+    _record_rule_timings(domain, prefilter_timings, rule_timings)
 
     if run.status == DomainCaseRuleRun.STATUS_FINISHED:
         for rule in all_rules:
             AutomaticUpdateRule.objects.filter(pk=rule.pk).update(last_run=now)
 
 
+def _record_rule_timings(domain, prefilter_timings, rule_timings):
+    for metric, timings in [
+        ('commcare.case_update_rules.prefilter_seconds', prefilter_timings),
+        ('commcare.case_update_rules.evaluation_seconds', rule_timings),
+    ]:
+        for rule_id, seconds in six.iteritems(timings):
+            datadog_histogram(metric, seconds, tags=['domain:{}'.format(domain), 'rule_id:{}'.format(rule_id)])
+
+
 @task(queue='background_queue', acks_late=True, ignore_result=True)
 def run_case_update_rules_on_save(case):
     key = 'case-update-on-save-case-{case}'.format(case=case.case_id)
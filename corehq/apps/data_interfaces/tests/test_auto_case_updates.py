@@ -24,7 +24,7 @@ from corehq.apps.data_interfaces.models import (
 )
 from corehq.apps.data_interfaces.tasks import run_case_update_rules_for_domain
 from corehq.apps.domain.models import Domain
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 from corehq.form_processor.backends.sql.dbaccessors import CaseAccessorSQL
 from corehq.form_processor.interfaces.dbaccessors import CaseAccessors, FormAccessors
@@ -32,6 +32,7 @@ from corehq.form_processor.tests.utils import (run_with_all_backends, FormProces
     set_case_property_directly)
 from corehq.form_processor.utils.general import should_use_sql_backend
 from corehq.form_processor.signals import sql_case_post_save
+from corehq.sql_db.util import get_db_aliases_for_partitioned_query
 
 from corehq.util.test_utils import set_parent_case as set_actual_parent_case, update_case
 from django.test import TestCase, override_settings
@@ -1568,7 +1569,8 @@ class CaseRuleEndToEndTests(BaseCaseRuleTest):
         definition.save()
 
         with _with_case(self.domain, 'person', datetime.utcnow()) as case:
-            with patch('corehq.apps.data_interfaces.models.AutomaticUpdateRule.get_case_ids') as case_ids_patch:
+            with patch('corehq.apps.data_interfaces.models.AutomaticUpdateRule.get_case_ids_for_rules') \
+                    as case_ids_patch:
                 case_ids_patch.return_value = [case.case_id]
                 self.assertRuleRunCount(0)
 
@@ -1593,6 +1595,135 @@ class CaseRuleEndToEndTests(BaseCaseRuleTest):
                 self.assertRuleRunCount(3)
                 self.assertLastRuleRun(1)
 
+    @run_with_all_backends
+    def test_resume_halted_run(self):
+        _create_empty_rule(self.domain)
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as case1, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case2:
+            first_case_id, second_case_id = sorted([case1.case_id, case2.case_id])
+            if should_use_sql_backend(self.domain):
+                dbs = get_db_aliases_for_partitioned_query()
+            else:
+                dbs = [None]
+
+            # a run that halted after checking the first case
+            DomainCaseRuleRun.objects.create(
+                domain=self.domain,
+                started_on=datetime.utcnow() - timedelta(days=1),
+                finished_on=datetime.utcnow() - timedelta(days=1),
+                status=DomainCaseRuleRun.STATUS_HALTED,
+                cursors={DomainCaseRuleRun.get_unit('person', db=db): first_case_id for db in dbs},
+            )
+
+            with patch('corehq.apps.data_interfaces.models.AutomaticUpdateRule.get_case_ids_for_rules') \
+                    as case_ids_patch:
+                case_ids_patch.return_value = [first_case_id, second_case_id]
+                run_case_update_rules_for_domain(self.domain)
+                self.assertLastRuleRun(1)
+
+                # the resumed run finished, so the next one starts from the beginning
+                run_case_update_rules_for_domain(self.domain)
+                self.assertLastRuleRun(2)
+
+    @run_with_all_backends
+    def test_resume_crashed_run(self):
+        _create_empty_rule(self.domain)
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as case1, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case2:
+            first_case_id, second_case_id = sorted([case1.case_id, case2.case_id])
+            if should_use_sql_backend(self.domain):
+                dbs = get_db_aliases_for_partitioned_query()
+            else:
+                dbs = [None]
+
+            # the previous daily run crashed after checking the first case
+            crashed_run = DomainCaseRuleRun.objects.create(
+                domain=self.domain,
+                started_on=datetime.utcnow() - timedelta(days=1),
+                status=DomainCaseRuleRun.STATUS_RUNNING,
+                cursors={DomainCaseRuleRun.get_unit('person', db=db): first_case_id for db in dbs},
+            )
+
+            with patch('corehq.apps.data_interfaces.models.AutomaticUpdateRule.get_case_ids_for_rules') \
+                    as case_ids_patch:
+                case_ids_patch.return_value = [first_case_id, second_case_id]
+                run_case_update_rules_for_domain(self.domain)
+                self.assertLastRuleRun(1)
+
+                crashed_run = DomainCaseRuleRun.objects.get(pk=crashed_run.pk)
+                self.assertEqual(crashed_run.status, DomainCaseRuleRun.STATUS_HALTED)
+                self.assertIsNotNone(crashed_run.finished_on)
+
+    @override_settings(TESTS_SHOULD_USE_SQL_BACKEND=True)
+    def test_sql_criteria_filters(self):
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='do_update',
+            property_value='Y',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='last_visit_date',
+            property_value='30',
+            match_type=MatchPropertyDefinition.MATCH_DAYS_AFTER,
+        )
+        # not translated to SQL, so every case that passes the other criteria is selected
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='parent/status',
+            property_value='open',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        now = datetime(2018, 2, 1)
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as match, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as no_update, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as recent_visit:
+            for case, properties in [
+                (match, {'do_update': 'Y', 'last_visit_date': '2017-12-20'}),
+                (no_update, {'do_update': 'N', 'last_visit_date': '2017-12-20'}),
+                (recent_visit, {'do_update': 'Y', 'last_visit_date': '2018-01-25'}),
+            ]:
+                hqcase.utils.update_case(self.domain, case.case_id, case_properties=properties)
+
+            prefilter_timings = {}
+            case_ids = AutomaticUpdateRule.get_case_ids_for_rules(
+                self.domain, 'person', [rule], now, prefilter_timings=prefilter_timings)
+            self.assertEqual([match.case_id], case_ids)
+            self.assertEqual([rule.pk], list(prefilter_timings))
+
+    @override_settings(TESTS_SHOULD_USE_SQL_BACKEND=True)
+    def test_sql_has_value_filter(self):
+        rule = _create_empty_rule(self.domain)
+        # saved the way the rule criteria form saves it
+        _, definition = rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='result',
+            property_value=None,
+            match_type=MatchPropertyDefinition.MATCH_HAS_VALUE,
+        )
+        self.assertIsNotNone(definition.get_sql_filter(datetime.utcnow()))
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as has_value, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as empty_value, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as no_value:
+            for case, properties in [
+                (has_value, {'result': 'abc'}),
+                (empty_value, {'result': ''}),
+                (no_value, {'other': 'abc'}),
+            ]:
+                hqcase.utils.update_case(self.domain, case.case_id, case_properties=properties)
+
+            prefilter_timings = {}
+            case_ids = AutomaticUpdateRule.get_case_ids_for_rules(
+                self.domain, 'person', [rule], datetime.utcnow(), prefilter_timings=prefilter_timings)
+            self.assertEqual([has_value.case_id], case_ids)
+            self.assertEqual([rule.pk], list(prefilter_timings))
+
 
 class TestParentCaseReferences(BaseCaseRuleTest):
 
@@ -87,6 +87,8 @@ FORM_EXPORT = 'form'
 CASE_EXPORT = 'case'
 SMS_EXPORT = 'sms'
 MAX_EXPORTABLE_ROWS = 100000
+# number of documents whose rows are computed and written together
+EXPORT_DOCUMENT_BATCH_SIZE = 100
 CASE_SCROLL_SIZE = 10000
 
 # When a question is missing completely from a form/case this should be the value
@@ -10,6 +10,7 @@ import datetime
 
 from couchdbkit import ResourceConflict
 
+from dimagi.utils.chunked import chunked
 from dimagi.utils.logging import notify_exception
 from soil import DownloadBase
 
@@ -29,7 +30,7 @@ from corehq.apps.export.models.new import (
     FormExportInstance,
     SMSExportInstance,
 )
-from corehq.apps.export.const import MAX_EXPORTABLE_ROWS
+from corehq.apps.export.const import MAX_EXPORTABLE_ROWS, EXPORT_DOCUMENT_BATCH_SIZE
 import six
 from io import open
 
@@ -110,7 +111,16 @@ class _ExportWriter(object):
         :param table: A TableConfiguration
         :param row: An ExportRow
         """
-        return self.writer.write([(table, [FormattedRow(data=row.data)])])
+        return self.write_rows(table, [row])
+
+    def write_rows(self, table, rows):
+        """
+        Write the given rows to the given table of the export.
+        _Writer must be opened first.
+        :param table: A TableConfiguration
+        :param rows: A list of ExportRows
+        """
+        return self.writer.write([(table, [FormattedRow(data=row.data) for row in rows])])
 
     def get_preview(self):
         return self.writer.get_preview()
@@ -252,16 +262,30 @@ class _PaginatedExportWriter(object):
         :param table: A TableConfiguration
         :param row: An ExportRow
         """
-        if self.rows_written[table] >= MAX_EXPORTABLE_ROWS * (self.pages[table] + 1):
-            self.pages[table] += 1
-            self.writer.add_table(
-                self._paged_table_index(table),
-                self._get_paginated_headers()[self._paged_table_index(table)][0],
-                table_title=self._get_paginated_table_titles()[self._paged_table_index(table)],
-            )
+        self.write_rows(table, [row])
 
-        self.writer.write([(self._paged_table_index(table), [FormattedRow(data=row.data)])])
-        self.rows_written[table] += 1
+    def write_rows(self, table, rows):
+        """
+        Write the given rows to the given table of the export, splitting
+        them across pages as needed.
+        :param table: A TableConfiguration
+        :param rows: A list of ExportRows
+        """
+        while rows:
+            if self.rows_written[table] >= MAX_EXPORTABLE_ROWS * (self.pages[table] + 1):
+                self.pages[table] += 1
+                self.writer.add_table(
+                    self._paged_table_index(table),
+                    self._get_paginated_headers()[self._paged_table_index(table)][0],
+                    table_title=self._get_paginated_table_titles()[self._paged_table_index(table)],
+                )
+
+            page_capacity = MAX_EXPORTABLE_ROWS * (self.pages[table] + 1) - self.rows_written[table]
+            page_rows, rows = rows[:page_capacity], rows[page_capacity:]
+            self.writer.write([
+                (self._paged_table_index(table), [FormattedRow(data=row.data) for row in page_rows])
+            ])
+            self.rows_written[table] += len(page_rows)
 
 
 def get_export_writer(export_instances, temp_path, allow_pagination=True):
@@ -343,39 +367,24 @@ def write_export_instance(writer, export_instance, documents, progress_tracker=N
     compute_total = 0
     write_total = 0
 
-    for row_number, doc in enumerate(documents):
-        total_bytes += sys.getsizeof(doc)
+    row_number = 0
+    for batch in chunked(documents, EXPORT_DOCUMENT_BATCH_SIZE):
+        for doc in batch:
+            total_bytes += sys.getsizeof(doc)
         for table in export_instance.selected_tables:
             compute_start = _time_in_milliseconds()
-            try:
-                rows = table.get_rows(
-                    doc,
-                    row_number,
-                    split_columns=export_instance.split_multiselects,
-                    transform_dates=export_instance.transform_dates,
-                )
-            except Exception as e:
-                notify_exception(None, "Error exporting doc", details={
-                    'domain': export_instance.domain,
-                    'export_instance_id': export_instance.get_id,
-                    'export_table': table.label,
-                    'doc_id': doc.get('_id'),
-                })
-                e.sentry_capture = False
-                raise
+            rows = _get_export_rows(export_instance, table, batch, row_number)
             compute_total += _time_in_milliseconds() - compute_start
 
             write_start = _time_in_milliseconds()
-            for row in rows:
-                # It might be bad to write one row at a time when you can do more (from a performance perspective)
-                # Regardless, we should handle the batching of rows in the _Writer class, not here.
-                writer.write(table, row)
+            writer.write_rows(table, rows)
             write_total += _time_in_milliseconds() - write_start
 
             total_rows += len(rows)
 
+        row_number += len(batch)
         if progress_tracker:
-            DownloadBase.set_progress(progress_tracker, row_number + 1, documents.count)
+            DownloadBase.set_progress(progress_tracker, row_number, documents.count)
 
     end = _time_in_milliseconds()
     tags = ['format:{}'.format(writer.format)]
@@ -384,6 +393,41 @@ def write_export_instance(writer, export_instance, documents, progress_tracker=N
     _record_datadog_export_duration(end - start, total_bytes, total_rows, tags)
 
 
+def _get_export_rows(export_instance, table, documents, start_row_number):
+    try:
+        return table.get_rows_for_documents(
+            documents,
+            start_row_number,
+            split_columns=export_instance.split_multiselects,
+            transform_dates=export_instance.transform_dates,
+        )
+    except Exception:
+        # redo the batch one document at a time to report the one that failed
+        return _get_export_rows_by_document(export_instance, table, documents, start_row_number)
+
+
+def _get_export_rows_by_document(export_instance, table, documents, start_row_number):
+    rows = []
+    for row_number, doc in enumerate(documents, start_row_number):
+        try:
+            rows.extend(table.get_rows(
+                doc,
+                row_number,
+                split_columns=export_instance.split_multiselects,
+                transform_dates=export_instance.transform_dates,
+            ))
+        except Exception as e:
+            notify_exception(None, "Error exporting doc", details={
+                'domain': export_instance.domain,
+                'export_instance_id': export_instance.get_id,
+                'export_table': table.label,
+                'doc_id': doc.get('_id'),
+            })
+            e.sentry_capture = False
+            raise
+    return rows
+
+
 def _time_in_milliseconds():
     return int(time.time() * 1000)
 
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from itertools import chain
+import multiprocessing
+import resource
+import tempfile
+import time
+
+from django.core.management import BaseCommand
+import openpyxl
+from openpyxl.styles import numbers
+from openpyxl.worksheet.write_only import WriteOnlyCell
+from six.moves import range
+
+from couchexport.writers import Excel2007ExportWriter
+
+
+class Command(BaseCommand):
+    """Compare peak memory and speed of the streaming XLSX export writer with
+    the previous approach of building the workbook with openpyxl.
+
+    Each writer runs in its own process so that peak RSS can be compared.
+
+    Usage: ./manage.py benchmark_excel_writer --rows 1000000
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--columns', type=int, default=20)
+        parser.add_argument('--format-as-text', action='store_true', default=False)
+
+    def handle(self, rows, columns, format_as_text, **options):
+        for name, func in [('openpyxl', _write_openpyxl), ('streaming', _write_streaming)]:
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_run, args=(queue, func, rows, columns, format_as_text)
+            )
+            process.start()
+            duration, max_rss_kb = queue.get()
+            process.join()
+            print("{:<10} {:.1f}s {:.0f} rows/s peak RSS {:.1f} MB".format(
+                name, duration, rows / duration, max_rss_kb / 1024
+            ))
+
+
+def _run(queue, func, rows, columns, format_as_text):
+    with tempfile.TemporaryFile() as file_:
+        start = time.time()
+        func(file_, _iter_rows(rows, columns), columns, format_as_text)
+        duration = time.time() - start
+    queue.put((duration, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def _iter_rows(rows, columns):
+    for i in range(rows):
+        # mix of unique strings, repeated strings and numbers like a form export
+        yield [
+            'value-{}-{}'.format(i, column) if column % 3 == 0
+            else 'choice{}'.format(column) if column % 3 == 1
+            else i * column
+            for column in range(columns)
+        ]
+
+
+def _write_streaming(file_, rows, columns, format_as_text):
+    writer = Excel2007ExportWriter(format_as_text=format_as_text)
+    writer.open([('table', [['column{}'.format(i) for i in range(columns)]])], file_)
+    for row in rows:
+        writer.write([('table', [row])])
+    writer.close()
+
+
+def _write_openpyxl(file_, rows, columns, format_as_text):
+    # replicates the former Excel2007ExportWriter implementation
+    book = openpyxl.Workbook(write_only=True)
+    sheet = book.create_sheet()
+    sheet.title = 'table'
+    for row in chain([['column{}'.format(i) for i in range(columns)]], rows):
+        cells = [WriteOnlyCell(sheet, value) for value in row]
+        if format_as_text:
+            for cell in cells:
+                cell.number_format = numbers.FORMAT_TEXT
+        sheet.append(cells)
+    book.save(file_)
@@ -263,10 +263,35 @@ class ExportColumn(DocumentSchema):
             not split the column
         :return:
         """
-        assert base_path == self.item.path[:len(base_path)], "ExportItem's path doesn't start with the base_path"
+        return self._transform(self._get_relative_getter(tuple(base_path))(doc), doc, transform_dates)
+
+    def get_values(self, sub_documents, base_path, transform_dates=False, split_column=False):
+        """
+        Get the values of this column for a batch of documents.
+        :param sub_documents: A list of ExportSubDocuments
+        :param base_path: The PathNode list to the column
+        :return: A list with the value for each of the sub_documents, as returned by get_value
+        """
+        return [
+            self.get_value(
+                sub_document.domain,
+                sub_document.doc_id,
+                sub_document.doc,
+                base_path,
+                transform_dates=transform_dates,
+                row_index=sub_document.row,
+                split_column=split_column,
+            )
+            for sub_document in sub_documents
+        ]
+
+    @memoized
+    def _get_relative_getter(self, base_path):
+        assert list(base_path) == self.item.path[:len(base_path)], \
+            "ExportItem's path doesn't start with the base_path"
         # Get the path from the doc root to the desired ExportItem
         path = [x.name for x in self.item.path[len(base_path):]]
-        return self._transform(NestedDictGetter(path)(doc), doc, transform_dates)
+        return NestedDictGetter(path)
 
     def _transform(self, value, doc, transform_dates):
         """
@@ -442,6 +467,12 @@ class DocRow(namedtuple("DocRow", ["doc", "row"])):
     """
 
 
+class ExportSubDocument(namedtuple("ExportSubDocument", ["domain", "doc_id", "doc", "row"])):
+    """
+    A DocRow along with the domain and id of the form or case it was taken from
+    """
+
+
 class TableConfiguration(DocumentSchema):
     """
     The TableConfiguration represents one excel sheet in an export.
@@ -479,30 +510,53 @@ class TableConfiguration(DocumentSchema):
         :param row_number: number indicating this documents index in the sequence of all documents in the export
         :return: List of ExportRows
         """
-        document_id = document.get('_id')
+        return self.get_rows_for_documents(
+            [document],
+            row_number,
+            split_columns=split_columns,
+            transform_dates=transform_dates,
+        )
+
+    def get_rows_for_documents(self, documents, start_row_number, split_columns=False, transform_dates=False):
+        """
+        Return a list of ExportRows generated for a batch of documents.
+        Values are computed a column at a time for the whole batch.
+        :param documents: list of dictionary representations of form submissions or cases
+        :param start_row_number: number indicating the first document's index in the sequence
+            of all documents in the export
+        :return: List of ExportRows, in the order of the documents
+        """
+        sub_documents = []
+        for row_number, document in enumerate(documents, start_row_number):
+            document_id = document.get('_id')
 
-        sub_documents = self._get_sub_documents(document, row_number, document_id=document_id)
+            doc_rows = self._get_sub_documents(document, row_number, document_id=document_id)
 
-        domain = document.get('domain')
+            domain = document.get('domain')
 
-        assert domain is not None, 'Form or Case must be associated with domain'
-        assert document_id is not None, 'Form or Case must have an id'
+            assert domain is not None, 'Form or Case must be associated with domain'
+            assert document_id is not None, 'Form or Case must have an id'
 
-        rows = []
-        for doc_row in sub_documents:
-            doc, row_index = doc_row.doc, doc_row.row
+            sub_documents.extend(
+                ExportSubDocument(domain, document_id, doc_row.doc, doc_row.row)
+                for doc_row in doc_rows
+            )
+
+        column_values = [
+            col.get_values(
+                sub_documents,
+                self.path,
+                split_column=split_columns,
+                transform_dates=transform_dates,
+            )
+            for col in self.selected_columns
+        ]
 
+        rows = []
+        for index in range(len(sub_documents)):
             row_data = []
-            for col in self.selected_columns:
-                val = col.get_value(
-                    domain,
-                    document_id,
-                    doc,
-                    self.path,
-                    row_index=row_index,
-                    split_column=split_columns,
-                    transform_dates=transform_dates,
-                )
+            for values in column_values:
+                val = values[index]
                 if isinstance(val, list):
                     row_data.extend(val)
                 else:
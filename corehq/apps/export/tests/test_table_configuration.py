@@ -338,3 +338,50 @@ class TableConfigurationGetRowsTest(SimpleTestCase):
         self.assertEqual(
             [row.data for row in table_configuration.get_rows(submission, 0)], []
         )
+
+    def test_get_rows_for_documents(self):
+        table_configuration = TableConfiguration(
+            path=[PathNode(name="form", is_repeat=False), PathNode(name="repeat1", is_repeat=True)],
+            columns=[
+                RowNumberColumn(
+                    selected=True
+                ),
+                ExportColumn(
+                    item=ScalarItem(
+                        path=[
+                            PathNode(name="form"),
+                            PathNode(name="repeat1", is_repeat=True),
+                            PathNode(name="q1")
+                        ],
+                    ),
+                    selected=True,
+                ),
+            ]
+        )
+        submissions = [
+            {
+                'domain': 'my-domain',
+                '_id': '1234',
+                'form': {
+                    'repeat1': [
+                        {'q1': 'foo'},
+                        {'q1': 'bar'}
+                    ]
+                }
+            },
+            {
+                'domain': 'my-domain',
+                '_id': '5678',
+                'form': {
+                    'repeat1': {'q1': 'beep'}
+                }
+            },
+        ]
+        self.assertEqual(
+            [row.data for row in table_configuration.get_rows_for_documents(submissions, 3)],
+            [
+                ["3.0", 3, 0, 'foo'],
+                ["3.1", 3, 1, 'bar'],
+                ["4.0", 4, 0, 'beep'],
+            ]
+        )
@@ -1,18 +1,20 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 from collections import defaultdict
+import hashlib
+from operator import attrgetter
 from xml.etree import cElementTree as ElementTree
 from io import BytesIO
 
 from casexml.apps.phone.fixtures import FixtureProvider
 from casexml.apps.phone.utils import ITEMS_COMMENT_PREFIX
-from corehq.apps.fixtures.models import FixtureDataItem, FixtureDataType, FIXTURE_BUCKET
+from corehq.apps.fixtures.models import FixtureDataItem, FixtureDataType
 from corehq.apps.products.fixtures import product_fixture_generator_json
 from corehq.apps.programs.fixtures import program_fixture_generator_json
 from corehq.blobs import get_blob_db
 from corehq.blobs.exceptions import NotFound
 
-from .utils import get_index_schema_node
+from .utils import get_fixture_bucket, get_fixture_data_type_versions, get_index_schema_node
 
 # GLOBAL_USER_ID is expected to be a globally unique string that will never
 # change and can always be search-n-replaced in global fixture XML. The UUID
@@ -22,6 +24,10 @@ from .utils import get_index_schema_node
 # This is an optimization to avoid an extra XML parse/serialize cycle.
 GLOBAL_USER_ID = 'global-user-id-7566F038-5000-4419-B3EF-5349FB2FF2E9'
 
+# minutes; cached user-owned items are keyed by the set of items owned so
+# entries for old ownership sets are never read again
+USER_ITEMS_CACHE_TIMEOUT = 7 * 24 * 60
+
 
 def item_lists_by_domain(domain):
     ret = list()
@@ -70,53 +76,101 @@ class ItemListsProvider(FixtureProvider):
         if global_types:
             items.extend(self.get_global_items(global_types, restore_state))
         if user_types:
-            items.extend(self.get_user_items(user_types, restore_user))
+            items.extend(self.get_user_items(user_types, restore_state))
         return items
 
     def get_global_items(self, global_types, restore_state):
+        """
+        Each global data type is cached separately so that a change to one
+        table doesn't require regenerating the others. Cached fragments are
+        returned as bytes and written to the restore as is.
+        """
         restore_user = restore_state.restore_user
-        user_id = restore_user.user_id
         domain = restore_user.domain
         db = get_blob_db()
+        versions = get_fixture_data_type_versions(domain, global_types)
+        identifiers = {
+            data_type_id: _get_cache_identifier(data_type, versions[data_type_id])
+            for data_type_id, data_type in global_types.items()
+        }
+        cached = {}
         if not restore_state.overwrite_cache:
-            global_id = GLOBAL_USER_ID.encode('utf-8')
-            b_user_id = user_id.encode('utf-8')
-            try:
-                data = db.get(domain, FIXTURE_BUCKET).read()
-                return [data.replace(global_id, b_user_id)] if data else []
-            except NotFound:
-                pass
-        global_items = self._get_global_items(global_types, domain)
-        io = BytesIO()
-        io.write(ITEMS_COMMENT_PREFIX)
-        io.write(bytes(len(global_items)))
-        io.write(b'-->')
-        for element in global_items:
-            io.write(ElementTree.tostring(element, encoding='utf-8'))
-            # change user_id AFTER writing to string for the cache
-            element.attrib["user_id"] = user_id
-        io.seek(0)
-        db.put(io, domain, FIXTURE_BUCKET)
-        return global_items
-
-    def _get_global_items(self, global_types, domain):
+            for data_type_id, identifier in identifiers.items():
+                try:
+                    cached[data_type_id] = db.get(identifier, get_fixture_bucket(domain, data_type_id)).read()
+                except NotFound:
+                    pass
+
+        uncached_types = {
+            data_type_id: data_type
+            for data_type_id, data_type in global_types.items()
+            if data_type_id not in cached
+        }
+        if uncached_types:
+            items_by_type = self._get_global_items_by_type(uncached_types, domain)
+
+        items = []
+        for data_type in sorted(global_types.values(), key=attrgetter('tag')):
+            if data_type._id in cached:
+                items.append(_replace_user_id(cached[data_type._id], restore_user.user_id))
+                continue
+            fixtures = self._get_fixtures(
+                {data_type._id: data_type},
+                {data_type: items_by_type[data_type]},
+                GLOBAL_USER_ID
+            )
+            db.put(
+                _get_cacheable_fixtures(fixtures, restore_user.user_id),
+                identifiers[data_type._id],
+                get_fixture_bucket(domain, data_type._id),
+            )
+            items.extend(fixtures)
+        return items
+
+    def _get_global_items_by_type(self, global_types, domain):
         items_by_type = defaultdict(list)
         for item in FixtureDataItem.by_data_types(domain, global_types):
             data_type = global_types[item.data_type_id]
             self._set_cached_type(item, data_type)
             items_by_type[data_type].append(item)
-        return self._get_fixtures(global_types, items_by_type, GLOBAL_USER_ID)
+        return items_by_type
+
+    def get_user_items(self, user_types, restore_state):
+        """
+        User-owned items are cached for each distinct set of owned items, so
+        users that own the same items (e.g. through a group or location)
+        share the cached XML.
+        """
+        restore_user = restore_state.restore_user
+        domain = restore_user.domain
+        db = get_blob_db()
+        item_ids = restore_user.get_fixture_data_item_ids()
+        versions = get_fixture_data_type_versions(domain, user_types)
+        identifier = _get_user_items_cache_identifier(user_types, versions, item_ids)
+        bucket = get_fixture_bucket(domain)
+        if not restore_state.overwrite_cache:
+            try:
+                data = db.get(identifier, bucket).read()
+                return [_replace_user_id(data, restore_user.user_id)]
+            except NotFound:
+                pass
 
-    def get_user_items(self, user_types, restore_user):
         items_by_type = defaultdict(list)
-        for item in restore_user.get_fixture_data_items():
+        for item in FixtureDataItem.by_owned_ids(domain, item_ids):
             try:
                 data_type = user_types[item.data_type_id]
             except KeyError:
                 continue
             self._set_cached_type(item, data_type)
             items_by_type[data_type].append(item)
-        return self._get_fixtures(user_types, items_by_type, restore_user.user_id)
+        fixtures = self._get_fixtures(user_types, items_by_type, GLOBAL_USER_ID)
+        db.put(
+            _get_cacheable_fixtures(fixtures, restore_user.user_id),
+            identifier,
+            bucket,
+            timeout=USER_ITEMS_CACHE_TIMEOUT,
+        )
+        return fixtures
 
     def _set_cached_type(self, item, data_type):
         # set the cached version used by the object so that it doesn't
@@ -163,4 +217,42 @@ class ItemListsProvider(FixtureProvider):
         return get_index_schema_node(fixture_id, attrs_to_index)
 
 
+def _get_cache_identifier(data_type, version):
+    # the revision changes when the table's fields are edited and the
+    # version when its items are changed
+    return '{}-{}'.format(data_type._rev, version)
+
+
+def _get_user_items_cache_identifier(user_types, versions, item_ids):
+    hash_ = hashlib.md5()
+    for data_type_id in sorted(user_types):
+        identifier = _get_cache_identifier(user_types[data_type_id], versions[data_type_id])
+        hash_.update('{}:{}'.format(data_type_id, identifier).encode('utf-8'))
+    for item_id in sorted(item_ids):
+        hash_.update(item_id.encode('utf-8'))
+    return hash_.hexdigest()
+
+
+def _get_cacheable_fixtures(fixtures, user_id):
+    """
+    Serialize fixture elements for the cache with their item count, then set
+    ``user_id`` on the elements for the current restore
+    """
+    io = BytesIO()
+    io.write(ITEMS_COMMENT_PREFIX)
+    io.write('{}'.format(len(fixtures)).encode('ascii'))
+    io.write(b'-->')
+    for element in fixtures:
+        io.write(ElementTree.tostring(element, encoding='utf-8'))
+        # change user_id AFTER writing to string for the cache
+        if 'user_id' in element.attrib:
+            element.attrib['user_id'] = user_id
+    io.seek(0)
+    return io
+
+
+def _replace_user_id(cached_bytes, user_id):
+    return cached_bytes.replace(GLOBAL_USER_ID.encode('utf-8'), user_id.encode('utf-8'))
+
+
 item_lists = ItemListsProvider()
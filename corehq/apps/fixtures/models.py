@@ -24,6 +24,7 @@ from corehq.apps.locations.models import SQLLocation
 import six
 
 FIXTURE_BUCKET = 'domain-fixtures'
+ITEM_LIST_FIXTURE_BUCKET = 'item-list-fixtures'
 
 
 class FixtureTypeField(DocumentSchema):
@@ -374,33 +375,41 @@ class FixtureDataItem(Document):
             )
         )
         if wrap:
-            results = cls.get_db().view('_all_docs', keys=list(fixture_ids), include_docs=True)
-
-            # sort the results into those corresponding to real documents
-            # and those corresponding to deleted or non-existent documents
-            docs = []
-            deleted_fixture_ids = set()
-
-            for result in results:
-                if result.get('doc'):
-                    docs.append(cls.wrap(result['doc']))
-                elif result.get('error'):
-                    assert result['error'] == 'not_found'
-                    deleted_fixture_ids.add(result['key'])
-                else:
-                    assert result['value']['deleted'] is True
-                    deleted_fixture_ids.add(result['id'])
-
-            # fetch and delete ownership documents pointing
-            # to deleted or non-existent fixture documents
-            # this cleanup is necessary since we used to not do this
-            bad_ownerships = FixtureOwnership.for_all_item_ids(deleted_fixture_ids, user.domain)
-            FixtureOwnership.get_db().bulk_delete(bad_ownerships)
-
-            return docs
+            return cls.by_owned_ids(user.domain, fixture_ids)
         else:
             return fixture_ids
 
+    @classmethod
+    def by_owned_ids(cls, domain, fixture_ids):
+        """
+        Get the items for ids returned by ``by_user(user, wrap=False)``,
+        removing ownerships of items that no longer exist
+        """
+        results = cls.get_db().view('_all_docs', keys=list(fixture_ids), include_docs=True)
+
+        # sort the results into those corresponding to real documents
+        # and those corresponding to deleted or non-existent documents
+        docs = []
+        deleted_fixture_ids = set()
+
+        for result in results:
+            if result.get('doc'):
+                docs.append(cls.wrap(result['doc']))
+            elif result.get('error'):
+                assert result['error'] == 'not_found'
+                deleted_fixture_ids.add(result['key'])
+            else:
+                assert result['value']['deleted'] is True
+                deleted_fixture_ids.add(result['id'])
+
+        # fetch and delete ownership documents pointing
+        # to deleted or non-existent fixture documents
+        # this cleanup is necessary since we used to not do this
+        bad_ownerships = FixtureOwnership.for_all_item_ids(deleted_fixture_ids, domain)
+        FixtureOwnership.get_db().bulk_delete(bad_ownerships)
+
+        return docs
+
     @classmethod
     def by_group(cls, group, wrap=True):
         fixture_ids = cls.get_db().view('fixtures/ownership',
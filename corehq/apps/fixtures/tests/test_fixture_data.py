@@ -7,15 +7,16 @@ from django.test import TestCase
 
 from casexml.apps.case.tests.util import check_xml_line_by_line
 from casexml.apps.phone.tests.utils import call_fixture_generator
+from casexml.apps.phone.utils import get_cached_items_with_count
 from corehq.apps.fixtures import fixturegenerators
 from corehq.apps.fixtures.dbaccessors import delete_all_fixture_data_types, \
     get_fixture_data_types_in_domain
 from corehq.apps.fixtures.exceptions import FixtureVersionError
 from corehq.apps.fixtures.models import FixtureDataType, FixtureTypeField, \
-    FixtureDataItem, FieldList, FixtureItemField, FixtureOwnership, FIXTURE_BUCKET
+    FixtureDataItem, FieldList, FixtureItemField, FixtureOwnership
+from corehq.apps.fixtures.utils import clear_fixture_cache
 from corehq.apps.users.dbaccessors.all_commcare_users import delete_all_users
 from corehq.apps.users.models import CommCareUser
-from corehq.blobs import get_blob_db
 
 
 class FixtureDataTest(TestCase):
@@ -105,7 +106,7 @@ class FixtureDataTest(TestCase):
         delete_all_users()
         delete_all_fixture_data_types()
         get_fixture_data_types_in_domain.clear(self.domain)
-        get_blob_db().delete(self.domain, FIXTURE_BUCKET)
+        clear_fixture_cache(self.domain)
         super(FixtureDataTest, self).tearDown()
 
     def test_xml(self):
@@ -292,13 +293,46 @@ class FixtureDataTest(TestCase):
 
         fixtures = call_fixture_generator(fixturegenerators.item_lists, frank)
         self.assertEqual({item.attrib['user_id'] for item in fixtures}, {frank.user_id})
-        self.assertTrue(get_blob_db().exists(self.domain, FIXTURE_BUCKET))
 
         bytes_ = six.binary_type
-        fixtures = [ElementTree.fromstring(f) if isinstance(f, bytes_) else f
-            for f in call_fixture_generator(fixturegenerators.item_lists, sammy)]
+        fixtures = call_fixture_generator(fixturegenerators.item_lists, sammy)
+        self.assertTrue(all(isinstance(f, bytes_) for f in fixtures))
+        fixtures = [ElementTree.fromstring(get_cached_items_with_count(f)[0]) for f in fixtures]
         self.assertEqual({item.attrib['user_id'] for item in fixtures}, {sammy.user_id})
 
+    def test_clear_cache_for_data_type(self):
+        sandwich = self.make_data_type("sandwich", is_global=True)
+        latte = self.make_data_type("latte", is_global=True)
+        self.make_data_item(sandwich, "7.39")
+        self.make_data_item(latte, "5.75")
+        restore_user = self.user.to_ota_restore_user()
+        call_fixture_generator(fixturegenerators.item_lists, restore_user)
+
+        clear_fixture_cache(self.domain, [sandwich._id])
+        latte_fixture, sandwich_fixture, district_fixture = call_fixture_generator(
+            fixturegenerators.item_lists, restore_user)
+        self.assertIsInstance(latte_fixture, six.binary_type)
+        self.assertEqual(sandwich_fixture.attrib['id'], 'item-list:sandwich-index')
+        self.assertIsInstance(district_fixture, six.binary_type)
+
+    def test_cached_user_items(self):
+        restore_user = self.user.to_ota_restore_user()
+        fixture, = call_fixture_generator(fixturegenerators.item_lists, restore_user)
+        self.assertNotIsInstance(fixture, six.binary_type)
+
+        cached, = call_fixture_generator(fixturegenerators.item_lists, restore_user)
+        self.assertIsInstance(cached, six.binary_type)
+        cached, num_items = get_cached_items_with_count(cached)
+        self.assertEqual(num_items, 1)
+        check_xml_line_by_line(self, ElementTree.tostring(fixture), cached)
+
+        # ownership changes use a new cache entry
+        self.data_item.remove_user(self.user)
+        fixture, = call_fixture_generator(fixturegenerators.item_lists, restore_user)
+        self.assertNotIsInstance(fixture, six.binary_type)
+        self.assertEqual(len(fixture.find('district_list')), 0)
+        self.fixture_ownership = self.data_item.add_user(self.user)
+
     def make_data_type(self, name, is_global):
         data_type = FixtureDataType(
             domain=self.domain,
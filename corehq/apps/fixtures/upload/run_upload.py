@@ -88,8 +88,10 @@ def _run_fixture_upload(domain, workbook, replace=False, task=None):
                 data_type = new_data_type
             transaction.save(data_type)
             data_types.append(data_type)
-            data_items = list(workbook.get_data_sheet(data_type.tag))
-            items_in_table = len(data_items)
+            data_items = workbook.get_data_sheet(data_type.tag)
+            # iterate the rows lazily; max_row (less the header) is an upper
+            # bound on the number of items since reading stops at a blank row
+            items_in_table = max(data_items.worksheet.max_row - 1, 1)
             for sort_key, di in enumerate(data_items):
                 _update_progress(table_number, sort_key, items_in_table)
                 type_fields = data_type.fields
@@ -197,7 +199,7 @@ def _run_fixture_upload(domain, workbook, replace=False, task=None):
                                                    transaction=transaction)
 
     clear_fixture_quickcache(data_types)
-    clear_fixture_cache(domain)
+    clear_fixture_cache(domain, [data_type._id for data_type in data_types])
     return return_val
 
 
@@ -3,6 +3,8 @@ from __future__ import unicode_literals
 import re
 from xml.etree import cElementTree as ElementTree
 
+from django.core.cache import cache
+
 from corehq.blobs import get_blob_db
 
 BAD_SLUG_PATTERN = r"([/\\<>\s])"
@@ -59,6 +61,55 @@ def get_index_schema_node(fixture_id, attrs_to_index):
     return node
 
 
-def clear_fixture_cache(domain):
-    from corehq.apps.fixtures.models import FIXTURE_BUCKET
-    get_blob_db().delete(domain, FIXTURE_BUCKET)
+def get_fixture_bucket(domain, data_type_id=None):
+    """
+    Blob bucket holding the cached fixture XML of a global data type, or
+    of user-owned items if ``data_type_id`` is not given
+    """
+    from corehq.apps.fixtures.models import ITEM_LIST_FIXTURE_BUCKET
+    return '/'.join((ITEM_LIST_FIXTURE_BUCKET, domain, data_type_id or 'user'))
+
+
+def _get_fixture_version_key(domain, data_type_id):
+    return 'item-list-fixture-version-{}-{}'.format(domain, data_type_id)
+
+
+def get_fixture_data_type_versions(domain, data_type_ids):
+    """
+    :returns: dict of ``{data_type_id: version}``. The version is incremented
+        each time the cache of a data type is cleared so that a restore that
+        read items before the change can't store them under the new version.
+    """
+    keys = {_get_fixture_version_key(domain, id_): id_ for id_ in data_type_ids}
+    versions = cache.get_many(list(keys))
+    return {id_: versions.get(key, 0) for key, id_ in keys.items()}
+
+
+def _increment_fixture_version(domain, data_type_id):
+    key = _get_fixture_version_key(domain, data_type_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def clear_fixture_cache(domain, data_type_ids=None):
+    """
+    Clear cached fixture XML for the given data types, or for all data types
+    in the domain if ``data_type_ids`` is not given
+    """
+    from corehq.apps.fixtures.models import FIXTURE_BUCKET, ITEM_LIST_FIXTURE_BUCKET, FixtureDataType
+    db = get_blob_db()
+    if data_type_ids is None:
+        for data_type in FixtureDataType.by_domain(domain):
+            _increment_fixture_version(domain, data_type._id)
+        db.delete(bucket='/'.join((ITEM_LIST_FIXTURE_BUCKET, domain)))
+        # cache format used before fixtures were cached per data type
+        db.delete(domain, FIXTURE_BUCKET)
+        return
+
+    for data_type_id in data_type_ids:
+        _increment_fixture_version(domain, data_type_id)
+        db.delete(bucket=get_fixture_bucket(domain, data_type_id))
+    # user-owned items are cached together for all data types
+    db.delete(bucket=get_fixture_bucket(domain))
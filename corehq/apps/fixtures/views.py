@@ -109,7 +109,7 @@ def update_tables(request, domain, data_type_id, test_patch=None):
         elif request.method == 'DELETE':
             with CouchTransaction() as transaction:
                 data_type.recursive_delete(transaction)
-            clear_fixture_cache(domain)
+            clear_fixture_cache(domain, [data_type_id])
             return json_response({})
         elif not request.method == 'PUT':
             return HttpResponseBadRequest()
@@ -154,7 +154,7 @@ def update_tables(request, domain, data_type_id, test_patch=None):
                     return HttpResponseBadRequest("DuplicateFixture")
                 else:
                     data_type = create_types(fields_patches, domain, data_tag, is_global, transaction)
-        clear_fixture_cache(domain)
+        clear_fixture_cache(domain, [data_type._id])
         return json_response(strip_json(data_type))
 
 
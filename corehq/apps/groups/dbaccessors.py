@@ -39,6 +39,26 @@ def stale_group_by_name(domain, name, include_docs=True):
     )
 
 
+def stale_group_ids_by_names(domain, names):
+    """
+    :returns: ``{name: group_id}`` for the groups that exist. If there is more
+    than one group with a name the first one is returned like ``Group.by_name``.
+    """
+    from corehq.apps.groups.models import Group
+    if not names:
+        return {}
+
+    group_ids = {}
+    for row in Group.view(
+        'groups/by_name',
+        keys=[[domain, name] for name in names],
+        include_docs=False,
+        stale=settings.COUCH_STALE_QUERY,
+    ):
+        group_ids.setdefault(row['key'][1], row['id'])
+    return group_ids
+
+
 def refresh_group_views():
     from corehq.apps.groups.models import Group
     for view_name in [
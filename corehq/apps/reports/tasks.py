@@ -6,12 +6,16 @@ from datetime import datetime, timedelta
 from dateutil.parser import parse
 import hashlib
 import os
+import shutil
 import tempfile
+import threading
+import time
 from unidecode import unidecode
 import uuid
 import zipfile
 
 from django.conf import settings
+from django.db import connections
 
 from celery.schedules import crontab
 from celery.task import periodic_task
@@ -21,6 +25,7 @@ from celery.utils.log import get_task_logger
 from casexml.apps.case.xform import extract_case_blocks
 from corehq.apps.export.const import SAVED_EXPORTS_QUEUE
 from corehq.apps.users.models import CouchUser
+from corehq.blobs import get_blob_db
 from corehq.util.log import send_HTML_email
 from corehq.apps.reports.util import send_report_download_email
 from corehq.form_processor.interfaces.dbaccessors import FormAccessors
@@ -67,11 +72,15 @@ from .scheduled import get_scheduled_report_ids
 import six
 from six.moves import map
 from six.moves import filter
+from six.moves import range
+from six.moves import zip
+from six.moves.queue import Queue, Empty
 from io import open
 
 
 logging = get_task_logger(__name__)
 EXPIRE_TIME = 60 * 60 * 24
+MULTIMEDIA_ZIP_CHECKPOINT_INTERVAL = 100
 
 
 def send_delayed_report(report_id):
@@ -359,6 +368,7 @@ def build_form_multimedia_zip(
 
     if not app_id:
         zip_name = 'Unrelated Form'
+    # only attachment metadata is kept; the forms themselves are not held in memory
     forms_info = list()
     for form in FormAccessors(domain).iter_forms(form_ids):
         if not zip_name:
@@ -379,7 +389,7 @@ def build_form_multimedia_zip(
     else:
         _, fpath = tempfile.mkstemp()
 
-    _write_attachments_to_file(fpath, use_transfer, num_forms, forms_info, case_id_to_name)
+    _write_attachments_to_file(domain, fpath, use_transfer, num_forms, forms_info, case_id_to_name)
     filename = "{}.zip".format(zip_name)
     expose_download(use_transfer, fpath, filename, download_id, 'zip')
     DownloadBase.set_progress(build_form_multimedia_zip, num_forms, num_forms)
@@ -403,8 +413,8 @@ def _get_download_file_path(xmlns, startdate, enddate, export_id, app_id, num_fo
 def _format_filename(form_info, question_id, extension, case_id_to_name):
     filename = "{}-{}-form_{}{}".format(
         unidecode(question_id),
-        form_info['username'] or form_info['form'].user_id or 'user_unknown',
-        form_info['form'].form_id or 'unknown',
+        form_info['username'] or form_info['user_id'] or 'user_unknown',
+        form_info['form_id'] or 'unknown',
         extension
     )
     if form_info['case_ids']:
@@ -416,26 +426,187 @@ def _format_filename(form_info, question_id, extension, case_id_to_name):
     return filename
 
 
-def _write_attachments_to_file(fpath, use_transfer, num_forms, forms_info, case_id_to_name):
-
-    if not (os.path.isfile(fpath) and use_transfer):  # Don't rebuild the file if it is already there
-        with open(fpath, 'wb') as zfile:
-            with zipfile.ZipFile(zfile, 'w') as multimedia_zipfile:
-                for form_number, form_info in enumerate(forms_info):
-                    form = form_info['form']
-                    for attachment in form_info['attachments']:
-                        filename = _format_filename(
-                            form_info,
-                            attachment['question_id'],
-                            attachment['extension'],
-                            case_id_to_name
-                        )
-                        zip_info = zipfile.ZipInfo(filename, attachment['timestamp'])
-                        multimedia_zipfile.writestr(zip_info, form.get_attachment(
-                            attachment['name']),
-                            zipfile.ZIP_STORED
-                        )
-                    DownloadBase.set_progress(build_form_multimedia_zip, form_number + 1, num_forms)
+def _write_attachments_to_file(domain, fpath, use_transfer, num_forms, forms_info, case_id_to_name):
+    """
+    Write the attachments to a zip file at fpath. Attachments are downloaded
+    to temporary files ahead of being written, up to
+    ``settings.MULTIMEDIA_ZIP_MAX_CONCURRENT_DOWNLOADS`` at once, and copied
+    into the zip in chunks.
+
+    When the file is kept on the shared drive it is built in a separate
+    ".partial" file which is checkpointed every MULTIMEDIA_ZIP_CHECKPOINT_INTERVAL
+    forms, so that building the same download again picks up where the last
+    attempt stopped.
+    """
+    if os.path.isfile(fpath) and use_transfer:  # Don't rebuild the file if it is already there
+        return
+
+    build_path = fpath + '.partial' if use_transfer else fpath
+    written = _get_zipped_filenames(build_path) if use_transfer else set()
+    to_write = []
+    for form_number, form_info in enumerate(forms_info):
+        for attachment in form_info['attachments']:
+            filename = _format_filename(
+                form_info,
+                attachment['question_id'],
+                attachment['extension'],
+                case_id_to_name
+            )
+            if filename not in written:
+                to_write.append((form_number, form_info, attachment, filename))
+
+    multimedia_zipfile = zipfile.ZipFile(build_path, 'a' if written else 'w', allowZip64=True)
+    downloads = _iter_downloaded_attachments(
+        domain,
+        [(form_info['form_id'], attachment) for _, form_info, attachment, _ in to_write],
+        settings.MULTIMEDIA_ZIP_MAX_CONCURRENT_DOWNLOADS,
+    )
+    try:
+        last_form_number = None
+        for (form_number, form_info, attachment, filename), path in zip(to_write, downloads):
+            try:
+                # ZipFile.write takes the entry's timestamp from the file
+                timestamp = time.mktime(attachment['timestamp'])
+                os.utime(path, (timestamp, timestamp))
+                multimedia_zipfile.write(path, filename, zipfile.ZIP_STORED)
+            finally:
+                os.remove(path)
+
+            if form_number != last_form_number:
+                if use_transfer and form_number and form_number % MULTIMEDIA_ZIP_CHECKPOINT_INTERVAL == 0:
+                    multimedia_zipfile.close()
+                    _save_zip_checkpoint(build_path)
+                    multimedia_zipfile = zipfile.ZipFile(build_path, 'a', allowZip64=True)
+                DownloadBase.set_progress(build_form_multimedia_zip, form_number, num_forms)
+                last_form_number = form_number
+    finally:
+        # stops any downloads still in progress
+        downloads.close()
+        multimedia_zipfile.close()
+
+    if use_transfer:
+        os.rename(build_path, fpath)
+        _remove_if_exists(build_path + '.checkpoint')
+
+
+def _save_zip_checkpoint(path):
+    # Closing the zip file writes its central directory, so it is complete
+    # up to this size. Anything written after this is lost if the task dies.
+    with open(path + '.checkpoint', 'w') as f:
+        f.write(six.text_type(os.path.getsize(path)))
+
+
+def _get_zipped_filenames(path):
+    """
+    Return the names of the files in a partially built zip file after
+    truncating it to its last checkpoint, or an empty set if there is no
+    usable partial file.
+    """
+    checkpoint_path = path + '.checkpoint'
+    try:
+        with open(checkpoint_path) as f:
+            size = int(f.read())
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+        with zipfile.ZipFile(path) as partial_zipfile:
+            return set(partial_zipfile.namelist())
+    except (IOError, OSError, ValueError, zipfile.BadZipfile):
+        _remove_if_exists(path)
+        _remove_if_exists(checkpoint_path)
+        return set()
+
+
+def _remove_if_exists(path):
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def _iter_downloaded_attachments(domain, attachments, concurrency):
+    """
+    Download form attachments to temporary files and yield their paths in
+    the same order as ``attachments``. The caller is responsible for removing
+    each file.
+
+    :param attachments: list of (form_id, attachment info) tuples, see
+    _extract_form_attachment_info
+    :param concurrency: number of attachments downloaded at once. At most
+    twice as many are downloaded ahead of the caller.
+    """
+    if concurrency < 2:
+        for form_id, attachment in attachments:
+            yield _download_attachment(domain, form_id, attachment)
+        return
+
+    pending = Queue()
+    for index, attachment in enumerate(attachments):
+        pending.put((index, attachment))
+    downloaded = {}
+    condition = threading.Condition()
+    window = threading.Semaphore(concurrency * 2)
+    stopped = threading.Event()
+
+    def download_pending():
+        try:
+            while True:
+                window.acquire()
+                if stopped.is_set():
+                    return
+                try:
+                    index, (form_id, attachment) = pending.get_nowait()
+                except Empty:
+                    return
+                try:
+                    result = (_download_attachment(domain, form_id, attachment), None)
+                except Exception as e:
+                    result = (None, e)
+                with condition:
+                    downloaded[index] = result
+                    condition.notify_all()
+        finally:
+            # connections are per thread
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=download_pending, name='multimedia-zip-{}'.format(i))
+        for i in range(min(concurrency, len(attachments)))
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for index in range(len(attachments)):
+            with condition:
+                while index not in downloaded:
+                    condition.wait()
+                path, error = downloaded.pop(index)
+            window.release()
+            if error is not None:
+                raise error
+            yield path
+    finally:
+        stopped.set()
+        for thread in threads:
+            window.release()
+        for thread in threads:
+            thread.join()
+        for path, error in downloaded.values():
+            if path:
+                os.remove(path)
+
+
+def _download_attachment(domain, form_id, attachment):
+    if attachment['blob_id']:
+        # read straight from the blob db rather than loading the form again
+        stream = get_blob_db().get(attachment['blob_id'], attachment['blob_bucket'])
+    else:
+        stream = FormAccessors(domain).get_attachment_content(form_id, attachment['name']).content_stream
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as tmp, stream:
+            shutil.copyfileobj(stream, tmp)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
 
 
 def _convert_legacy_indices_to_export_properties(indices):
@@ -502,7 +673,8 @@ def _extract_form_attachment_info(form, properties):
 
     case_blocks = extract_case_blocks(form.form_data)
     form_info = {
-        'form': form,
+        'form_id': form.form_id,
+        'user_id': form.user_id,
         'attachments': [],
         'case_ids': {c['@case_id'] for c in case_blocks},
         'username': form.get_data('form/meta/username')
@@ -530,18 +702,31 @@ def _extract_form_attachment_info(form, properties):
             if hasattr(attachment, 'content_length'):
                 # FormAttachmentSQL or BlobMeta
                 size = attachment.content_length
+                blob_id = attachment.blob_id if hasattr(attachment, 'blob_id') else attachment.id
             elif 'content_length' in attachment:
                 # dict from BlobMeta.to_json() or possibly FormAttachmentSQL
                 size = attachment['content_length']
+                blob_id = attachment.get('id')
             else:
                 # couch attachment dict
                 size = attachment['length']
+                blob_id = None
             form_info['attachments'].append({
                 'size': size,
                 'name': attachment_name,
                 'question_id': question_id,
                 'extension': extension,
                 'timestamp': form.received_on.timetuple(),
+                # where to download the attachment from without loading the form again
+                'blob_id': blob_id,
+                'blob_bucket': _get_blob_bucket(form, attachment) if blob_id else None,
             })
 
     return form_info
+
+
+def _get_blob_bucket(form, attachment):
+    if hasattr(attachment, 'blobdb_bucket'):
+        # XFormAttachmentSQL
+        return attachment.blobdb_bucket()
+    return form._blobdb_bucket()
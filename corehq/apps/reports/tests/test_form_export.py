@@ -4,6 +4,10 @@ from __future__ import unicode_literals
 from io import BytesIO
 import json
 import datetime
+import os
+import shutil
+import tempfile
+import zipfile
 
 import mock
 from django.urls import reverse
@@ -12,8 +16,11 @@ from corehq.apps.domain.shortcuts import create_domain
 from corehq.apps.export.models import FormExportInstance, TableConfiguration, ExportColumn, ScalarItem, PathNode
 from corehq.apps.reports.models import FormExportSchema
 from corehq.apps.reports.tasks import (
+    _download_attachment,
     _extract_form_attachment_info,
     _get_export_properties,
+    _save_zip_checkpoint,
+    _write_attachments_to_file,
 )
 from corehq.apps.users.models import CommCareUser
 from corehq.form_processor.models import XFormInstanceSQL, XFormAttachmentSQL
@@ -134,6 +141,64 @@ class FormMultimediaExportTest(SimpleTestCase):
                 self.assertEqual(attachments[image_1_name]['question_id'], "image_1")
                 self.assertEqual(attachments[image_2_name]['question_id'], "my_group-image_2")
 
+    def test_write_attachments_resumes_partial_file(self):
+        timestamp = datetime.datetime(2018, 1, 1).timetuple()
+        forms_info = [{
+            'form_id': form_id,
+            'user_id': 'user',
+            'username': 'user',
+            'case_ids': set(),
+            'attachments': [{
+                'name': '{}.jpg'.format(form_id),
+                'question_id': 'photo',
+                'extension': '.jpg',
+                'timestamp': timestamp,
+                'blob_id': None,
+                'blob_bucket': None,
+            }],
+        } for form_id in ['form1', 'form2']]
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        fpath = os.path.join(tmpdir, 'export.zip')
+
+        # a previous attempt wrote the first form and died part way through the second
+        with zipfile.ZipFile(fpath + '.partial', 'w') as partial:
+            partial.writestr('photo-user-form_form1.jpg', b'form1 content')
+        _save_zip_checkpoint(fpath + '.partial')
+        with open(fpath + '.partial', 'ab') as partial:
+            partial.write(b'incomplete')
+
+        def download(domain, form_id, attachment):
+            _, path = tempfile.mkstemp(dir=tmpdir)
+            with open(path, 'wb') as f:
+                f.write('{} content'.format(form_id).encode('utf-8'))
+            return path
+
+        with mock.patch('corehq.apps.reports.tasks._download_attachment', side_effect=download) as download_mock, \
+                mock.patch('corehq.apps.reports.tasks.DownloadBase.set_progress'):
+            _write_attachments_to_file('domain', fpath, True, len(forms_info), forms_info, {})
+
+        self.assertEqual(download_mock.call_args_list, [
+            mock.call('domain', 'form2', forms_info[1]['attachments'][0]),
+        ])
+        self.assertEqual(sorted(os.listdir(tmpdir)), ['export.zip'])
+        with zipfile.ZipFile(fpath) as result:
+            self.assertEqual(result.read('photo-user-form_form1.jpg'), b'form1 content')
+            self.assertEqual(result.read('photo-user-form_form2.jpg'), b'form2 content')
+
+    def test_download_attachment_from_blob_db(self):
+        attachment = {'name': 'photo.jpg', 'blob_id': 'abc123', 'blob_bucket': 'form/xyz'}
+        with mock.patch('corehq.apps.reports.tasks.get_blob_db') as blob_db_mock, \
+                mock.patch('corehq.apps.reports.tasks.FormAccessors') as form_accessors_mock:
+            blob_db_mock.return_value.get.return_value = BytesIO(b'photo content')
+            path = _download_attachment('domain', 'form1', attachment)
+        self.addCleanup(os.remove, path)
+
+        blob_db_mock.return_value.get.assert_called_once_with('abc123', 'form/xyz')
+        self.assertFalse(form_accessors_mock.called)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'photo content')
+
 
 class FormExportTest(TestCase):
 
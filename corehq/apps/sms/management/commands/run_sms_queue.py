@@ -2,10 +2,11 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 from corehq.apps.domain_migration_flags.api import any_migrations_in_progress
 from corehq.apps.sms.models import QueuedSMS
-from corehq.apps.sms.tasks import send_to_sms_queue
+from corehq.apps.sms.tasks import send_batches_to_sms_queue, send_to_sms_queue
 from corehq.sql_db.util import handle_connection_failure
 from dimagi.utils.couch.cache.cache_core import get_redis_client
 from dimagi.utils.logging import notify_exception
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from time import sleep
 
@@ -34,15 +35,24 @@ class SMSEnqueuingOperation(BaseCommand):
 
     @handle_connection_failure()
     def create_tasks(self):
+        claimed = []
         for queued_sms in QueuedSMS.get_queued_sms():
             if queued_sms.domain and skip_domain(queued_sms.domain):
                 continue
 
-            self.enqueue(queued_sms)
+            if settings.SMS_QUEUE_BATCH_SIZE > 1:
+                if self.claim(queued_sms):
+                    claimed.append(queued_sms)
+            else:
+                self.enqueue(queued_sms)
+
+        send_batches_to_sms_queue(claimed)
+
+    def claim(self, queued_sms):
+        return self.get_enqueue_lock(queued_sms).acquire(blocking=False)
 
     def enqueue(self, queued_sms):
-        enqueue_lock = self.get_enqueue_lock(queued_sms)
-        if enqueue_lock.acquire(blocking=False):
+        if self.claim(queued_sms):
             send_to_sms_queue(queued_sms)
 
     def handle(self, **options):
@@ -4,12 +4,16 @@ from __future__ import division
 from __future__ import unicode_literals
 import hashlib
 import math
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 from celery.schedules import crontab
 from corehq.util.datadog.gauges import datadog_counter, datadog_gauge_task
 from django.conf import settings
-from django.db import DataError, transaction
+from django.db import DataError, connections, transaction
+from six.moves import range
+from six.moves.queue import Empty, Queue
 
 from corehq import privileges
 from corehq.apps.accounting.utils import domain_has_privilege, domain_is_on_trial
@@ -31,8 +35,10 @@ from corehq.messaging.util import use_phone_entries
 from corehq.toggles import RETRY_SMS_INDEFINITELY, USE_SMS_WITH_INACTIVE_CONTACTS
 from corehq.util.celery_utils import no_result_task
 from corehq.util.timezones.conversions import ServerTime
+from dimagi.utils.chunked import chunked
 from dimagi.utils.couch import CriticalSection, release_lock
 from dimagi.utils.couch.cache.cache_core import get_redis_client
+from dimagi.utils.logging import notify_exception
 from dimagi.utils.rate_limit import rate_limit
 
 
@@ -181,12 +187,13 @@ def passes_trial_check(msg):
     return True
 
 
-def handle_outgoing(msg):
+def handle_outgoing(msg, context=None):
     """
     Should return a requeue flag, so if it returns True, the message will be
     requeued and processed again immediately, and if it returns False, it will
     not be queued again.
     """
+    context = context or SMSProcessingContext()
     backend = msg.outbound_backend
     sms_rate_limit = backend.get_sms_rate_limit()
     use_rate_limit = sms_rate_limit is not None
@@ -203,7 +210,7 @@ def handle_outgoing(msg):
         else:
             redis_key = 'sms-rate-limit-backend-%s' % backend.pk
 
-        if not rate_limit(redis_key, actions_allowed=sms_rate_limit, how_often=60):
+        if not context.passes_rate_limit(redis_key, sms_rate_limit):
             # Requeue the message and try it again shortly
             return True
 
@@ -316,6 +323,46 @@ class OutboundDailyCounter(object):
         return True
 
 
+class SMSProcessingContext(object):
+    """
+    Caches the lookups made while processing queued SMS so that a batch of
+    messages only makes them once, and remembers the rate limits that have
+    been reached so that the rest of the batch doesn't keep checking them.
+    """
+
+    def __init__(self):
+        self._domains = {}
+        self._outbound_counters = {}
+        self._rate_limited_until = {}
+        # seconds until all of the rate limits that were reached reset
+        self.retry_after = 0
+
+    def get_domain(self, domain):
+        if domain not in self._domains:
+            self._domains[domain] = Domain.get_by_name(domain)
+        return self._domains[domain]
+
+    def get_outbound_counter(self, domain_object):
+        key = domain_object.name if domain_object else None
+        if key not in self._outbound_counters:
+            self._outbound_counters[key] = OutboundDailyCounter(domain_object)
+        return self._outbound_counters[key]
+
+    def passes_rate_limit(self, redis_key, sms_rate_limit):
+        utcnow = datetime.utcnow()
+        if redis_key in self._rate_limited_until and utcnow < self._rate_limited_until[redis_key]:
+            return False
+
+        if rate_limit(redis_key, actions_allowed=sms_rate_limit, how_often=60):
+            return True
+
+        client = get_redis_client().client.get_client()
+        time_remaining = max(client.ttl(redis_key), 1)
+        self._rate_limited_until[redis_key] = utcnow + timedelta(seconds=time_remaining)
+        self.retry_after = max(self.retry_after, time_remaining)
+        return False
+
+
 @no_result_task(queue="sms_queue", acks_late=True)
 def process_sms(queued_sms_pk):
     """
@@ -335,76 +382,190 @@ def process_sms(queued_sms_pk):
             release_lock(message_lock, True)
             return
 
-        if message_is_stale(msg, utcnow):
-            msg.set_system_error(SMS.ERROR_MESSAGE_IS_STALE)
-            remove_from_queue(msg)
+        try:
+            requeue = _process_queued_sms(msg, utcnow, SMSProcessingContext())
+        finally:
             release_lock(message_lock, True)
-            return
 
-        outbound_counter = None
-        if msg.direction == OUTGOING:
-            domain_object = Domain.get_by_name(msg.domain) if msg.domain else None
+        if requeue:
+            send_to_sms_queue(msg)
 
-            if domain_object and handle_domain_specific_delays(msg, domain_object, utcnow):
-                release_lock(message_lock, True)
-                return
 
-            outbound_counter = OutboundDailyCounter(domain_object)
-            if not outbound_counter.can_send_outbound_sms(msg):
-                release_lock(message_lock, True)
+@no_result_task(queue="sms_queue", acks_late=True)
+def process_sms_batch(queued_sms_pks):
+    """
+    Processes a batch of QueuedSMS claimed together by run_sms_queue.
+
+    Domain lookups, daily counters and rate limits are shared by the batch.
+    Messages are sent by up to settings.SMS_QUEUE_MAX_CONCURRENT_SENDS
+    threads, and the connection slot locks still limit each backend to its
+    max_simultaneous_connections. Messages to the same phone number are
+    processed in order by a single thread.
+    """
+    client = get_redis_client()
+    utcnow = get_utcnow()
+    message_locks = {}
+    for queued_sms_pk in queued_sms_pks:
+        message_lock = get_lock(client, "sms-queue-processing-%s" % queued_sms_pk)
+        if message_lock.acquire(blocking=False):
+            message_locks[queued_sms_pk] = message_lock
+
+    context = SMSProcessingContext()
+    try:
+        messages = QueuedSMS.objects.filter(pk__in=list(message_locks)).order_by('datetime_to_process', 'pk')
+        requeue = _process_queued_sms_batch(list(messages), utcnow, context)
+    finally:
+        for message_lock in message_locks.values():
+            release_lock(message_lock, True)
+
+    send_batches_to_sms_queue(requeue, countdown=context.retry_after)
+
+
+def _process_queued_sms_batch(messages, utcnow, context):
+    """
+    Returns the messages that need to be requeued
+    """
+    messages_by_phone_number = OrderedDict()
+    for msg in messages:
+        messages_by_phone_number.setdefault(msg.phone_number, []).append(msg)
+
+    pending = Queue()
+    for phone_number_messages in messages_by_phone_number.values():
+        pending.put(phone_number_messages)
+    requeue = []
+
+    def process_pending():
+        while True:
+            try:
+                phone_number_messages = pending.get_nowait()
+            except Empty:
                 return
 
-        requeue = False
-        # Process inbound SMS from a single contact one at a time
-        recipient_block = msg.direction == INCOMING
-        if (isinstance(msg.processed, bool)
-            and not msg.processed
-            and not msg.error
-            and msg.datetime_to_process < utcnow):
-            if recipient_block:
-                recipient_lock = get_lock(client, 
-                    "sms-queue-recipient-phone-%s" % msg.phone_number)
-                recipient_lock.acquire(blocking=True)
-
-            if msg.direction == OUTGOING:
-                if (
-                    msg.domain and
-                    msg.couch_recipient_doc_type and
-                    msg.couch_recipient and
-                    not is_contact_active(msg.domain, msg.couch_recipient_doc_type, msg.couch_recipient)
-                ):
-                    msg.set_system_error(SMS.ERROR_CONTACT_IS_INACTIVE)
-                    remove_from_queue(msg)
-                else:
-                    requeue = handle_outgoing(msg)
-            elif msg.direction == INCOMING:
+            for msg in phone_number_messages:
                 try:
-                    handle_incoming(msg)
-                except DelayProcessing:
-                    process_sms.apply_async([queued_sms_pk], countdown=60)
-                    if recipient_block:
-                        release_lock(recipient_lock, True)
-                    release_lock(message_lock, True)
-            else:
-                msg.set_system_error(SMS.ERROR_INVALID_DIRECTION)
+                    if _process_queued_sms(msg, utcnow, context):
+                        requeue.append(msg)
+                except Exception:
+                    notify_exception(None, message="Error processing queued SMS %s" % msg.pk)
+
+    def process_pending_in_thread():
+        try:
+            process_pending()
+        finally:
+            # connections are per thread
+            connections.close_all()
+
+    concurrency = min(settings.SMS_QUEUE_MAX_CONCURRENT_SENDS, len(messages_by_phone_number))
+    if concurrency < 2:
+        process_pending()
+        return requeue
+
+    threads = [
+        threading.Thread(target=process_pending_in_thread, name='sms-batch-{}'.format(i))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return requeue
+
+
+def _process_queued_sms(msg, utcnow, context):
+    """
+    Processes a QueuedSMS which the caller has locked.
+
+    Returns True if the message should be requeued.
+    """
+    if message_is_stale(msg, utcnow):
+        msg.set_system_error(SMS.ERROR_MESSAGE_IS_STALE)
+        remove_from_queue(msg)
+        return False
+
+    outbound_counter = None
+    if msg.direction == OUTGOING:
+        domain_object = context.get_domain(msg.domain) if msg.domain else None
+
+        if domain_object and handle_domain_specific_delays(msg, domain_object, utcnow):
+            return False
+
+        outbound_counter = context.get_outbound_counter(domain_object)
+        if not outbound_counter.can_send_outbound_sms(msg):
+            return False
+
+    requeue = False
+    # Process inbound SMS from a single contact one at a time
+    recipient_block = msg.direction == INCOMING
+    if (
+        isinstance(msg.processed, bool) and
+        not msg.processed and
+        not msg.error and
+        msg.datetime_to_process < utcnow
+    ):
+        if recipient_block:
+            recipient_lock = get_lock(get_redis_client(),
+                "sms-queue-recipient-phone-%s" % msg.phone_number)
+            recipient_lock.acquire(blocking=True)
+
+        if msg.direction == OUTGOING:
+            if (
+                msg.domain and
+                msg.couch_recipient_doc_type and
+                msg.couch_recipient and
+                not is_contact_active(msg.domain, msg.couch_recipient_doc_type, msg.couch_recipient)
+            ):
+                msg.set_system_error(SMS.ERROR_CONTACT_IS_INACTIVE)
                 remove_from_queue(msg)
+            else:
+                requeue = handle_outgoing(msg, context)
+        elif msg.direction == INCOMING:
+            try:
+                handle_incoming(msg)
+            except DelayProcessing:
+                process_sms.apply_async([msg.pk], countdown=60)
+        else:
+            msg.set_system_error(SMS.ERROR_INVALID_DIRECTION)
+            remove_from_queue(msg)
 
-            if recipient_block:
-                release_lock(recipient_lock, True)
+        if recipient_block:
+            release_lock(recipient_lock, True)
 
-        release_lock(message_lock, True)
-        if requeue:
-            if outbound_counter:
-                outbound_counter.decrement()
-            send_to_sms_queue(msg)
+    if requeue and outbound_counter:
+        outbound_counter.decrement()
 
+    return requeue
 
-def send_to_sms_queue(queued_sms):
+
+def _get_sms_queue_options(queued_sms):
     options = {}
     if queued_sms.direction == OUTGOING and queued_sms.domain in settings.CUSTOM_PROJECT_SMS_QUEUES:
         options['queue'] = settings.CUSTOM_PROJECT_SMS_QUEUES[queued_sms.domain]
+    return options
+
+
+def send_to_sms_queue(queued_sms):
+    process_sms.apply_async([queued_sms.pk], **_get_sms_queue_options(queued_sms))
+
 
-    process_sms.apply_async([queued_sms.pk], **options)
+def send_batches_to_sms_queue(queued_sms_list, countdown=None):
+    """
+    Queues process_sms_batch tasks for up to settings.SMS_QUEUE_BATCH_SIZE
+    messages at a time, grouped by the celery queue they belong on.
+    """
+    pks_by_queue = OrderedDict()
+    for queued_sms in queued_sms_list:
+        queue = _get_sms_queue_options(queued_sms).get('queue')
+        pks_by_queue.setdefault(queue, []).append(queued_sms.pk)
+
+    for queue, pks in pks_by_queue.items():
+        options = {}
+        if queue:
+            options['queue'] = queue
+        if countdown:
+            options['countdown'] = countdown
+        for chunk in chunked(pks, settings.SMS_QUEUE_BATCH_SIZE):
+            process_sms_batch.apply_async([list(chunk)], **options)
 
 
 @no_result_task(default_retry_delay=10 * 60, max_retries=10, bind=True)
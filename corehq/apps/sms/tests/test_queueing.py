@@ -3,7 +3,7 @@ from __future__ import unicode_literals
 from corehq.apps.domain.models import Domain
 from corehq.apps.sms.api import send_sms, incoming
 from corehq.apps.sms.models import SMS, QueuedSMS
-from corehq.apps.sms.tasks import process_sms, MAX_TRIAL_SMS, passes_trial_check
+from corehq.apps.sms.tasks import process_sms, process_sms_batch, MAX_TRIAL_SMS, passes_trial_check
 from corehq.apps.sms.tests.util import (BaseSMSTest, setup_default_sms_test_backend,
     delete_domain_phone_numbers)
 from corehq.apps.smsbillables.models import SmsBillable
@@ -143,6 +143,24 @@ class QueueingTestCase(BaseSMSTest):
         self.assertEqual(process_sms_delay_mock.call_count, 0)
         self.assertBillableExists(couch_id)
 
+    def test_outgoing_batch(self, process_sms_delay_mock, enqueue_directly_mock):
+        send_sms(self.domain, None, '+999123', 'test outgoing 1')
+        send_sms(self.domain, None, '+999123', 'test outgoing 2')
+        send_sms(self.domain, None, '+999124', 'test outgoing 3')
+        self.assertEqual(self.queued_sms_count, 3)
+
+        with patch_successful_send() as send_mock:
+            process_sms_batch(list(QueuedSMS.objects.values_list('pk', flat=True)))
+
+        self.assertEqual(send_mock.call_count, 3)
+        self.assertEqual(self.queued_sms_count, 0)
+        self.assertEqual(self.reporting_sms_count, 3)
+        self.assertEqual(
+            ['test outgoing 1', 'test outgoing 2'],
+            [sms.text for sms in SMS.objects.filter(domain=self.domain, phone_number='+999123').order_by('date')]
+        )
+        self.assertEqual(process_sms_delay_mock.call_count, 0)
+
     def test_outgoing_failure(self, process_sms_delay_mock, enqueue_directly_mock):
         timestamp = datetime(2016, 1, 1, 12, 0)
 
@@ -89,7 +89,7 @@ class IndicatorAdapter(object):
         "Gets all the values from a document to save"
         return self.config.get_all_values(doc, eval_context)
 
-    def save_rows(self, rows):
+    def save_rows(self, rows, doc_ids_to_delete=None):
         """
         Saves rows to a data source after deleting the old rows
         """
@@ -54,15 +54,17 @@ def ucr_context_cache(vary_on=()):
         assert 'context' in fn.__code__.co_varnames
         assert isinstance(vary_on, tuple)
 
+        # shamelessly stolen from quickcache
+        # computed once here rather than on every call since reading the source is slow
+        prefix = '{}.{}'.format(
+            fn.__name__[:40] + (fn.__name__[40:] and '..'),
+            hashlib.md5(inspect.getsource(fn)).hexdigest()[-8:]
+        )
+
         @wraps(fn)
         def _inner(*args, **kwargs):
-            # shamelessly stolen from quickcache
             callargs = inspect.getcallargs(fn, *args, **kwargs)
             context = callargs['context']
-            prefix = '{}.{}'.format(
-                fn.__name__[:40] + (fn.__name__[40:] and '..'),
-                hashlib.md5(inspect.getsource(fn)).hexdigest()[-8:]
-            )
             cache_key = (prefix,) + tuple(callargs[arg_name] for arg_name in vary_on)
             if context.exists_in_cache(cache_key):
                 return context.get_cache_value(cache_key)
@@ -107,19 +107,50 @@ class NamedExpressionSpec(JsonObject):
         if self.name not in context.named_expressions:
             raise BadSpecError('Name {} not found in list of named expressions!'.format(self.name))
         self._context = context
-
-    def _context_cache_key(self, item):
-        item_hash = hashlib.md5(json.dumps(item, cls=DjangoJSONEncoder, sort_keys=True)).hexdigest()
-        return 'named_expression-{}-{}'.format(self.name, item_hash)
+        self._definition_key = None
+
+    def _get_definition_key(self):
+        """
+        Identifies the definition of this named expression (including the named expressions
+        it can refer to) so that results can be shared between data sources that define
+        identical named expressions and never between ones that don't.
+
+        :returns: tuple of ``(definition_hash, depends_on_iteration)``
+        """
+        if self._definition_key is None:
+            # computed lazily since named expressions are configured before all of them exist
+            definitions = json.dumps({
+                name: expression.to_json()
+                for name, expression in self._context.named_expressions.items()
+            }, cls=DjangoJSONEncoder, sort_keys=True)
+            self._definition_key = (
+                hashlib.md5(definitions.encode('utf-8')).hexdigest(),
+                '"base_iteration_number"' in definitions,
+            )
+        return self._definition_key
+
+    def _context_cache_key(self, item, context=None):
+        definition_hash, _ = self._get_definition_key()
+        if context is not None and item is context.root_doc:
+            # avoid serializing the whole document on every call
+            item_hash = 'root_doc'
+        else:
+            item_hash = hashlib.md5(json.dumps(item, cls=DjangoJSONEncoder, sort_keys=True)).hexdigest()
+        return 'named_expression-{}-{}-{}'.format(self.name, definition_hash, item_hash)
 
     def __call__(self, item, context=None):
-        key = self._context_cache_key(item)
+        key = self._context_cache_key(item, context)
         if context and context.exists_in_cache(key):
             return context.get_cache_value(key)
 
         result = self._context.named_expressions[self.name](item, context)
         if context:
-            context.set_iteration_cache_value(key, result)
+            _, depends_on_iteration = self._get_definition_key()
+            if item is context.root_doc and not depends_on_iteration:
+                # share the result between data sources evaluated with the same context
+                context.set_cache_value(key, result)
+            else:
+                context.set_iteration_cache_value(key, result)
         return result
 
     def __str__(self):
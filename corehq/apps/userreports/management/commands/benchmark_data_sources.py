@@ -0,0 +1,89 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from six.moves import range
+
+from corehq.apps.userreports.models import get_datasource_config
+from corehq.apps.userreports.specs import EvaluationContext
+
+
+class Command(BaseCommand):
+    """
+    Benchmark evaluating data sources over a corpus of form / case JSON documents
+    the way the UCR pillow does, comparing a fresh evaluation context for every
+    data source with a single context shared by all data sources for a document.
+
+    The corpus is either a directory of ``.json`` files (one document each) or a
+    file containing one JSON document per line.
+
+    Usage: ./manage.py benchmark_data_sources <domain> <corpus> <data_source_id> [<data_source_id> ...]
+    """
+    help = "Benchmark data source evaluation over a corpus of JSON documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument('domain')
+        parser.add_argument('corpus')
+        parser.add_argument('data_source_ids', nargs='+')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, domain, corpus, data_source_ids, **options):
+        configs = [get_datasource_config(data_source_id, domain)[0] for data_source_id in data_source_ids]
+        for config in configs:
+            # build the filters and expressions up front so they aren't part of the timings
+            config.validate()
+        docs = list(_iter_corpus(corpus))
+        print("{} documents, {} data sources".format(len(docs), len(configs)))
+
+        for name, func in [('isolated', _evaluate_isolated), ('shared', _evaluate_shared)]:
+            timings = []
+            for i in range(options['repeat']):
+                start = time.time()
+                num_rows = func(configs, docs)
+                timings.append(time.time() - start)
+            best = min(timings)
+            print("{:<10} {:.3f}s (best of {}) {:.3f}ms/doc {} rows".format(
+                name, best, options['repeat'], best * 1000 / max(len(docs), 1), num_rows
+            ))
+
+
+def _evaluate_isolated(configs, docs):
+    num_rows = 0
+    for doc in docs:
+        for config in configs:
+            if config.filter(doc):
+                num_rows += len(config.get_all_values(doc))
+            else:
+                config.deleted_filter(doc)
+    return num_rows
+
+
+def _evaluate_shared(configs, docs):
+    num_rows = 0
+    for doc in docs:
+        eval_context = EvaluationContext(doc)
+        for config in configs:
+            if config.filter(doc, eval_context):
+                num_rows += len(config.get_all_values(doc, eval_context))
+                eval_context.reset_iteration()
+            else:
+                config.deleted_filter(doc, eval_context)
+    return num_rows
+
+
+def _iter_corpus(corpus):
+    if os.path.isdir(corpus):
+        for filename in sorted(os.listdir(corpus)):
+            if filename.endswith('.json'):
+                with open(os.path.join(corpus, filename)) as f:
+                    yield json.load(f)
+    else:
+        with open(corpus) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
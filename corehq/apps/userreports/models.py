@@ -5,6 +5,7 @@ from collections import namedtuple
 from copy import copy, deepcopy
 from datetime import datetime
 import glob
+import hashlib
 import json
 import os
 import re
@@ -198,13 +199,33 @@ class DataSourceConfiguration(UnicodeMixIn, CachedCouchDocumentMixin, Document,
     def data_source_id(self):
         return self._id
 
-    def filter(self, document):
+    def filter(self, document, eval_context=None):
         filter_fn = self._get_main_filter()
-        return filter_fn(document, EvaluationContext(document, 0))
+        return self._evaluate_filter(filter_fn, self._get_main_filter_cache_key(), document, eval_context)
 
-    def deleted_filter(self, document):
+    def deleted_filter(self, document, eval_context=None):
         filter_fn = self._get_deleted_filter()
-        return filter_fn and filter_fn(document, EvaluationContext(document, 0))
+        return filter_fn and self._evaluate_filter(
+            filter_fn, self._get_deleted_filter_cache_key(), document, eval_context
+        )
+
+    @staticmethod
+    def _evaluate_filter(filter_fn, cache_key, document, eval_context):
+        """
+        Filters are always evaluated against the root document at iteration 0.
+        When a matching context is passed in, the result (and any expressions
+        cached while computing it) is shared with the rest of the evaluation of
+        the document, including other data sources with an identical filter.
+        """
+        if eval_context is None or eval_context.root_doc is not document or eval_context.iteration:
+            return filter_fn(document, EvaluationContext(document, 0))
+
+        if eval_context.exists_in_cache(cache_key):
+            return eval_context.get_cache_value(cache_key)
+
+        result = filter_fn(document, eval_context)
+        eval_context.set_cache_value(cache_key, result)
+        return result
 
     @memoized
     def _get_main_filter(self):
@@ -214,10 +235,35 @@ class DataSourceConfiguration(UnicodeMixIn, CachedCouchDocumentMixin, Document,
     def _get_deleted_filter(self):
         return self._get_filter(get_deleted_doc_types(self.referenced_doc_type), include_configured=False)
 
+    @memoized
+    def _get_main_filter_cache_key(self):
+        return self._get_filter_cache_key([self.referenced_doc_type])
+
+    @memoized
+    def _get_deleted_filter_cache_key(self):
+        return self._get_filter_cache_key(
+            get_deleted_doc_types(self.referenced_doc_type), include_configured=False
+        )
+
+    def _get_filter_cache_key(self, doc_types, include_configured=True):
+        spec = json.dumps({
+            'filter': self._get_filter_spec(doc_types, include_configured),
+            'named_expressions': self.named_expressions,
+            'named_filters': self.named_filters,
+        }, sort_keys=True)
+        return 'data_source_filter-{}'.format(hashlib.md5(spec.encode('utf-8')).hexdigest())
+
     def _get_filter(self, doc_types, include_configured=True):
         if not doc_types:
             return None
 
+        return FilterFactory.from_spec(
+            self._get_filter_spec(doc_types, include_configured),
+            context=self.get_factory_context(),
+        )
+
+    def _get_filter_spec(self, doc_types, include_configured=True):
+
         extras = (
             [self.configured_filter]
             if include_configured and self.configured_filter else []
@@ -240,13 +286,10 @@ class DataSourceConfiguration(UnicodeMixIn, CachedCouchDocumentMixin, Document,
                 ],
             },
         ]
-        return FilterFactory.from_spec(
-            {
-                'type': 'and',
-                'filters': built_in_filters + extras,
-            },
-            context=self.get_factory_context(),
-        )
+        return {
+            'type': 'and',
+            'filters': built_in_filters + extras,
+        }
 
     def _get_domain_filter_spec(self):
         return {
@@ -355,7 +398,7 @@ class DataSourceConfiguration(UnicodeMixIn, CachedCouchDocumentMixin, Document,
         return self.columns_by_id.get(column_id)
 
     def get_items(self, document, eval_context=None):
-        if self.filter(document):
+        if self.filter(document, eval_context):
             if not self.base_item_expression:
                 return [document]
             else:
@@ -3,7 +3,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 import hashlib
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 from datetime import datetime, timedelta
 
 import six
@@ -33,6 +33,7 @@ from fluff.signals import (
     reformat_alembic_diffs
 )
 from pillowtop.checkpoints.manager import KafkaPillowCheckpoint
+from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE, PROCESSOR_CHUNK_HEARTBEAT_MS
 from pillowtop.logger import pillow_logging
 from pillowtop.pillow.interface import ConstructedPillow
 from pillowtop.processors import PillowProcessor
@@ -234,13 +235,13 @@ class ConfigurableReportPillowProcessor(ConfigurableReportTableManagerMixin, Pil
             # make copy to avoid modifying list during iteration
             adapters = list(self.table_adapters_by_domain[domain])
             for table in adapters:
-                if table.config.filter(doc):
+                if table.config.filter(doc, eval_context):
                     if table.run_asynchronous:
                         async_tables.append(table.config._id)
                     else:
                         self._save_doc_to_table(domain, table, doc, eval_context)
                         eval_context.reset_iteration()
-                elif table.config.deleted_filter(doc) or table.doc_exists(doc):
+                elif table.config.deleted_filter(doc, eval_context) or table.doc_exists(doc):
                     table.delete(doc)
 
             if async_tables:
@@ -250,6 +251,104 @@ class ConfigurableReportPillowProcessor(ConfigurableReportTableManagerMixin, Pil
             domain: timer.duration
         })
 
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        """
+        Evaluate all changes in the chunk and write the rows for each data source table
+        with a single DELETE and INSERT. If writing to a table fails, the changes that
+        touched it are returned to be retried individually, which goes through the
+        per-doc best effort save.
+        """
+        self.bootstrap_if_needed()
+
+        # only the latest change to each doc needs to be processed, otherwise
+        # rows from an older revision would be written along with the new ones
+        latest_changes = OrderedDict()
+        for change in changes_chunk:
+            latest_changes.pop(change.metadata.document_id, None)
+            latest_changes[change.metadata.document_id] = change
+
+        change_exceptions = []
+        rows_by_adapter = defaultdict(list)
+        doc_ids_to_delete_by_adapter = defaultdict(set)
+        changes_by_adapter = defaultdict(list)
+        for change in latest_changes.values():
+            domain = change.metadata.domain
+            if not domain or domain not in self.table_adapters_by_domain:
+                # if no domain we won't save to any UCR table
+                continue
+
+            if change.deleted:
+                for table in self.table_adapters_by_domain[domain]:
+                    doc_ids_to_delete_by_adapter[table].add(change.metadata.document_id)
+                    changes_by_adapter[table].append(change)
+
+            try:
+                doc = change.get_document()
+                ensure_document_exists(change)
+                ensure_matched_revisions(change)
+            except Exception as e:
+                change_exceptions.append((change, e))
+                continue
+
+            if doc is None:
+                continue
+
+            with TimingContext() as timer:
+                eval_context = EvaluationContext(doc)
+                async_tables = []
+                # make copy to avoid modifying list during iteration
+                adapters = list(self.table_adapters_by_domain[domain])
+                for table in adapters:
+                    if table.config.filter(doc, eval_context):
+                        if table.run_asynchronous:
+                            async_tables.append(table.config._id)
+                            continue
+                        rows = self._get_rows_best_effort(domain, table, doc, eval_context)
+                        eval_context.reset_iteration()
+                        if rows is None:
+                            continue
+                        rows_by_adapter[table].extend(rows)
+                    # the doc's old rows are always removed before the new rows are inserted
+                    # so there is no need to check whether it exists in the table
+                    doc_ids_to_delete_by_adapter[table].add(doc['_id'])
+                    changes_by_adapter[table].append(change)
+
+                if async_tables:
+                    AsyncIndicator.update_from_kafka_change(change, async_tables)
+
+            self.domain_timing_context.update(**{
+                domain: timer.duration
+            })
+
+        retry_changes = set()
+        for table, doc_ids in doc_ids_to_delete_by_adapter.items():
+            try:
+                table.save_rows(rows_by_adapter[table], doc_ids_to_delete=doc_ids)
+            except Exception as e:
+                pillow_logging.exception("Error saving chunk to UCR table %s: %s", table.config._id, e)
+                retry_changes.update(changes_by_adapter[table])
+
+        failed_changes = {change for change, exception in change_exceptions}
+        retry_changes = [
+            change for change in changes_chunk
+            if change in retry_changes and change not in failed_changes
+        ]
+        return retry_changes, change_exceptions
+
+    # rows are written to each table once per chunk so only the time taken to
+    # evaluate the doc is logged here
+    @time_ucr_process_change
+    def _get_rows_best_effort(self, domain, table, doc, eval_context):
+        try:
+            return table.get_all_values(doc, eval_context)
+        except Exception as e:
+            try:
+                table.handle_exception(doc, e)
+            except UserReportsWarning:
+                # remove it until the next bootstrap call
+                self.table_adapters_by_domain[domain].remove(table)
+            return None
+
     def checkpoint_updated(self):
         total_duration = sum(self.domain_timing_context.values())
         duration_seen = 0
@@ -273,9 +372,11 @@ class ConfigurableReportKafkaPillow(ConstructedPillow):
     # we could easily remove the class and push all the stuff in __init__ to
     # get_kafka_ucr_pillow below if we wanted.
 
-    def __init__(self, processor, pillow_name, topics, num_processes, process_num, retry_errors=False):
+    def __init__(self, processor, pillow_name, topics, num_processes, process_num, retry_errors=False,
+                 processor_chunk_size=0):
         change_feed = KafkaChangeFeed(
-            topics, group_id=pillow_name, num_processes=num_processes, process_num=process_num
+            topics, group_id=pillow_name, num_processes=num_processes, process_num=process_num,
+            heartbeat_ms=PROCESSOR_CHUNK_HEARTBEAT_MS if processor_chunk_size else None,
         )
         checkpoint = KafkaPillowCheckpoint(pillow_name, topics)
         event_handler = KafkaCheckpointEventHandler(
@@ -287,7 +388,8 @@ class ConfigurableReportKafkaPillow(ConstructedPillow):
             change_feed=change_feed,
             processor=processor,
             checkpoint=checkpoint,
-            change_processed_event_handler=event_handler
+            change_processed_event_handler=event_handler,
+            processor_chunk_size=processor_chunk_size,
         )
         # set by the superclass constructor
         assert self.processors is not None
@@ -308,7 +410,8 @@ class ConfigurableReportKafkaPillow(ConstructedPillow):
 
 def get_kafka_ucr_pillow(pillow_id='kafka-ucr-main', ucr_division=None,
                          include_ucrs=None, exclude_ucrs=None, topics=None,
-                         num_processes=1, process_num=0, **kwargs):
+                         num_processes=1, process_num=0,
+                         processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE, **kwargs):
     topics = topics or KAFKA_TOPICS
     topics = [kafka_bytestring(t) for t in topics]
     return ConfigurableReportKafkaPillow(
@@ -323,12 +426,14 @@ def get_kafka_ucr_pillow(pillow_id='kafka-ucr-main', ucr_division=None,
         topics=topics,
         num_processes=num_processes,
         process_num=process_num,
+        processor_chunk_size=processor_chunk_size,
     )
 
 
 def get_kafka_ucr_static_pillow(pillow_id='kafka-ucr-static', ucr_division=None,
                                 include_ucrs=None, exclude_ucrs=None, topics=None,
-                                num_processes=1, process_num=0, **kwargs):
+                                num_processes=1, process_num=0,
+                                processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE, **kwargs):
     topics = topics or KAFKA_TOPICS
     topics = [kafka_bytestring(t) for t in topics]
     return ConfigurableReportKafkaPillow(
@@ -344,5 +449,6 @@ def get_kafka_ucr_static_pillow(pillow_id='kafka-ucr-static', ucr_division=None,
         topics=topics,
         num_processes=num_processes,
         process_num=process_num,
-        retry_errors=True
+        retry_errors=True,
+        processor_chunk_size=processor_chunk_size,
     )
@@ -0,0 +1,10 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from django.dispatch.dispatcher import Signal
+
+
+# Sent before rows are written to a data source table.
+#   adapter: the IndicatorSqlAdapter for the table
+#   rows: the rows that will be inserted, as dicts of column name to value
+#   doc_ids: IDs of the docs whose existing rows will be removed
+pre_save_indicator_rows = Signal(providing_args=["adapter", "rows", "doc_ids"])
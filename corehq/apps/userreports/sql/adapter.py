@@ -13,6 +13,7 @@ from corehq.apps.userreports.adapter import IndicatorAdapter
 from corehq.apps.userreports.exceptions import (
     ColumnNotFoundError, TableRebuildError, TableNotFoundWarning,
     MissingColumnWarning)
+from corehq.apps.userreports.signals import pre_save_indicator_rows
 from corehq.apps.userreports.sql.columns import column_to_sql
 from corehq.apps.userreports.sql.connection import get_engine_id
 from corehq.apps.userreports.util import get_table_name
@@ -153,8 +154,12 @@ class IndicatorSqlAdapter(IndicatorAdapter):
             rows.extend(self.get_all_values(doc))
         self.save_rows(rows)
 
-    def save_rows(self, rows):
-        if not rows:
+    def save_rows(self, rows, doc_ids_to_delete=None):
+        """
+        :param doc_ids_to_delete: IDs of additional docs whose rows should be removed in the
+                                  same transaction, e.g. docs that no longer produce any rows
+        """
+        if not rows and not doc_ids_to_delete:
             return
 
         # transform format from ColumnValue to dict
@@ -163,6 +168,8 @@ class IndicatorSqlAdapter(IndicatorAdapter):
             for row in rows
         ]
         doc_ids = set(row['doc_id'] for row in formatted_rows)
+        doc_ids.update(doc_ids_to_delete or [])
+        pre_save_indicator_rows.send(sender=self.__class__, adapter=self, rows=formatted_rows, doc_ids=doc_ids)
         table = self.get_table()
         delete = table.delete(table.c.doc_id.in_(doc_ids))
         # Using session.bulk_insert_mappings below might seem more inline
@@ -173,12 +180,13 @@ class IndicatorSqlAdapter(IndicatorAdapter):
         #   the plain INSERT INTO VALUES statement resulting from below line
         #   because bulk_insert_mappings is meant for multi-table insertion
         #   so it has overhead of format conversions and multiple statements
-        insert = table.insert().values(formatted_rows)
         with self.session_helper.session_context() as session:
             session.execute(delete)
-            session.execute(insert)
+            if formatted_rows:
+                session.execute(table.insert().values(formatted_rows))
 
     def delete(self, doc):
+        pre_save_indicator_rows.send(sender=self.__class__, adapter=self, rows=[], doc_ids={doc['_id']})
         table = self.get_table()
         delete = table.delete(table.c.doc_id == doc['_id'])
         with self.session_helper.session_context() as session:
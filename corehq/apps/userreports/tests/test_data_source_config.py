@@ -7,6 +7,7 @@ from django.test import SimpleTestCase, TestCase
 from jsonobject.exceptions import BadValueError
 from corehq.apps.userreports.exceptions import BadSpecError
 from corehq.apps.userreports.models import DataSourceConfiguration
+from corehq.apps.userreports.specs import EvaluationContext
 from corehq.apps.userreports.tests.utils import get_sample_data_source, get_sample_doc_and_indicators
 from corehq.sql_db.connections import UCR_ENGINE_ID
 
@@ -38,6 +39,24 @@ class DataSourceConfigurationTest(SimpleTestCase):
         doc = dict(doc_type="CommCareCase", domain='user-reports', type='ticket')
         self.assertTrue(self.config.filter(doc))
 
+    def test_filter_result_shared_in_context(self):
+        doc = dict(doc_type="CommCareCase", domain='user-reports', type='ticket')
+        eval_context = EvaluationContext(doc)
+        self.assertTrue(self.config.filter(doc, eval_context))
+        with patch.object(DataSourceConfiguration, '_get_main_filter') as get_filter:
+            self.assertTrue(self.config.filter(doc, eval_context))
+            # a copy of the config with the same filter shares the result
+            self.assertTrue(DataSourceConfiguration.wrap(self.config.to_json()).filter(doc, eval_context))
+            self.assertEqual(2, get_filter.call_count)
+            get_filter.return_value.assert_not_called()
+
+    def test_filter_ignores_context_for_other_doc(self):
+        doc = dict(doc_type="CommCareCase", domain='user-reports', type='ticket')
+        eval_context = EvaluationContext(doc)
+        self.assertTrue(self.config.filter(doc, eval_context))
+        other_doc = dict(doc_type="CommCareCase", domain='user-reports', type='not-ticket')
+        self.assertFalse(self.config.filter(other_doc, eval_context))
+
     def test_columns(self):
         # columns
         expected_columns = [
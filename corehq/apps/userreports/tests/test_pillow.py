@@ -239,6 +239,42 @@ class IndicatorPillowTest(TestCase):
 
         self.assertIs(self.adapter.doc_exists(sample_doc), True)
 
+    @patch('corehq.apps.userreports.specs.datetime')
+    def test_process_changes_chunk(self, datetime_mock):
+        datetime_mock.utcnow.return_value = self.fake_time_now
+        sample_doc, expected_indicators = get_sample_doc_and_indicators(self.fake_time_now)
+        other_doc = dict(sample_doc, _id=uuid.uuid4().hex)
+        wrong_type_doc = dict(sample_doc, _id=uuid.uuid4().hex, type='wrong_type')
+        changes = [doc_to_change(doc) for doc in (sample_doc, other_doc, wrong_type_doc)]
+
+        self.assertEqual(([], []), self.pillow.process_changes_chunk(changes))
+        self.adapter.refresh_table()
+        self.assertEqual(2, self.adapter.get_query_object().count())
+
+        # docs that no longer pass the filter are removed in the same chunk write
+        other_doc['type'] = 'wrong_type'
+        self.assertEqual(([], []), self.pillow.process_changes_chunk([doc_to_change(other_doc)]))
+        self._check_sample_doc_state(expected_indicators)
+
+    def test_process_changes_chunk_save_failure(self):
+        sample_doc, _ = get_sample_doc_and_indicators(self.fake_time_now)
+        changes = [doc_to_change(sample_doc)]
+        with patch('corehq.apps.userreports.sql.adapter.IndicatorSqlAdapter.save_rows',
+                   side_effect=Exception('bulk write failed')):
+            retry_changes, change_exceptions = self.pillow.process_changes_chunk(changes)
+        self.assertEqual(changes, retry_changes)
+        self.assertEqual([], change_exceptions)
+
+    @patch('corehq.apps.userreports.specs.datetime')
+    def test_process_changes_chunk_same_doc_twice(self, datetime_mock):
+        datetime_mock.utcnow.return_value = self.fake_time_now
+        sample_doc, expected_indicators = get_sample_doc_and_indicators(self.fake_time_now)
+        old_revision = dict(sample_doc, owner_id='old-owner')
+        changes = [doc_to_change(old_revision), doc_to_change(sample_doc)]
+
+        self.assertEqual(([], []), self.pillow.process_changes_chunk(changes))
+        self._check_sample_doc_state(expected_indicators)
+
 
 @override_settings(TESTS_SHOULD_USE_SQL_BACKEND=True)
 class ProcessRelatedDocTypePillowTest(TestCase):
@@ -1,3 +1,7 @@
 from .all_commcare_users import (get_all_commcare_users_by_domain,
                                  get_user_docs_by_username, get_practice_mode_mobile_workers)
-from .couch_users import get_user_id_by_username, get_user_id_and_doc_type_by_domain
+from .couch_users import (
+    get_user_id_by_username,
+    get_user_ids_by_usernames,
+    get_user_id_and_doc_type_by_domain,
+)
@@ -21,6 +21,24 @@ def get_user_id_by_username(username):
     return None
 
 
+def get_user_ids_by_usernames(usernames):
+    """
+    :returns: ``{username: user_id}`` for the users that exist
+    """
+    usernames = [username for username in usernames if username]
+    if not usernames:
+        return {}
+
+    result = CouchUser.view(
+        'users/by_username',
+        keys=usernames,
+        include_docs=False,
+        reduce=False,
+        stale=stale_ok(),
+    )
+    return {row["key"]: row["id"] for row in result}
+
+
 def get_display_name_for_user_id(domain, user_id, default=None):
     if user_id:
         user = CouchUser.get_by_user_id(user_id, domain)
@@ -24,9 +24,16 @@ Example case graphs with outcomes:
 from __future__ import absolute_import
 from __future__ import unicode_literals
 import logging
+import sys
+import threading
+import time
 from collections import defaultdict
 from itertools import chain, islice
 
+import six
+from django.db import connections
+from six.moves.queue import Full, Queue
+
 from casexml.apps.case.const import CASE_INDEX_EXTENSION as EXTENSION
 from casexml.apps.phone.data_providers.case.load_testing import (
     get_xml_for_response,
@@ -36,6 +43,11 @@ from casexml.apps.phone.data_providers.case.stock import get_stock_payload
 from casexml.apps.phone.data_providers.case.utils import get_case_sync_updates
 from casexml.apps.phone.tasks import ASYNC_RESTORE_SENT
 from corehq.form_processor.interfaces.dbaccessors import CaseAccessors
+from corehq.toggles import LIVEQUERY_PREFETCH
+from corehq.util.timer import NestableTimer
+
+# number of case batches loaded ahead of the batch being serialized
+PREFETCH_BATCHES = 1
 
 
 def do_livequery(timing_context, restore_state, response, async_task=None):
@@ -239,11 +251,14 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
 
         with timing_context("compile_response(%s cases)" % len(sync_ids)):
             iaccessor = PrefetchIndexCaseAccessor(accessor, indices)
+            batches = batch_cases(iaccessor, sync_ids)
+            if LIVEQUERY_PREFETCH.enabled(restore_state.domain):
+                batches = prefetch_batches(timing_context, batches)
             compile_response(
                 timing_context,
                 restore_state,
                 response,
-                batch_cases(iaccessor, sync_ids),
+                batches,
                 init_progress(async_task, len(sync_ids)),
             )
 
@@ -290,6 +305,60 @@ def batch_cases(accessor, case_ids):
         yield accessor.get_cases(next_ids)
 
 
+def prefetch_batches(timing_context, batches):
+    """Load batches in a background thread while the caller processes them
+
+    At most `PREFETCH_BATCHES` are loaded ahead of the batch being
+    processed. Batches are yielded in their original order. The time
+    spent loading each batch is added to `timing_context` as it is
+    yielded since the context can't be used from another thread.
+    """
+    done = object()
+    queue = Queue(PREFETCH_BATCHES)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def load_batches():
+        try:
+            while True:
+                start = time.time()
+                batch = next(batches, done)
+                if not put((batch, start, time.time(), None)) or batch is done:
+                    break
+        except Exception:
+            put((None, None, None, sys.exc_info()))
+        finally:
+            # database connections are per thread
+            connections.close_all()
+
+    thread = threading.Thread(target=load_batches, name="livequery-prefetch")
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            with timing_context("wait_for_cases"):
+                batch, start, end, exc_info = queue.get()
+            if exc_info is not None:
+                six.reraise(*exc_info)
+            if batch is done:
+                break
+            timer = NestableTimer("get_cases (%s cases)" % len(batch))
+            timing_context.peek().append(timer)
+            timer.beginning = start
+            timer.end = end
+            yield batch
+    finally:
+        stopped.set()
+
+
 def init_progress(async_task, total):
     if not async_task:
         return lambda done: None
@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import shutil
+import tempfile
+import time
+
+from django.core.management import BaseCommand
+from six.moves import range
+
+from casexml.apps.phone.restore import RestoreContent
+
+
+class Command(BaseCommand):
+    """Compare single-pass restore payload generation with the previous
+    approach of copying the body into a second file to add the header.
+
+    Usage: ./manage.py benchmark_restore_content --elements 50000
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--elements', type=int, default=50000)
+        parser.add_argument('--element-size', type=int, default=1000,
+                            help="Approximate size in bytes of each element")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, elements, element_size, repeat, **options):
+        element = b'<case>%s</case>' % (b'x' * element_size)
+        for name, func in [('copy', _copy_payload), ('single-pass', _single_pass_payload)]:
+            timings = []
+            for i in range(repeat):
+                start = time.time()
+                size = func(element, elements)
+                timings.append(time.time() - start)
+            print("{:<12} {:.3f}s (best of {}) {} bytes".format(name, min(timings), repeat, size))
+
+
+def _single_pass_payload(element, count):
+    with RestoreContent('benchmark', items=True) as content:
+        for i in range(count):
+            content.append(element)
+        with content.get_fileobj() as fileobj:
+            return _size(fileobj)
+
+
+def _copy_payload(element, count):
+    # replicates the former RestoreContent.get_fileobj implementation
+    with tempfile.TemporaryFile('w+b') as body:
+        for i in range(count):
+            body.write(element)
+        with tempfile.TemporaryFile('w+b') as fileobj:
+            fileobj.write(RestoreContent.start_tag_template % {
+                b"items": RestoreContent.items_template % (count + 1),
+                b"username": b'benchmark',
+                b"nature": b'ota_restore_success',
+            })
+            body.seek(0)
+            shutil.copyfileobj(body, fileobj)
+            fileobj.write(RestoreContent.closing_tag)
+            fileobj.seek(0)
+            return _size(fileobj)
+
+
+def _size(fileobj):
+    fileobj.seek(0, 2)
+    return fileobj.tell()
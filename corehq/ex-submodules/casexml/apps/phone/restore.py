@@ -3,7 +3,6 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 import logging
 import os
-import shutil
 import tempfile
 import uuid
 from io import BytesIO
@@ -102,24 +101,37 @@ class StockSettings(object):
 
 
 class RestoreContent(object):
+    """Restore payload written in a single pass
+
+    The opening tag is written before any elements are appended. When
+    the item count is requested, room for the ``items`` attribute is
+    reserved with trailing whitespace inside the tag and back-patched
+    once the body is complete, so the body never has to be copied into
+    a second file.
+    """
     start_tag_template = (
         b'<OpenRosaResponse xmlns="http://openrosa.org/http/response"%(items)s>'
         b'<message nature="%(nature)s">Successfully restored account %(username)s!</message>'
     )
     items_template = b' items="%s"'
     closing_tag = b'</OpenRosaResponse>'
+    # enough room for any realistic item count
+    max_items_digits = 12
 
     def __init__(self, username=None, items=False):
         self.username = username
         self.items = items
         self.num_items = 0
+        self.response_body = None
 
     def __enter__(self):
         self.response_body = tempfile.TemporaryFile('w+b')
+        self.response_body.write(self._get_start_tag(b''))
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.response_body.close()
+        if self.response_body is not None:
+            self.response_body.close()
 
     def append(self, xml_element):
         self.num_items += 1
@@ -134,29 +146,35 @@ class RestoreContent(object):
         for element in iterable:
             self.append(element)
 
-    def _write_to_file(self, fileobj):
-        # Add 1 to num_items to account for message element
-        items = (self.items_template % (self.num_items + 1)) if self.items else b''
-        fileobj.write(self.start_tag_template % {
+    def _get_start_tag(self, items):
+        if self.items:
+            items = items.ljust(len(self.items_template % (b'9' * self.max_items_digits)))
+        return self.start_tag_template % {
             b"items": items,
             b"username": self.username.encode("utf8"),
             b"nature": ResponseNature.OTA_RESTORE_SUCCESS.encode("utf8"),
-        })
-
-        self.response_body.seek(0)
-        shutil.copyfileobj(self.response_body, fileobj)
-
-        fileobj.write(self.closing_tag)
+        }
 
     def get_fileobj(self):
-        fileobj = tempfile.TemporaryFile('w+b')
+        """Finish the payload and hand over its file object
+
+        The returned file is owned by the caller; this object must not be
+        used for writing afterwards.
+        """
+        fileobj = self.response_body
         try:
-            self._write_to_file(fileobj)
+            fileobj.write(self.closing_tag)
+            if self.items:
+                # Add 1 to num_items to account for message element
+                fileobj.seek(0)
+                fileobj.write(self._get_start_tag(self.items_template % (self.num_items + 1)))
             fileobj.seek(0)
-            return fileobj
         except:
             fileobj.close()
             raise
+        finally:
+            self.response_body = None
+        return fileobj
 
 
 class RestoreResponse(object):
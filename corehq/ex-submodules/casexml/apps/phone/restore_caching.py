@@ -31,7 +31,7 @@ class _CacheAccessor(object):
         get_redis_default_cache().delete(self.cache_key)
 
 
-@quickcache(['domain', 'user_id'], timeout=24 * 60 * 60)
+@quickcache(['domain', 'user_id'], timeout=24 * 60 * 60, lru_timeout=60 * 60)
 def get_loadtest_factor_for_user(domain, user_id):
     from corehq.apps.users.models import CouchUser, CommCareUser
     if ENABLE_LOADTEST_USERS.enabled(domain) and user_id:
@@ -46,7 +46,7 @@ def _get_new_arbitrary_value():
     return datetime.datetime.utcnow().isoformat()
 
 
-@quickcache(['domain'], timeout=60 * 24 * 60 * 60)
+@quickcache(['domain'], timeout=60 * 24 * 60 * 60, lru_timeout=60 * 60)
 def _get_domain_freshness_token(domain):
     return _get_new_arbitrary_value()
 
@@ -0,0 +1,33 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from django.test import SimpleTestCase
+
+from casexml.apps.phone.data_providers.case.livequery import prefetch_batches
+from corehq.util.timer import TimingContext
+
+
+class PrefetchBatchesTest(SimpleTestCase):
+
+    def test_order(self):
+        batches = iter([[1, 2], [3], [4, 5, 6]])
+        with TimingContext("test") as timing_context:
+            result = list(prefetch_batches(timing_context, batches))
+        self.assertEqual(result, [[1, 2], [3], [4, 5, 6]])
+        self.assertEqual(
+            [timer.name for timer in timing_context.to_list(exclude_root=True)],
+            ["wait_for_cases", "get_cases (2 cases)",
+             "wait_for_cases", "get_cases (1 cases)",
+             "wait_for_cases", "get_cases (3 cases)",
+             "wait_for_cases"],
+        )
+
+    def test_error(self):
+        def batches():
+            yield [1]
+            raise ValueError("boom")
+
+        with TimingContext("test") as timing_context:
+            result = prefetch_batches(timing_context, batches())
+            self.assertEqual(next(result), [1])
+            with self.assertRaises(ValueError):
+                next(result)
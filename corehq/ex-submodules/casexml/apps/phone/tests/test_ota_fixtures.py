@@ -2,15 +2,14 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 from xml.etree import cElementTree as ElementTree
 from django.test import TestCase
-from corehq.blobs import get_blob_db
 from casexml.apps.phone.fixtures import generator
 from casexml.apps.phone.tests.utils import create_restore_user
 from corehq.apps.domain.models import Domain
 from corehq.apps.fixtures.models import (
     FixtureDataType, FixtureTypeField,
     FixtureDataItem, FieldList, FixtureItemField,
-    FIXTURE_BUCKET
 )
+from corehq.apps.fixtures.utils import clear_fixture_cache
 from corehq.apps.groups.models import Group
 from corehq.apps.users.models import CommCareUser
 from corehq.apps.users.dbaccessors.all_commcare_users import delete_all_users
@@ -51,7 +50,7 @@ class OtaFixtureTest(TestCase):
             item_list[0].delete()
             item_list[1].delete()
 
-        get_blob_db().delete(DOMAIN, FIXTURE_BUCKET)
+        clear_fixture_cache(DOMAIN)
         cls.domain.delete()
         super(OtaFixtureTest, cls).tearDownClass()
 
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
+from xml.etree import cElementTree as ElementTree
+
 from django.test import TestCase
 from django.test.testcases import SimpleTestCase
 from django.test.utils import override_settings
@@ -48,7 +50,10 @@ class OtaV3RestoreTest(TestCase):
 class TestRestoreContent(SimpleTestCase):
 
     def _expected(self, username, body, items=None):
-        items_text = (b' items="%s"' % items) if items is not None else b''
+        items_text = b''
+        if items is not None:
+            # the items attribute is padded to a fixed width so it can be back-patched
+            items_text = (b' items="%s"' % items).ljust(len(b' items="%s"' % (b'9' * 12)))
         return (
             b'<OpenRosaResponse xmlns="http://openrosa.org/http/response"%(items)s>'
             b'<message nature="ota_restore_success">Successfully restored account %(username)s!</message>'
@@ -77,3 +82,19 @@ class TestRestoreContent(SimpleTestCase):
             response.append(body)
             with response.get_fileobj() as fileobj:
                 self.assertEqual(expected, fileobj.read())
+
+    def test_items_is_valid_xml(self):
+        user = 'user1'
+        with RestoreContent(user, True) as response:
+            response.extend([b'<elem>data0</elem>', b'<elem>data1</elem>'])
+            with response.get_fileobj() as fileobj:
+                root = ElementTree.fromstring(fileobj.read())
+        self.assertEqual(root.get('items'), '3')
+        self.assertEqual(len(root), 3)
+
+    def test_body_written_once(self):
+        with RestoreContent('user1', True) as response:
+            body_file = response.response_body
+            response.append(b'<elem>data0</elem>')
+            with response.get_fileobj() as fileobj:
+                self.assertIs(fileobj, body_file)
@@ -173,7 +173,7 @@ def export_raw_to_writer(headers, data, file, format=Format.XLS_2007,
     """
     exposing export_raw as a context manager gives the caller the opportunity
     to interact with `writer` before it is closed. The caller could, for example,
-    add excel styling or excel properties.
+    set excel document properties on `writer.properties` for Excel 2007 exports.
 
     """
     # transform docs onto output and save
@@ -9,10 +9,11 @@ import os
 from django.test import SimpleTestCase
 from lxml import html, etree
 from mock import patch, Mock
+import openpyxl
 
 from couchexport.export import export_from_tables
 from couchexport.models import Format
-from couchexport.writers import ZippedExportWriter, CsvFileWriter, PythonDictWriter
+from couchexport.writers import ZippedExportWriter, CsvFileWriter, PythonDictWriter, Excel2007ExportWriter
 
 
 class ZippedExportWriterTests(SimpleTestCase):
@@ -121,6 +122,49 @@ class Excel2007ExportWriterTests(SimpleTestCase):
         tables = [[b'table\xe2\x80\x93title', table]]
         export_from_tables(tables, file_, format_)
 
+    def test_values(self):
+        file_ = io.BytesIO()
+        table = [
+            ['text', 'int', 'float', 'bool', 'empty', 'formula', 'bytes', 'dirty'],
+            ['<b>', 3, 1.5, True, None, '=HYPERLINK("http://example.com")', b'caf\xc3\xa9', 'a\x01b'],
+        ]
+        export_from_tables([['Sheet & 1', table]], file_, Format.XLS_2007)
+        workbook = openpyxl.load_workbook(file_)
+        self.assertEqual(['Sheet & 1'], workbook.sheetnames)
+        rows = [[cell.value for cell in row] for row in workbook['Sheet & 1'].iter_rows()]
+        self.assertEqual(table[0], rows[0])
+        self.assertEqual(
+            ['<b>', 3, 1.5, True, None, '=HYPERLINK("http://example.com")', 'café', 'a?b'],
+            rows[1]
+        )
+
+    def test_format_as_text(self):
+        file_ = io.BytesIO()
+        writer = Excel2007ExportWriter(format_as_text=True)
+        writer.open([('table', [['header', 'empty']])], file_)
+        writer.write([('table', [['value', '']])])
+        writer.close()
+        sheet = openpyxl.load_workbook(file_).worksheets[0]
+        self.assertEqual(
+            [[('header', '@'), ('empty', '@')], [('value', '@'), (None, '@')]],
+            [[(cell.value, cell.number_format) for cell in row] for row in sheet.iter_rows()]
+        )
+
+    def test_no_tables(self):
+        file_ = io.BytesIO()
+        writer = Excel2007ExportWriter()
+        writer.open([], file_)
+        writer.close()
+        self.assertEqual(1, len(openpyxl.load_workbook(file_).worksheets))
+
+    def test_properties(self):
+        file_ = io.BytesIO()
+        writer = Excel2007ExportWriter()
+        writer.open([('table', [['header']])], file_)
+        writer.properties.keywords = 'one two'
+        writer.close()
+        self.assertEqual('one two', openpyxl.load_workbook(file_).properties.keywords)
+
 
 class HeaderNameTest(SimpleTestCase):
 
@@ -2,17 +2,18 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import io
+import math
 from base64 import b64decode
 from codecs import BOM_UTF8
 import os
 import re
 import tempfile
 import zipfile
+from xml.sax.saxutils import escape
 import csv342 as csv
 import json
 import bz2
 from collections import OrderedDict
-import openpyxl
 
 from django.template.loader import render_to_string, get_template
 from django.utils.functional import Promise
@@ -20,8 +21,10 @@ import xlwt
 
 from couchexport.models import Format
 import six
-from openpyxl.styles import numbers
-from openpyxl.worksheet.write_only import WriteOnlyCell
+from openpyxl.packaging.core import DocumentProperties
+from openpyxl.utils import get_column_letter
+from openpyxl.xml.functions import tostring
+from six.moves import range
 from six.moves import zip
 from six.moves import map
 
@@ -358,57 +361,198 @@ class UnzippedCsvExportWriter(OnDiskExportWriter):
         self.file.seek(0)
 
 
-class Excel2007ExportWriter(ExportWriter):
+# Source: http://stackoverflow.com/questions/1707890/fast-way-to-filter-illegal-xml-unicode-chars-in-python
+ILLEGAL_XML_CHARS_RE = re.compile(
+    '[\x00-\x08\x0b-\x1f\x7f-\x84\x86-\x9f\ud800-\udfff\ufdd0-\ufddf\ufffe-\uffff]'
+)
+MAX_EXCEL_CELL_LENGTH = 32767
+EXCEL_ERROR_CODES = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+SPREADSHEETML_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+# index of the cell style in XLSX_STYLES that formats cells as text
+TEXT_STYLE_ID = 1
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+XLSX_CONTENT_TYPE_SHEET = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '<Relationship Id="rId2" Target="docProps/core.xml" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="{}" xmlns:r="{}"><sheets>{{sheets}}</sheets></workbook>'.format(
+        SPREADSHEETML_NS, RELATIONSHIPS_NS
+    )
+)
+XLSX_WORKBOOK_SHEET = '<sheet name="{name}" sheetId="{index}" r:id="rId{index}"/>'
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '<Relationship Id="rId{styles_index}" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK_RELS_SHEET = (
+    '<Relationship Id="rId{index}" Target="worksheets/sheet{index}.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+)
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="{}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    # numFmtId 49 is the built in text format, "@"
+    '<xf numFmtId="49" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+).format(SPREADSHEETML_NS)
+
+
+class XlsxSheetFileWriter(ExportFileWriter):
+    """
+    Writes the XML of a single worksheet to a temporary file one row at a time.
+    Strings are written inline rather than to a shared strings table so that
+    nothing is kept in memory between rows.
+    """
+
+    def __init__(self, format_as_text=False):
+        super(XlsxSheetFileWriter, self).__init__()
+        self.format_as_text = format_as_text
+        self._style = ' s="{}"'.format(TEXT_STYLE_ID) if format_as_text else ''
+        self._row_number = 0
+
+    def _begin_file(self):
+        self._file.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         '<worksheet xmlns="{}"><sheetData>'.format(SPREADSHEETML_NS).encode('utf-8'))
+
+    def write_row(self, row):
+        self._row_number += 1
+        row_number = six.text_type(self._row_number)
+        cells = ''.join(
+            self._get_cell_xml(get_column_letter(column_index) + row_number, value)
+            for column_index, value in enumerate(row, 1)
+        )
+        self._file.write('<row r="{}">{}</row>'.format(row_number, cells).encode('utf-8'))
+
+    def _get_cell_xml(self, reference, value):
+        if value is True or value is False:
+            return '<c r="{}"{} t="b"><v>{:d}</v></c>'.format(reference, self._style, value)
+        if isinstance(value, six.integer_types + (float,)):
+            if not (math.isnan(value) or math.isinf(value)):
+                return '<c r="{}"{}><v>{}</v></c>'.format(reference, self._style, "%.16g" % value)
+            value = None
+
+        value = get_excel_string(value)
+        if not value:
+            # keep the cell's formatting so that values entered later are formatted as text
+            return '<c r="{}"{}/>'.format(reference, self._style) if self._style else ''
+        if len(value) > 1 and value.startswith('='):
+            return '<c r="{}"{}><f>{}</f></c>'.format(reference, self._style, escape(value[1:]))
+        if value in EXCEL_ERROR_CODES:
+            return '<c r="{}"{} t="e"><v>{}</v></c>'.format(reference, self._style, value)
+        return '<c r="{}"{} t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(
+            reference, self._style, escape(value)
+        )
+
+    def _end_file(self):
+        self._file.write(b'</sheetData></worksheet>')
+
+
+def get_excel_string(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    elif value is None:
+        value = ''
+    else:
+        value = six.text_type(value)
+    return ILLEGAL_XML_CHARS_RE.sub('?', value[:MAX_EXCEL_CELL_LENGTH])
+
+
+class Excel2007ExportWriter(OnDiskExportWriter):
+    """
+    Streams each table to a temporary worksheet file as rows are written and
+    puts them together into an XLSX file on close, so memory use doesn't
+    depend on the size of the export.
+
+    Document properties, such as keywords, can be set on ``properties``, an
+    openpyxl ``DocumentProperties`` like ``Workbook.properties``, until the
+    writer is closed.
+    """
     format = Format.XLS_2007
     max_table_name_size = 31
+    writer_class = XlsxSheetFileWriter
 
     def __init__(self, format_as_text=False):
         super(Excel2007ExportWriter, self).__init__()
         self.format_as_text = format_as_text
 
     def _init(self):
-        # https://openpyxl.readthedocs.io/en/latest/optimized.html
-        self.book = openpyxl.Workbook(write_only=True)
-
-        self.tables = {}
-        self.table_indices = {}
+        super(Excel2007ExportWriter, self)._init()
+        self.properties = DocumentProperties()
 
     def _init_table(self, table_index, table_title):
-        sheet = self.book.create_sheet()
-        sheet.title = table_title
-        self.tables[table_index] = sheet
-        self.table_indices[table_index] = 0
+        writer = self.writer_class(format_as_text=self.format_as_text)
+        self.tables[table_index] = writer
+        writer.open(table_title)
+        self.table_names[table_index] = table_title
 
     def _write_row(self, sheet_index, row):
-        sheet = self.tables[sheet_index]
-
-        # Source: http://stackoverflow.com/questions/1707890/fast-way-to-filter-illegal-xml-unicode-chars-in-python
-        dirty_chars = re.compile(
-            '[\x00-\x08\x0b-\x1f\x7f-\x84\x86-\x9f\ud800-\udfff\ufdd0-\ufddf\ufffe-\uffff]'
-        )
-
-        def get_write_value(value):
-            if isinstance(value, six.integer_types + (float,)):
-                return value
-            if isinstance(value, str):
-                value = six.text_type(value, encoding="utf-8")
-            elif value is not None:
-                value = six.text_type(value)
-            else:
-                value = ''
-            return dirty_chars.sub('?', value)
-
-        cells = [WriteOnlyCell(sheet, get_write_value(val)) for val in row]
-        if self.format_as_text:
-            for cell in cells:
-                cell.number_format = numbers.FORMAT_TEXT
-        sheet.append(cells)
+        self.tables[sheet_index].write_row(row)
 
     def _close(self):
-        """
-        Close any open file references, do any cleanup.
-        """
-        self.book.save(self.file)
+        if not self.tables:
+            # a workbook must have at least one sheet
+            self._init_table(None, 'Sheet')
+        super(Excel2007ExportWriter, self)._close()
+
+    def _write_final_result(self):
+        sheet_indices = list(range(1, len(self.tables) + 1))
+        archive = zipfile.ZipFile(self.file, 'w', zipfile.ZIP_DEFLATED)
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES.format(sheets=''.join(
+            XLSX_CONTENT_TYPE_SHEET.format(index=index) for index in sheet_indices
+        )).encode('utf-8'))
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS.encode('utf-8'))
+        archive.writestr('docProps/core.xml', tostring(self.properties.to_tree()))
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(sheets=''.join(
+            XLSX_WORKBOOK_SHEET.format(name=escape(get_excel_string(name), {'"': '&quot;'}), index=index)
+            for index, name in zip(sheet_indices, self.table_names.values())
+        )).encode('utf-8'))
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS.format(
+            sheets=''.join(XLSX_WORKBOOK_RELS_SHEET.format(index=index) for index in sheet_indices),
+            styles_index=len(sheet_indices) + 1,
+        ).encode('utf-8'))
+        archive.writestr('xl/styles.xml', XLSX_STYLES.encode('utf-8'))
+        for index, writer in zip(sheet_indices, self.tables.values()):
+            archive.write(writer.get_path(), 'xl/worksheets/sheet{}.xml'.format(index))
+        archive.close()
 
 
 class Excel2003ExportWriter(ExportWriter):
@@ -1,3 +1,9 @@
 
 CHECKPOINT_FREQUENCY = 100
 CHECKPOINT_MIN_WAIT = 300
+
+# number of changes processed together by pillows that support chunked processing
+DEFAULT_PROCESSOR_CHUNK_SIZE = 10
+# how often an idle change feed should yield an empty change so that partial chunks
+# are processed without waiting for more changes
+PROCESSOR_CHUNK_HEARTBEAT_MS = 1000
@@ -4,6 +4,7 @@ from abc import ABCMeta, abstractproperty, abstractmethod
 from datetime import datetime
 
 import sys
+import time
 
 from django.db.utils import DatabaseError, InterfaceError
 
@@ -37,6 +38,9 @@ class PillowRuntimeContext(object):
 
     def __init__(self, changes_seen=0):
         self.changes_seen = changes_seen
+        # number of changes covered by the change processed event being fired,
+        # which is more than one for pillows that process changes in chunks
+        self.changes_in_event = 1
 
 
 class PillowBase(six.with_metaclass(ABCMeta, object)):
@@ -48,6 +52,13 @@ class PillowBase(six.with_metaclass(ABCMeta, object)):
     # set to true to disable saving pillow retry errors
     retry_errors = True
 
+    # set to a positive number to process changes in chunks of up to this size
+    # (see ``process_changes_chunk``)
+    processor_chunk_size = 0
+
+    # maximum number of seconds to wait for a chunk to fill up before processing it
+    processor_chunk_max_wait = 1
+
     @abstractproperty
     def pillow_id(self):
         """
@@ -113,7 +124,12 @@ class PillowBase(six.with_metaclass(ABCMeta, object)):
         """
         context = PillowRuntimeContext(changes_seen=0)
         try:
-            for change in self.get_change_feed().iter_changes(since=since or None, forever=forever):
+            changes = self.get_change_feed().iter_changes(since=since or None, forever=forever)
+            if self.processor_chunk_size:
+                self._process_changes_in_chunks(changes, context)
+                return
+
+            for change in changes:
                 if change:
                     context.changes_seen += 1
                     self.process_with_error_handling(change, context)
@@ -122,7 +138,40 @@ class PillowBase(six.with_metaclass(ABCMeta, object)):
         except PillowtopCheckpointReset:
             self.process_changes(since=self.get_last_checkpoint_sequence(), forever=forever)
 
+    def _process_changes_in_chunks(self, changes, context):
+        """
+        Group changes into chunks of up to ``processor_chunk_size`` changes. A chunk is
+        processed once it is full, once ``processor_chunk_max_wait`` seconds have passed
+        since its first change or when the change feed yields an empty change (which
+        feeds do when no changes are available).
+        """
+        chunk = []
+        chunk_started = None
+        for change in changes:
+            if change:
+                if not chunk:
+                    chunk_started = time.time()
+                chunk.append(change)
+                if (len(chunk) < self.processor_chunk_size
+                        and time.time() - chunk_started < self.processor_chunk_max_wait):
+                    continue
+            elif not chunk:
+                self._update_checkpoint(None, None)
+                continue
+            self.process_chunk_with_error_handling(chunk, context)
+            chunk = []
+
+        if chunk:
+            self.process_chunk_with_error_handling(chunk, context)
+
     def process_with_error_handling(self, change, context):
+        if self._process_with_error_handling(change):
+            self._update_checkpoint(change, context)
+
+    def _process_with_error_handling(self, change):
+        """
+        :return: True if the change was processed, False if it was recorded as an error
+        """
         timer = TimingContext()
         try:
             with timer:
@@ -135,15 +184,75 @@ class PillowBase(six.with_metaclass(ABCMeta, object)):
                     self.get_name(), e,
                 ))
                 raise
+            processed = False
         else:
-            self._update_checkpoint(change, context)
             self._record_change_success_in_datadog(change)
+            processed = True
         self._record_change_in_datadog(change, timer)
+        return processed
+
+    def process_chunk_with_error_handling(self, changes_chunk, context):
+        """
+        Process a chunk of changes. If processing the chunk fails, or the processors ask
+        for some changes to be retried, those changes are processed one at a time
+        with the usual error handling. The checkpoint is only updated once, after every
+        change in the chunk has either succeeded or been recorded as an error, as
+        the change feed's offsets are already past the end of the chunk.
+        """
+        timer = TimingContext()
+        try:
+            with timer:
+                retry_changes, change_exceptions = self.process_changes_chunk(changes_chunk)
+        except Exception as ex:
+            pillow_logging.exception("[%s] Error processing chunk of %s changes, retrying serially: %s" % (
+                self.get_name(), len(changes_chunk), ex
+            ))
+            datadog_counter('commcare.change_feed.chunked.exceptions', tags=[
+                'pillow_name:{}'.format(self.get_name()),
+            ])
+            retry_changes, change_exceptions = changes_chunk, []
+
+        datadog_histogram('commcare.change_feed.chunked.processing_time', timer.duration, tags=[
+            'pillow_name:{}'.format(self.get_name()),
+        ])
+        datadog_histogram('commcare.change_feed.chunked.size', len(changes_chunk), tags=[
+            'pillow_name:{}'.format(self.get_name()),
+        ])
+
+        retry_ids = {id(change) for change in retry_changes}
+        exceptions_by_change = {id(change): exception for change, exception in change_exceptions}
+        for change in changes_chunk:
+            if id(change) in retry_ids:
+                self._process_with_error_handling(change)
+                continue
+
+            if id(change) in exceptions_by_change:
+                try:
+                    handle_pillow_error(self, change, exceptions_by_change[id(change)])
+                except Exception as e:
+                    notify_exception(None, 'processor error in pillow {} {}'.format(
+                        self.get_name(), e,
+                    ))
+                    raise
+            else:
+                self._record_change_success_in_datadog(change)
+            self._record_change_in_datadog(change, None)
+
+        context.changes_seen += len(changes_chunk)
+        context.changes_in_event = len(changes_chunk)
+        self._update_checkpoint(changes_chunk[-1], context)
 
     @abstractmethod
     def process_change(self, change):
         pass
 
+    def process_changes_chunk(self, changes_chunk):
+        """
+        Process a list of changes at once. See ``PillowProcessor.process_changes_chunk``
+        for the return value. By default every change is retried individually.
+        """
+        return changes_chunk, []
+
     @abstractmethod
     def fire_change_processed_event(self, change, context):
         """
@@ -227,7 +336,7 @@ class ConstructedPillow(PillowBase):
     """
 
     def __init__(self, name, checkpoint, change_feed, processor,
-                 change_processed_event_handler=None):
+                 change_processed_event_handler=None, processor_chunk_size=0):
         self._name = name
         self._checkpoint = checkpoint
         self._change_feed = change_feed
@@ -237,6 +346,7 @@ class ConstructedPillow(PillowBase):
             self.processors = [processor]
 
         self._change_processed_event_handler = change_processed_event_handler
+        self.processor_chunk_size = processor_chunk_size
 
     @property
     def pillow_id(self):
@@ -259,6 +369,22 @@ class ConstructedPillow(PillowBase):
         for processor in self.processors:
             processor.process_change(self, change)
 
+    def process_changes_chunk(self, changes_chunk):
+        retry_changes = []
+        change_exceptions = []
+        failed_ids = set()
+        for processor in self.processors:
+            retry, exceptions = processor.process_changes_chunk(self, changes_chunk)
+            for change in retry:
+                if id(change) not in failed_ids:
+                    failed_ids.add(id(change))
+                    retry_changes.append(change)
+            for change, exception in exceptions:
+                if id(change) not in failed_ids:
+                    failed_ids.add(id(change))
+                    change_exceptions.append((change, exception))
+        return retry_changes, change_exceptions
+
     def fire_change_processed_event(self, change, context):
         if self._change_processed_event_handler is not None:
             return self._change_processed_event_handler.fire_change_processed(change, context)
@@ -56,6 +56,71 @@ class ElasticProcessor(PillowProcessor):
             update=self._doc_exists(change.id),
         )
 
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        """
+        Index and delete a chunk of changes with a single ``_bulk`` request.
+
+        Changes that fail while being prepared, and documents that ES reports as failed,
+        are returned as pillow errors. Connection failures are raised so that the pillow
+        falls back to processing each change individually.
+        """
+        change_exceptions = []
+        actions = []
+        action_changes = []
+        for change in changes_chunk:
+            try:
+                action = self._get_bulk_action(change)
+            except Exception as e:
+                change_exceptions.append((change, e))
+                continue
+            if action:
+                actions.extend(action)
+                action_changes.append(change)
+
+        if actions:
+            result = self.elasticsearch.bulk(actions)
+            change_exceptions.extend(self._get_bulk_errors(result, action_changes, pillow_instance))
+        return [], change_exceptions
+
+    def _get_bulk_action(self, change):
+        """
+        :returns: The list of ``_bulk`` lines for the change or ``None`` if it should be skipped
+        """
+        metadata = {'_index': self.index_info.index, '_type': self.index_info.type, '_id': change.id}
+        if change.deleted and change.id:
+            return [{'delete': metadata}]
+
+        doc = change.get_document()
+
+        ensure_document_exists(change)
+        ensure_matched_revisions(change)
+
+        if doc is None or (self.doc_filter_fn and self.doc_filter_fn(doc)):
+            return None
+
+        return [{'index': metadata}, self.doc_transform_fn(doc)]
+
+    def _get_bulk_errors(self, result, action_changes, pillow_instance):
+        if not result.get('errors'):
+            return []
+
+        change_exceptions = []
+        for change, item in zip(action_changes, result['items']):
+            (op_type, item_result), = item.items()
+            if 'error' not in item_result:
+                continue
+            if op_type == 'delete' and item_result.get('status') == 404:
+                # deleting a doc that isn't in the index is not an error
+                continue
+            message = "[%s] Bulk %s error on %s/%s/%s: %s" % (
+                pillow_instance.get_name(),
+                op_type,
+                self.index_info.index, self.index_info.type, change.id,
+                item_result['error'],
+            )
+            change_exceptions.append((change, PillowtopIndexingError(message)))
+        return change_exceptions
+
     def _doc_exists(self, doc_id):
         return self.elasticsearch.exists(self.index_info.index, self.index_info.type, doc_id)
 
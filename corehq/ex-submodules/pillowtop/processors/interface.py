@@ -8,5 +8,22 @@ class PillowProcessor(six.with_metaclass(ABCMeta, object)):
     def process_change(self, pillow_instance, change):
         pass
 
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        """
+        Process a list of changes in one go. Processors that can do work in bulk
+        should override this; the default processes each change individually.
+
+        Raising an exception causes the pillow to retry every change in the chunk
+        one at a time using ``process_change``.
+
+        :returns: A tuple ``(retry_changes, change_exceptions)`` where ``retry_changes``
+                  is a list of changes that should be retried individually and
+                  ``change_exceptions`` is a list of ``(change, exception)`` tuples for
+                  changes that failed and should be recorded as pillow errors.
+        """
+        for change in changes_chunk:
+            self.process_change(pillow_instance, change)
+        return [], []
+
     def checkpoint_updated(self):
         pass
@@ -0,0 +1,128 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from django.test import SimpleTestCase
+from mock import MagicMock, patch
+
+from pillowtop.feed.mock import RandomChangeFeed
+from pillowtop.pillow.interface import ConstructedPillow
+from pillowtop.processors.interface import PillowProcessor
+from pillowtop.processors.sample import TestProcessor
+
+
+class ChunkRecordingProcessor(TestProcessor):
+
+    def __init__(self):
+        super(ChunkRecordingProcessor, self).__init__()
+        self.chunks_seen = []
+
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        self.chunks_seen.append(list(changes_chunk))
+        self.changes_seen.extend(changes_chunk)
+        return [], []
+
+
+class FailingChunkProcessor(TestProcessor):
+
+    def __init__(self, failing_seq=None):
+        super(FailingChunkProcessor, self).__init__()
+        self.failing_seq = failing_seq
+
+    def process_change(self, pillow_instance, change):
+        if change.sequence_id == self.failing_seq:
+            raise Exception('change failed')
+        super(FailingChunkProcessor, self).process_change(pillow_instance, change)
+
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        raise Exception('chunk failed')
+
+
+class PartialFailureProcessor(PillowProcessor):
+
+    def __init__(self, retry_seq, error_seq):
+        self.retry_seq = retry_seq
+        self.error_seq = error_seq
+        self.serially_processed = []
+
+    def process_change(self, pillow_instance, change):
+        self.serially_processed.append(change.sequence_id)
+
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        retry = [change for change in changes_chunk if change.sequence_id == self.retry_seq]
+        errors = [
+            (change, Exception('failed')) for change in changes_chunk
+            if change.sequence_id == self.error_seq
+        ]
+        return retry, errors
+
+
+class ChunkedProcessingTest(SimpleTestCase):
+
+    def _get_pillow(self, processor, count, chunk_size):
+        handler = MagicMock()
+        handler.fire_change_processed.return_value = False
+        return ConstructedPillow(
+            name='chunked-test-pillow',
+            checkpoint=MagicMock(),
+            # sequence IDs start at 1 since a falsy 'since' means start from the latest change
+            change_feed=RandomChangeFeed(count + 1),
+            processor=processor,
+            change_processed_event_handler=handler,
+            processor_chunk_size=chunk_size,
+        ), handler
+
+    def test_chunks(self):
+        processor = ChunkRecordingProcessor()
+        pillow, handler = self._get_pillow(processor, 7, 3)
+        pillow.process_changes(since=1, forever=False)
+        self.assertEqual([3, 3, 1], [len(chunk) for chunk in processor.chunks_seen])
+        self.assertEqual(list(range(1, 8)), [change.sequence_id for change in processor.changes_seen])
+        # one checkpoint event for each chunk
+        self.assertEqual(3, handler.fire_change_processed.call_count)
+
+    def test_legacy_processor(self):
+        processor = TestProcessor()
+        pillow, handler = self._get_pillow(processor, 5, 2)
+        pillow.process_changes(since=1, forever=False)
+        self.assertEqual(list(range(1, 6)), [change.sequence_id for change in processor.changes_seen])
+        self.assertEqual(3, handler.fire_change_processed.call_count)
+
+    def test_chunk_failure_retries_serially(self):
+        processor = FailingChunkProcessor()
+        pillow, handler = self._get_pillow(processor, 4, 4)
+        pillow.process_changes(since=1, forever=False)
+        self.assertEqual(list(range(1, 5)), [change.sequence_id for change in processor.changes_seen])
+        self.assertEqual(1, handler.fire_change_processed.call_count)
+
+    @patch('pillowtop.pillow.interface.handle_pillow_error')
+    def test_partial_failure(self, handle_pillow_error):
+        processor = PartialFailureProcessor(retry_seq=2, error_seq=3)
+        pillow, handler = self._get_pillow(processor, 4, 4)
+        pillow.process_changes(since=1, forever=False)
+        self.assertEqual([2], processor.serially_processed)
+        self.assertEqual(1, handle_pillow_error.call_count)
+        self.assertEqual(3, handle_pillow_error.call_args[0][1].sequence_id)
+        # the checkpoint is updated once every change in the chunk is resolved
+        self.assertEqual(
+            [4],
+            [call[0][0].sequence_id for call in handler.fire_change_processed.call_args_list]
+        )
+
+    @patch('pillowtop.pillow.interface.notify_exception')
+    @patch('pillowtop.pillow.interface.handle_pillow_error', side_effect=Exception('error not saved'))
+    def test_failure_mid_chunk_checkpoint(self, handle_pillow_error, notify_exception):
+        processor = FailingChunkProcessor(failing_seq=6)
+        pillow, handler = self._get_pillow(processor, 8, 4)
+        saved_offsets = []
+
+        def fire_change_processed(change, context):
+            # like KafkaCheckpointEventHandler, checkpoint the feed's offsets
+            saved_offsets.append(pillow.get_change_feed().get_processed_offsets())
+            return True
+        handler.fire_change_processed.side_effect = fire_change_processed
+
+        with self.assertRaises(Exception):
+            pillow.process_changes(since=1, forever=False)
+        self.assertEqual([1, 2, 3, 4, 5], [change.sequence_id for change in processor.changes_seen])
+        # the offsets of the failed chunk, which are past change 6, are never saved
+        self.assertEqual([{'test': 4}], saved_offsets)
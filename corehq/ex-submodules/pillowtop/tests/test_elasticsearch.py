@@ -6,6 +6,7 @@ import uuid
 from django.conf import settings
 from django.test import SimpleTestCase
 from elasticsearch.exceptions import ConnectionError
+from mock import MagicMock
 
 from corehq.elastic import get_es_new
 from corehq.util.elastic import ensure_index_deleted
@@ -14,7 +15,8 @@ from pillowtop.es_utils import INDEX_REINDEX_SETTINGS, INDEX_STANDARD_SETTINGS,
     set_index_reindex_settings, set_index_normal_settings, mapping_exists, initialize_index, \
     initialize_index_and_mapping, assume_alias
 from pillowtop.exceptions import PillowtopIndexingError
-from pillowtop.processors.elastic import send_to_elasticsearch
+from pillowtop.feed.interface import Change
+from pillowtop.processors.elastic import ElasticProcessor, send_to_elasticsearch
 from .utils import get_doc_count, get_index_mapping, TEST_INDEX_INFO
 
 
@@ -250,3 +252,51 @@ class TestSendToElasticsearch(SimpleTestCase):
 
         # attempt to create the same doc twice shouldn't fail
         self._send_to_es_and_check(doc)
+
+
+class TestElasticProcessorChunk(SimpleTestCase):
+
+    def setUp(self):
+        self.es = get_es_new()
+        self.index = TEST_INDEX_INFO.index
+
+        with trap_extra_setup(ConnectionError):
+            ensure_index_deleted(self.index)
+            initialize_index_and_mapping(self.es, TEST_INDEX_INFO)
+        self.processor = ElasticProcessor(self.es, TEST_INDEX_INFO)
+        self.pillow = MagicMock()
+        self.pillow.get_name.return_value = 'test'
+
+    def tearDown(self):
+        ensure_index_deleted(self.index)
+
+    def _change(self, doc_id, doc=None, deleted=False):
+        return Change(id=doc_id, sequence_id=None, document=doc, deleted=deleted)
+
+    def test_index_and_delete(self):
+        docs = [{'_id': uuid.uuid4().hex, 'doc_type': 'MyCoolDoc', 'property': i} for i in range(3)]
+        changes = [self._change(doc['_id'], doc) for doc in docs]
+        self.assertEqual(([], []), self.processor.process_changes_chunk(self.pillow, changes))
+        self.assertEqual(3, get_doc_count(self.es, self.index))
+
+        changes = [
+            self._change(docs[0]['_id'], deleted=True),
+            # deleting a doc that was never indexed is not an error
+            self._change(uuid.uuid4().hex, deleted=True),
+        ]
+        self.assertEqual(([], []), self.processor.process_changes_chunk(self.pillow, changes))
+        self.assertEqual(2, get_doc_count(self.es, self.index))
+
+    def test_bulk_item_errors(self):
+        result = {
+            'errors': True,
+            'items': [
+                {'index': {'_id': 'a', 'status': 201}},
+                {'index': {'_id': 'b', 'status': 400, 'error': 'MapperParsingException'}},
+                {'delete': {'_id': 'c', 'status': 404, 'error': 'not_found'}},
+            ]
+        }
+        changes = [self._change('a', {}), self._change('b', {}), self._change('c', deleted=True)]
+        errors = self.processor._get_bulk_errors(result, changes, self.pillow)
+        self.assertEqual(['b'], [change.id for change, exception in errors])
+        self.assertIsInstance(errors[0][1], PillowtopIndexingError)
@@ -8,7 +8,7 @@ from corehq.util.quickcache import quickcache
 from .models import Toggle
 
 
-@quickcache(['slug', 'item', 'namespace'])
+@quickcache(['slug', 'item', 'namespace'], lru_timeout=5 * 60)
 def toggle_enabled(slug, item, namespace=None):
     """
     Given a toggle and a username, whether the toggle is enabled for that user
@@ -57,7 +57,7 @@ from corehq.form_processor.utils.sql import (
 )
 from corehq.sql_db.config import get_sql_db_aliases_in_use, partition_config
 from corehq.sql_db.routers import get_cursor
-from corehq.sql_db.util import split_list_by_db_partition
+from corehq.sql_db.util import fan_out_across_databases, split_list_by_db_partition
 from corehq.util.queries import fast_distinct_in_domain
 from dimagi.utils.chunked import chunked
 
@@ -73,9 +73,10 @@ doc_type_to_state = {
 
 def iter_all_rows(reindex_accessor):
     """Returns a generator that will iterate over all rows provided by the
-    reindex accessor
+    reindex accessor. Databases are read concurrently so rows from different
+    databases are interleaved.
     """
-    for db_alias in reindex_accessor.sql_db_aliases:
+    def iter_rows(db_alias):
         docs = reindex_accessor.get_docs(db_alias)
         while docs:
             for doc in docs:
@@ -84,6 +85,8 @@ def iter_all_rows(reindex_accessor):
             last_id = getattr(doc, reindex_accessor.primary_key_field_name)
             docs = reindex_accessor.get_docs(db_alias, last_doc_pk=last_id)
 
+    return fan_out_across_databases(reindex_accessor.sql_db_aliases, iter_rows)
+
 
 def iter_all_ids(reindex_accessor):
     for doc_id in iter_all_ids_chunked(reindex_accessor):
@@ -91,7 +94,7 @@ def iter_all_ids(reindex_accessor):
 
 
 def iter_all_ids_chunked(reindex_accessor):
-    for db_alias in reindex_accessor.sql_db_aliases:
+    def iter_chunks(db_alias):
         docs = list(reindex_accessor.get_doc_ids(db_alias))
         while docs:
             yield [d.doc_id for d in docs]
@@ -99,6 +102,8 @@ def iter_all_ids_chunked(reindex_accessor):
             last_id = docs[-1].primary_key
             docs = list(reindex_accessor.get_doc_ids(db_alias, last_doc_pk=last_id))
 
+    return fan_out_across_databases(reindex_accessor.sql_db_aliases, iter_chunks)
+
 
 class ShardAccessor(object):
     hash_key = b'\x00' * 16
@@ -1144,6 +1149,16 @@ class CaseAccessorSQL(AbstractCaseAccessor):
             [domain, external_id, case_type]
         ))
 
+    @staticmethod
+    def get_cases_by_external_ids(domain, external_ids, case_type=None):
+        assert isinstance(external_ids, list)
+        if not external_ids:
+            return []
+        return list(CommCareCaseSQL.objects.raw(
+            'SELECT * FROM get_cases_by_external_ids(%s, %s, %s)',
+            [domain, external_ids, case_type]
+        ))
+
     @staticmethod
     def get_case_by_domain_hq_user_id(domain, user_id, case_type):
         try:
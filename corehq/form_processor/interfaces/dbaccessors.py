@@ -272,6 +272,10 @@ class AbstractCaseAccessor(six.with_metaclass(ABCMeta)):
     def get_cases_by_external_id(domain, external_id, case_type=None):
         raise NotImplementedError
 
+    @abstractmethod
+    def get_cases_by_external_ids(domain, external_ids, case_type=None):
+        raise NotImplementedError
+
     @abstractmethod
     def soft_delete_cases(domain, case_ids, deletion_date=None, deletion_id=None):
         raise NotImplementedError
@@ -400,6 +404,9 @@ class CaseAccessors(object):
     def get_cases_by_external_id(self, external_id, case_type=None):
         return self.db_accessor.get_cases_by_external_id(self.domain, external_id, case_type)
 
+    def get_cases_by_external_ids(self, external_ids, case_type=None):
+        return self.db_accessor.get_cases_by_external_ids(self.domain, external_ids, case_type)
+
     def soft_delete_cases(self, case_ids, deletion_date=None, deletion_id=None):
         return self.db_accessor.soft_delete_cases(self.domain, case_ids, deletion_date, deletion_id)
 
@@ -4,6 +4,8 @@ from corehq.sql_db.util import (
     run_query_across_partitioned_databases,
     get_db_aliases_for_partitioned_query,
 )
+from collections import defaultdict
+from django.db import transaction
 from django.db.models import Q
 from uuid import UUID
 
@@ -66,6 +68,69 @@ def delete_timed_schedule_instance(instance):
     instance.delete()
 
 
+def _validate_schedule_instances(instances):
+    from corehq.messaging.scheduling.scheduling_partitioned.models import (
+        AlertScheduleInstance,
+        TimedScheduleInstance,
+        CaseAlertScheduleInstance,
+        CaseTimedScheduleInstance,
+    )
+
+    for instance in instances:
+        _validate_class(instance, (AlertScheduleInstance, TimedScheduleInstance,
+            CaseAlertScheduleInstance, CaseTimedScheduleInstance))
+        _validate_uuid(instance.schedule_instance_id)
+
+
+def _group_schedule_instances_by_class_and_db(instances):
+    result = defaultdict(list)
+    for instance in instances:
+        result[(type(instance), instance.db)].append(instance)
+
+    return result
+
+
+def bulk_save_schedule_instances(instances):
+    """
+    Saves the given schedule instances using one transaction and a constant
+    number of queries for each partitioned database, rather than one save per
+    instance. New instances are inserted with bulk_create and instances that
+    already exist are replaced by deleting and re-inserting them in the same
+    transaction, since there is no bulk update available.
+
+    The caller is responsible for keeping the list to a reasonable size.
+    """
+    _validate_schedule_instances(instances)
+
+    for (cls, db_name), db_instances in _group_schedule_instances_by_class_and_db(instances).items():
+        existing_ids = [
+            instance.schedule_instance_id
+            for instance in db_instances
+            if not instance._state.adding
+        ]
+        with transaction.atomic(using=db_name):
+            if existing_ids:
+                cls.objects.using(db_name).filter(schedule_instance_id__in=existing_ids).delete()
+            cls.objects.using(db_name).bulk_create(db_instances)
+
+        for instance in db_instances:
+            instance._state.adding = False
+            instance._state.db = db_name
+
+
+def bulk_delete_schedule_instances(instances):
+    """
+    Deletes the given schedule instances using one query for each
+    partitioned database.
+    """
+    _validate_schedule_instances(instances)
+
+    for (cls, db_name), db_instances in _group_schedule_instances_by_class_and_db(instances).items():
+        cls.objects.using(db_name).filter(
+            schedule_instance_id__in=[instance.schedule_instance_id for instance in db_instances]
+        ).delete()
+
+
 def get_count_of_active_schedule_instances_due(domain, due_before):
     from corehq.messaging.scheduling.scheduling_partitioned.models import (
         AlertScheduleInstance,
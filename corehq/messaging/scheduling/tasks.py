@@ -15,8 +15,6 @@ from corehq.messaging.scheduling.scheduling_partitioned.models import (
     CaseScheduleInstanceMixin,
 )
 from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
-    delete_alert_schedule_instance,
-    delete_timed_schedule_instance,
     get_alert_schedule_instances_for_schedule,
     get_timed_schedule_instances_for_schedule,
     get_alert_schedule_instance,
@@ -27,13 +25,16 @@ from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
     get_case_timed_schedule_instances_for_schedule,
     get_case_schedule_instance,
     save_case_schedule_instance,
-    delete_case_schedule_instance,
     delete_alert_schedule_instances_for_schedule,
     delete_timed_schedule_instances_for_schedule,
     delete_schedule_instances_by_case_id,
+    bulk_save_schedule_instances,
+    bulk_delete_schedule_instances,
 )
 from corehq.util.celery_utils import no_result_task
+from corehq.util.datadog.gauges import datadog_counter
 from datetime import datetime
+from dimagi.utils.chunked import chunked
 from dimagi.utils.couch import CriticalSection
 from django.conf import settings
 import six
@@ -41,6 +42,9 @@ import six
 
 class ScheduleInstanceRefresher(object):
 
+    # The maximum number of instances written per query and transaction
+    BATCH_SIZE = 1000
+
     def __init__(self, schedule, new_recipients, existing_instances):
         self.schedule = schedule
         self.new_recipients = set(self._convert_to_tuple_of_tuples(new_recipients))
@@ -104,34 +108,13 @@ class ScheduleInstanceRefresher(object):
         """
         raise NotImplementedError()
 
-    @staticmethod
-    def delete_instance(instance):
-        if isinstance(instance, AlertScheduleInstance):
-            delete_alert_schedule_instance(instance)
-        elif isinstance(instance, TimedScheduleInstance):
-            delete_timed_schedule_instance(instance)
-        elif isinstance(instance, (CaseAlertScheduleInstance, CaseTimedScheduleInstance)):
-            delete_case_schedule_instance(instance)
-        else:
-            raise TypeError("Unexpected type: %s" % type(instance))
-
-    @staticmethod
-    def save_instance(instance):
-        if isinstance(instance, AlertScheduleInstance):
-            save_alert_schedule_instance(instance)
-        elif isinstance(instance, TimedScheduleInstance):
-            save_timed_schedule_instance(instance)
-        elif isinstance(instance, (CaseAlertScheduleInstance, CaseTimedScheduleInstance)):
-            save_case_schedule_instance(instance)
-        else:
-            raise TypeError("Unexpected type: %s" % type(instance))
-
     def refresh(self):
         # A list of (instance, needs_saving) tuples representing the final version
         # of the refreshed instances and whether or not each one needs to be saved
         # at the end of processing. We should avoid saving instances that didn't
         # change to prevent churn on the database tables.
         refreshed_list = []
+        instances_to_delete = []
 
         for recipient_type_and_id in self.new_recipients:
             recipient_type, recipient_id = recipient_type_and_id
@@ -146,14 +129,31 @@ class ScheduleInstanceRefresher(object):
                 needs_saving = self.handle_existing_instance(instance)
                 refreshed_list.append((instance, needs_saving))
             else:
-                self.delete_instance(instance)
+                instances_to_delete.append(instance)
 
+        instances_to_save = []
         for instance, needs_saving in refreshed_list:
             if instance.check_active_flag_against_schedule():
                 needs_saving = True
 
             if needs_saving:
-                self.save_instance(instance)
+                instances_to_save.append(instance)
+
+        # Writes are batched so that refreshing a schedule with a large number
+        # of recipients doesn't result in a query per recipient.
+        for batch in chunked(instances_to_delete, self.BATCH_SIZE):
+            bulk_delete_schedule_instances(batch)
+            self._report_progress('delete', len(batch))
+
+        for batch in chunked(instances_to_save, self.BATCH_SIZE):
+            bulk_save_schedule_instances(batch)
+            self._report_progress('save', len(batch))
+
+    def _report_progress(self, action, count):
+        datadog_counter('commcare.scheduling.refresh_schedule_instances', count, tags=[
+            'action:{}'.format(action),
+            'refresher:{}'.format(type(self).__name__),
+        ])
 
 
 class AlertScheduleInstanceRefresher(ScheduleInstanceRefresher):
@@ -435,6 +435,49 @@ class DeleteScheduleInstancesTest(BaseScheduleTest):
         self.assertEqual(self.count(get_timed_schedule_instances_for_schedule(self.timed_schedule_2)), 0)
 
 
+@partitioned
+@patch('corehq.messaging.scheduling.tasks.ScheduleInstanceRefresher.BATCH_SIZE', 2)
+class BulkRefreshScheduleInstancesTest(BaseScheduleTest):
+
+    def setUp(self):
+        super(BulkRefreshScheduleInstancesTest, self).setUp()
+        self.schedule = TimedSchedule.create_simple_daily_schedule(
+            self.domain,
+            TimedEvent(time=time(12, 0)),
+            SMSContent(),
+            total_iterations=1,
+        )
+
+    def tearDown(self):
+        delete_timed_schedule_instances_for_schedule(TimedScheduleInstance, self.schedule.schedule_id)
+        self.schedule.delete()
+        super(BulkRefreshScheduleInstancesTest, self).tearDown()
+
+    def get_instances_by_recipient_id(self):
+        return {
+            instance.recipient_id: instance
+            for instance in get_timed_schedule_instances_for_schedule(self.schedule)
+        }
+
+    def test_refresh_in_batches(self):
+        recipients = [('Location', 'location-{}'.format(i)) for i in range(5)]
+        refresh_timed_schedule_instances(self.schedule.schedule_id, recipients, date(2017, 3, 16))
+        instances = self.get_instances_by_recipient_id()
+        self.assertEqual(set(instances), {recipient_id for _, recipient_id in recipients})
+        self.assertEqual(set(instance.start_date for instance in instances.values()), {date(2017, 3, 16)})
+
+        # remove two recipients, add one and recalculate the rest
+        recipients = recipients[2:] + [('Location', 'location-5')]
+        refresh_timed_schedule_instances(self.schedule.schedule_id, recipients, date(2017, 3, 17))
+        refreshed_instances = self.get_instances_by_recipient_id()
+        self.assertEqual(set(refreshed_instances), {recipient_id for _, recipient_id in recipients})
+        self.assertEqual(set(instance.start_date for instance in refreshed_instances.values()),
+            {date(2017, 3, 17)})
+        for recipient_id in ('location-2', 'location-3', 'location-4'):
+            self.assertEqual(refreshed_instances[recipient_id].schedule_instance_id,
+                instances[recipient_id].schedule_instance_id)
+
+
 @partitioned
 @patch('corehq.messaging.scheduling.models.content.SMSContent.send')
 @patch('corehq.messaging.scheduling.util.utcnow')
@@ -10,7 +10,26 @@ CHECK_REPEATERS_KEY = 'check-repeaters-key'
 
 POST_TIMEOUT = 75  # seconds
 
+# maximum number of records for one repeater sent by a single task
+REPEAT_RECORD_BATCH_SIZE = 100
+# a repeater's remaining records are postponed after this many records fail in a row
+MAX_CONSECUTIVE_REPEATER_FAILURES = 5
+
+# number of records claimed from the SQL queue at a time
+REPEAT_RECORD_CLAIM_CHUNK_SIZE = 1000
+# a claimed record is due again after this long unless it is saved first
+REPEAT_RECORD_CLAIM_TIMEOUT = timedelta(hours=48)
+
 RECORD_PENDING_STATE = 'PENDING'
 RECORD_SUCCESS_STATE = 'SUCCESS'
 RECORD_FAILURE_STATE = 'FAIL'
 RECORD_CANCELLED_STATE = 'CANCELLED'
+
+RECORD_STATES = [
+    (RECORD_PENDING_STATE, 'Pending'),
+    (RECORD_SUCCESS_STATE, 'Succeeded'),
+    (RECORD_FAILURE_STATE, 'Failed'),
+    (RECORD_CANCELLED_STATE, 'Cancelled'),
+]
+# states of records that are waiting to be sent
+RECORD_QUEUED_STATES = [RECORD_PENDING_STATE, RECORD_FAILURE_STATE]
@@ -1,12 +1,25 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from dimagi.utils.couch.database import iter_docs
 from dimagi.utils.parsing import json_format_datetime
 
 from corehq.util.couch_helpers import paginate_view
 from corehq.util.test_utils import unit_testing_only
 
-from .const import RECORD_PENDING_STATE, RECORD_FAILURE_STATE, RECORD_SUCCESS_STATE, RECORD_CANCELLED_STATE
+from .const import (
+    RECORD_PENDING_STATE,
+    RECORD_FAILURE_STATE,
+    RECORD_SUCCESS_STATE,
+    RECORD_CANCELLED_STATE,
+    RECORD_QUEUED_STATES,
+    REPEAT_RECORD_CLAIM_CHUNK_SIZE,
+    REPEAT_RECORD_CLAIM_TIMEOUT,
+)
 
 
 def get_pending_repeat_record_count(domain, repeater_id):
@@ -40,8 +53,13 @@ def get_repeat_record_count(domain, repeater_id=None, state=None, last_checked_a
 
 
 def get_overdue_repeat_record_count(overdue_threshold=datetime.timedelta(minutes=10)):
-    from .models import RepeatRecord
+    from .models import RepeatRecord, SQLRepeatRecord
     overdue_datetime = datetime.datetime.utcnow() - overdue_threshold
+    if settings.REPEAT_RECORDS_SQL_QUEUE:
+        return SQLRepeatRecord.objects.filter(
+            state__in=RECORD_QUEUED_STATES,
+            next_check__lt=overdue_datetime,
+        ).count()
     results = RepeatRecord.view(
         "repeaters/repeat_records_by_next_check",
         startkey=[None],
@@ -167,6 +185,62 @@ def iterate_repeat_records(due_before, chunk_size=10000, database=None):
         yield RepeatRecord.wrap(doc['doc'])
 
 
+def claim_due_repeat_records(due_before, limit):
+    """
+    Claim up to ``limit`` queued records that were due by ``due_before``
+    and return their couch ids.
+
+    Rows locked by a concurrent claim are skipped rather than waited for.
+    A claimed record isn't due again until ``REPEAT_RECORD_CLAIM_TIMEOUT``
+    has passed or it is next saved.
+    """
+    from .models import SQLRepeatRecord
+    with transaction.atomic():
+        claimed = list(
+            SQLRepeatRecord.objects
+            .select_for_update(skip_locked=True)
+            .filter(state__in=RECORD_QUEUED_STATES, next_check__lte=due_before)
+            .order_by('next_check')
+            .values_list('id', 'couch_id')[:limit]
+        )
+        if claimed:
+            SQLRepeatRecord.objects.filter(id__in=[id_ for id_, couch_id in claimed]).update(
+                next_check=datetime.datetime.utcnow() + REPEAT_RECORD_CLAIM_TIMEOUT
+            )
+    return [couch_id for id_, couch_id in claimed]
+
+
+def iter_claimed_repeat_records(due_before, cutoff, chunk_size=REPEAT_RECORD_CLAIM_CHUNK_SIZE):
+    """
+    Claim due records from the SQL queue in chunks until there are none
+    left or ``cutoff`` has passed, and yield them.
+
+    Queue entries that no longer match their couch record are brought back
+    in sync instead of being yielded.
+    """
+    from .models import RepeatRecord, SQLRepeatRecord, sync_repeat_records_to_sql
+    while datetime.datetime.utcnow() < cutoff:
+        couch_ids = claim_due_repeat_records(due_before, chunk_size)
+        if not couch_ids:
+            return
+
+        found_ids = set()
+        out_of_sync = []
+        for doc in iter_docs(RepeatRecord.get_db(), couch_ids):
+            record = RepeatRecord.wrap(doc)
+            found_ids.add(record._id)
+            if record.is_queued and record.next_check <= due_before:
+                yield record
+            else:
+                out_of_sync.append(record)
+
+        if out_of_sync:
+            sync_repeat_records_to_sql(out_of_sync)
+        deleted_ids = set(couch_ids) - found_ids
+        if deleted_ids:
+            SQLRepeatRecord.objects.filter(couch_id__in=deleted_ids).delete()
+
+
 def get_domains_that_have_repeat_records():
     from .models import RepeatRecord
     return [
@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import threading
+import time
+
+import requests
+from django.core.management import BaseCommand
+from requests.adapters import HTTPAdapter
+from six.moves import range
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.queue import Empty, Queue
+from six.moves.socketserver import ThreadingMixIn
+
+from dimagi.utils.post import simple_post
+
+
+class Command(BaseCommand):
+    """
+    Compare sending repeat record payloads one request per connection (as
+    ``process_repeat_record`` does) with sending them over a shared session
+    with concurrent requests (as ``process_repeat_record_batch`` does).
+
+    Requests go to a local HTTP stub that waits ``--latency`` seconds before
+    responding, to stand in for a remote endpoint.
+
+    Usage: ./manage.py benchmark_repeater_requests --records 500 --concurrency 4
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--latency', type=float, default=0.01)
+        parser.add_argument('--payload-bytes', type=int, default=2000)
+
+    def handle(self, records, concurrency, latency, payload_bytes, **options):
+        server = _StubServer(('127.0.0.1', 0), _get_handler_class(latency))
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        url = 'http://127.0.0.1:{}/'.format(server.server_port)
+        payload = 'x' * payload_bytes
+
+        try:
+            for name, send in [
+                ('serial', _send_serial),
+                ('batched', lambda *args: _send_batched(*args, concurrency=concurrency)),
+            ]:
+                server.connections = 0
+                start = time.time()
+                send(url, payload, records)
+                duration = time.time() - start
+                print("{:<8} {:.2f}s {:.0f} records/s {} connections".format(
+                    name, duration, records / duration, server.connections
+                ))
+        finally:
+            server.shutdown()
+
+
+class _StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        ThreadingMixIn.process_request(self, request, client_address)
+
+
+def _get_handler_class(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'OK')
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _send_serial(url, payload, records):
+    for i in range(records):
+        response = simple_post(payload, url)
+        response.raise_for_status()
+
+
+def _send_batched(url, payload, records, concurrency):
+    pending = Queue()
+    for i in range(records):
+        pending.put(i)
+
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+
+        def send_pending():
+            while True:
+                try:
+                    pending.get_nowait()
+                except Empty:
+                    return
+                response = simple_post(payload, url, session=session)
+                response.raise_for_status()
+
+        threads = [threading.Thread(target=send_pending) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
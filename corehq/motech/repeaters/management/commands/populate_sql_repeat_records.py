@@ -0,0 +1,39 @@
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from corehq.motech.repeaters.dbaccessors import (
+    get_domains_that_have_repeat_records,
+    iter_repeat_records_by_domain,
+)
+from corehq.motech.repeaters.models import sync_repeat_records_to_sql
+from dimagi.utils.chunked import chunked
+
+
+class Command(BaseCommand):
+    help = """
+    Copy existing repeat records and their attempts to the SQL repeat record
+    queue. Records that are already in sync are skipped so this can be run
+    again to catch up on records that were saved without being synced.
+
+    Set settings.REPEAT_RECORDS_SQL_QUEUE once this has been run for all domains.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'domains',
+            nargs='*',
+            help="Defaults to all domains that have repeat records",
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, domains, chunk_size, **options):
+        for domain in domains or get_domains_that_have_repeat_records():
+            count = 0
+            records = iter_repeat_records_by_domain(domain, chunk_size=chunk_size)
+            for chunk in chunked(records, chunk_size):
+                sync_repeat_records_to_sql(chunk)
+                count += len(chunk)
+            print("{}: synced {} repeat records".format(domain, count))
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2018-08-02 10:41
+from __future__ import unicode_literals
+
+from __future__ import absolute_import
+from django.db import migrations, models
+import django.db.models.deletion
+
+from corehq.sql_db.operations import HqRunSQL
+
+
+INDEX_NAME = 'repeaters_sqlrepeatrecord_queued_next_check_idx'
+
+CREATE_INDEX_SQL = """
+CREATE INDEX {} ON repeaters_sqlrepeatrecord (next_check)
+WHERE state IN ('PENDING', 'FAIL')
+""".format(INDEX_NAME)
+DROP_INDEX_SQL = "DROP INDEX {}".format(INDEX_NAME)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repeaters', '0001_adjust_auth_field_format'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SQLRepeatRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=126)),
+                ('couch_id', models.CharField(max_length=126, unique=True)),
+                ('repeater_id', models.CharField(max_length=126)),
+                ('payload_id', models.CharField(max_length=126)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('SUCCESS', 'Succeeded'), ('FAIL', 'Failed'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=16)),
+                ('registered_on', models.DateTimeField(null=True)),
+                ('last_checked', models.DateTimeField(null=True)),
+                ('next_check', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SQLRepeatRecordAttempt',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('SUCCESS', 'Succeeded'), ('FAIL', 'Failed'), ('CANCELLED', 'Cancelled')], max_length=16)),
+                ('message', models.TextField(null=True)),
+                ('created_at', models.DateTimeField(null=True)),
+                ('repeat_record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='repeaters.SQLRepeatRecord')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='sqlrepeatrecord',
+            index_together=set([('domain', 'repeater_id')]),
+        ),
+        # partial index used to find due records (see claim_due_repeat_records)
+        HqRunSQL(CREATE_INDEX_SQL, DROP_INDEX_SQL),
+    ]
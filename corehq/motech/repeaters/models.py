@@ -9,6 +9,7 @@ import six.moves.urllib.error
 import six.moves.urllib.parse
 import six.moves.urllib.request
 from couchdbkit.exceptions import ResourceNotFound
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 from memoized import memoized
 from requests.auth import HTTPBasicAuth, HTTPDigestAuth
@@ -46,6 +47,7 @@ from dimagi.ext.couchdbkit import (
     StringListProperty,
     StringProperty,
 )
+from dimagi.utils.logging import notify_exception
 from dimagi.utils.mixins import UnicodeMixIn
 from dimagi.utils.parsing import json_format_datetime
 from dimagi.utils.post import simple_post, perform_SOAP_operation
@@ -56,6 +58,7 @@ from .const import (
     RECORD_SUCCESS_STATE,
     RECORD_PENDING_STATE,
     RECORD_CANCELLED_STATE,
+    RECORD_STATES,
     POST_TIMEOUT,
 )
 from .dbaccessors import (
@@ -114,6 +117,9 @@ class Repeater(QuickCachedDocumentMixin, Document, UnicodeMixIn):
 
     payload_generator_classes = ()
 
+    # a requests.Session shared by the records sent in a batch
+    _session = None
+
     @classmethod
     def get_custom_url(cls, domain):
         return None
@@ -295,7 +301,8 @@ class Repeater(QuickCachedDocumentMixin, Document, UnicodeMixIn):
         headers = self.get_headers(repeat_record)
         auth = self.get_auth()
         url = self.get_url(repeat_record)
-        return simple_post(payload, url, headers=headers, timeout=POST_TIMEOUT, auth=auth, verify=self.verify)
+        return simple_post(payload, url, headers=headers, timeout=POST_TIMEOUT, auth=auth, verify=self.verify,
+                           session=self._session)
 
     def fire_for_record(self, repeat_record):
         payload = self.get_payload(repeat_record)
@@ -547,6 +554,10 @@ class RepeatRecordAttempt(DocumentSchema):
     def message(self):
         return self.success_response if self.succeeded else self.failure_reason
 
+    @property
+    def state(self):
+        return _get_state(self)
+
 
 class RepeatRecord(Document):
     """
@@ -609,14 +620,28 @@ class RepeatRecord(Document):
 
     @property
     def state(self):
-        state = RECORD_PENDING_STATE
-        if self.succeeded:
-            state = RECORD_SUCCESS_STATE
-        elif self.cancelled:
-            state = RECORD_CANCELLED_STATE
-        elif self.failure_reason:
-            state = RECORD_FAILURE_STATE
-        return state
+        return _get_state(self)
+
+    @property
+    def is_queued(self):
+        # matches the repeaters/repeat_records_by_next_check view
+        return (
+            self.doc_type == 'RepeatRecord'
+            and not self.succeeded
+            and not self.cancelled
+            and self.next_check is not None
+        )
+
+    def save(self, *args, **kwargs):
+        super(RepeatRecord, self).save(*args, **kwargs)
+        try:
+            sync_repeat_records_to_sql([self])
+        except Exception:
+            notify_exception(None, message='Could not sync SQLRepeatRecord from RepeatRecord {}'.format(self._id))
+
+    def delete(self, *args, **kwargs):
+        SQLRepeatRecord.objects.filter(couch_id=self._id).delete()
+        super(RepeatRecord, self).delete(*args, **kwargs)
 
     @classmethod
     def all(cls, domain=None, due_before=None, limit=None):
@@ -702,11 +727,15 @@ class RepeatRecord(Document):
             succeeded=False,
         )
 
-    def fire(self, force_send=False):
+    def fire(self, force_send=False, repeater=None):
+        """
+        :param repeater: (optional) The repeater to send this record with,
+        if it has already been fetched.
+        """
         if self.try_now() or force_send:
             self.overall_tries += 1
             try:
-                attempt = self.repeater.fire_for_record(self)
+                attempt = (repeater or self.repeater).fire_for_record(self)
             except Exception as e:
                 log_repeater_error_in_datadog(self.domain, status_code=None,
                                               repeater_type=self.repeater_type)
@@ -783,6 +812,106 @@ class RepeatRecord(Document):
         self.next_check = datetime.utcnow()
 
 
+def _get_state(record_or_attempt):
+    state = RECORD_PENDING_STATE
+    if record_or_attempt.succeeded:
+        state = RECORD_SUCCESS_STATE
+    elif record_or_attempt.cancelled:
+        state = RECORD_CANCELLED_STATE
+    elif record_or_attempt.failure_reason:
+        state = RECORD_FAILURE_STATE
+    return state
+
+
+class SQLRepeatRecord(models.Model):
+    """
+    The queue entry for a ``RepeatRecord``, updated whenever the record is
+    saved. When ``settings.REPEAT_RECORDS_SQL_QUEUE`` is set
+    ``check_repeaters`` claims due records from this table instead of
+    paging through the ``repeaters/repeat_records_by_next_check`` view.
+
+    ``next_check`` is only set while the record is queued. Due records are
+    found with a partial index on ``next_check`` for the pending and failed
+    states (see migration 0002).
+    """
+    domain = models.CharField(max_length=126)
+    couch_id = models.CharField(max_length=126, unique=True)
+    repeater_id = models.CharField(max_length=126)
+    payload_id = models.CharField(max_length=126)
+    state = models.CharField(max_length=16, choices=RECORD_STATES, default=RECORD_PENDING_STATE)
+    registered_on = models.DateTimeField(null=True)
+    last_checked = models.DateTimeField(null=True)
+    next_check = models.DateTimeField(null=True)
+
+    class Meta(object):
+        index_together = [('domain', 'repeater_id')]
+
+
+class SQLRepeatRecordAttempt(models.Model):
+    repeat_record = models.ForeignKey(SQLRepeatRecord, on_delete=models.CASCADE, related_name='attempts')
+    state = models.CharField(max_length=16, choices=RECORD_STATES)
+    message = models.TextField(null=True)
+    created_at = models.DateTimeField(null=True)
+
+
+def sync_repeat_records_to_sql(repeat_records):
+    """
+    Create or update the ``SQLRepeatRecord`` of each of ``repeat_records``
+    and insert the attempts made since it was last synced. Records that
+    haven't changed since they were last synced are not written.
+    """
+    existing = {
+        sql_record.couch_id: sql_record
+        for sql_record in SQLRepeatRecord.objects.filter(
+            couch_id__in=[record._id for record in repeat_records]
+        )
+    }
+    to_create = []
+    new_attempts = []
+    with transaction.atomic():
+        for record in repeat_records:
+            fields = _get_sql_fields(record)
+            sql_record = existing.get(record._id)
+            if sql_record is None:
+                sql_record = SQLRepeatRecord(couch_id=record._id, **fields)
+                to_create.append(sql_record)
+                new_attempts.append((sql_record, record.attempts))
+            elif any(getattr(sql_record, name) != value for name, value in fields.items()):
+                synced_until = sql_record.last_checked
+                for name, value in fields.items():
+                    setattr(sql_record, name, value)
+                sql_record.save()
+                new_attempts.append((sql_record, [
+                    attempt for attempt in record.attempts
+                    if synced_until is None or (attempt.datetime and attempt.datetime > synced_until)
+                ]))
+
+        # populates the primary keys of to_create
+        SQLRepeatRecord.objects.bulk_create(to_create)
+        SQLRepeatRecordAttempt.objects.bulk_create([
+            SQLRepeatRecordAttempt(
+                repeat_record=sql_record,
+                state=attempt.state,
+                message=attempt.message,
+                created_at=attempt.datetime,
+            )
+            for sql_record, attempts in new_attempts
+            for attempt in attempts
+        ])
+
+
+def _get_sql_fields(repeat_record):
+    return {
+        'domain': repeat_record.domain,
+        'repeater_id': repeat_record.repeater_id,
+        'payload_id': repeat_record.payload_id,
+        'state': repeat_record.state,
+        'registered_on': repeat_record.registered_on,
+        'last_checked': repeat_record.last_checked,
+        'next_check': repeat_record.next_check if repeat_record.is_queued else None,
+    }
+
+
 # import signals
 # Do not remove this import, its required for the signals code to run even though not explicitly used in this file
 from corehq.motech.repeaters import signals
@@ -1,23 +1,35 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
+import threading
+from collections import defaultdict
 from datetime import datetime, timedelta
 from celery.schedules import crontab
 from couchdbkit import ResourceNotFound
 
+import requests
 from django.conf import settings
+from django.db import connections
 from celery.task import periodic_task, task
 from celery.utils.log import get_task_logger
 from redis.exceptions import LockError
+from requests.adapters import HTTPAdapter
+from six.moves.queue import Empty, Queue
 from corehq.util.datadog.gauges import datadog_gauge_task
 from dimagi.utils.couch.cache.cache_core import get_redis_client
 from dimagi.utils.couch.undo import DELETED_SUFFIX
 
-from corehq.motech.repeaters.dbaccessors import iterate_repeat_records, \
-    get_overdue_repeat_record_count
+from corehq.motech.repeaters.dbaccessors import (
+    get_overdue_repeat_record_count,
+    iter_claimed_repeat_records,
+    iterate_repeat_records,
+)
 from corehq import toggles
 from corehq.motech.repeaters.const import (
     CHECK_REPEATERS_INTERVAL,
     CHECK_REPEATERS_KEY,
+    MAX_CONSECUTIVE_REPEATER_FAILURES,
+    MIN_RETRY_WAIT,
+    REPEAT_RECORD_BATCH_SIZE,
     RECORD_PENDING_STATE,
     RECORD_FAILURE_STATE)
 
@@ -42,18 +54,23 @@ def check_repeaters():
     if not check_repeater_lock.acquire(blocking=False):
         return
 
-    for record in iterate_repeat_records(start):
-        now = datetime.utcnow()
-        lock_key = _get_repeat_record_lock_key(record)
-
-        if now > cutoff:
-            break
+    if settings.REPEAT_RECORDS_SQL_QUEUE:
+        repeat_records = iter_claimed_repeat_records(start, cutoff)
+    else:
+        repeat_records = _iter_locked_repeat_records(redis_client, start, cutoff)
 
-        lock = redis_client.lock(lock_key, timeout=60 * 60 * 48)
-        if not lock.acquire(blocking=False):
-            continue
+    batches = defaultdict(list)
+    for record in repeat_records:
+        if toggles.BATCH_REPEAT_RECORDS.enabled(record.domain):
+            batch = batches[record.repeater_id]
+            batch.append(record)
+            if len(batch) >= REPEAT_RECORD_BATCH_SIZE:
+                process_repeat_record_batch.delay(record.repeater_id, batches.pop(record.repeater_id))
+        else:
+            process_repeat_record.delay(record)
 
-        process_repeat_record.delay(record)
+    for repeater_id, batch in batches.items():
+        process_repeat_record_batch.delay(repeater_id, batch)
 
     try:
         check_repeater_lock.release()
@@ -62,8 +79,22 @@ def check_repeaters():
         pass
 
 
+def _iter_locked_repeat_records(redis_client, due_before, cutoff):
+    for record in iterate_repeat_records(due_before):
+        if datetime.utcnow() > cutoff:
+            break
+
+        lock = redis_client.lock(_get_repeat_record_lock_key(record), timeout=60 * 60 * 48)
+        if lock.acquire(blocking=False):
+            yield record
+
+
 @task(queue=settings.CELERY_REPEAT_RECORD_QUEUE)
 def process_repeat_record(repeat_record):
+    _process_repeat_record(repeat_record)
+
+
+def _process_repeat_record(repeat_record, repeater=None):
     if repeat_record.state == RECORD_FAILURE_STATE and repeat_record.overall_tries >= repeat_record.max_possible_tries:
         repeat_record.cancel()
         repeat_record.save()
@@ -88,11 +119,89 @@ def process_repeat_record(repeat_record):
                 repeat_record.doc_type += DELETED_SUFFIX
                 repeat_record.save()
         elif repeat_record.state == RECORD_PENDING_STATE or repeat_record.state == RECORD_FAILURE_STATE:
-                repeat_record.fire()
+                repeat_record.fire(repeater=repeater)
     except Exception:
         logging.exception('Failed to process repeat record: {}'.format(repeat_record._id))
 
 
+@task(queue=settings.CELERY_REPEAT_RECORD_QUEUE)
+def process_repeat_record_batch(repeater_id, repeat_records):
+    """
+    Send repeat records for a single repeater using a shared HTTP session
+    and at most ``settings.REPEATER_MAX_CONCURRENT_REQUESTS`` concurrent
+    requests. If the endpoint fails for several records in a row the rest
+    are postponed instead of each being tried in turn.
+    """
+    from corehq.motech.repeaters.models import Repeater
+    try:
+        repeater = Repeater.get(repeater_id)
+    except ResourceNotFound:
+        repeater = None
+    if repeater is None or repeater.paused or repeater.doc_type.endswith(DELETED_SUFFIX):
+        # handled for each record
+        for repeat_record in repeat_records:
+            _process_repeat_record(repeat_record)
+        return
+
+    concurrency = settings.REPEATER_MAX_CONCURRENT_REQUESTS
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        repeater._session = session
+        _send_repeat_records(repeater, repeat_records, concurrency)
+
+
+def _send_repeat_records(repeater, repeat_records, concurrency):
+    pending = Queue()
+    for repeat_record in repeat_records:
+        pending.put(repeat_record)
+    lock = threading.Lock()
+    failures = {'consecutive': 0}
+    backing_off = threading.Event()
+
+    def send_pending():
+        while True:
+            try:
+                repeat_record = pending.get_nowait()
+            except Empty:
+                return
+            if backing_off.is_set():
+                try:
+                    repeat_record.postpone_by(MIN_RETRY_WAIT)
+                except Exception:
+                    logging.exception('Failed to postpone repeat record: {}'.format(repeat_record._id))
+                continue
+
+            tries = repeat_record.overall_tries
+            _process_repeat_record(repeat_record, repeater)
+            failed = repeat_record.overall_tries > tries and not repeat_record.succeeded
+            with lock:
+                failures['consecutive'] = failures['consecutive'] + 1 if failed else 0
+                if failures['consecutive'] >= MAX_CONSECUTIVE_REPEATER_FAILURES:
+                    backing_off.set()
+
+    def send_pending_in_thread():
+        try:
+            send_pending()
+        finally:
+            # connections are per thread
+            connections.close_all()
+
+    if concurrency < 2:
+        send_pending()
+        return
+
+    threads = [
+        threading.Thread(target=send_pending_in_thread, name='repeater-{}'.format(repeater._id))
+        for i in range(min(concurrency, len(repeat_records)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
 def _get_repeat_record_lock_key(record):
     """
     Including the rev in the key means that the record will be unlocked for processing
@@ -3,8 +3,10 @@ from __future__ import unicode_literals
 import uuid
 from datetime import datetime, timedelta
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from corehq.motech.repeaters.dbaccessors import (
+    claim_due_repeat_records,
     get_failure_repeat_record_count,
     get_overdue_repeat_record_count,
     get_paged_repeat_records,
@@ -13,12 +15,24 @@ from corehq.motech.repeaters.dbaccessors import (
     get_repeaters_by_domain,
     get_success_repeat_record_count,
     iterate_repeat_records,
+    iter_claimed_repeat_records,
     iter_repeat_records_by_domain,
     get_domains_that_have_repeat_records,
     get_repeat_records_by_payload_id,
 )
-from corehq.motech.repeaters.models import RepeatRecord, CaseRepeater
-from corehq.motech.repeaters.const import RECORD_PENDING_STATE, RECORD_CANCELLED_STATE
+from corehq.motech.repeaters.models import (
+    CaseRepeater,
+    RepeatRecord,
+    RepeatRecordAttempt,
+    SQLRepeatRecord,
+    SQLRepeatRecordAttempt,
+)
+from corehq.motech.repeaters.const import (
+    RECORD_CANCELLED_STATE,
+    RECORD_FAILURE_STATE,
+    RECORD_PENDING_STATE,
+    RECORD_SUCCESS_STATE,
+)
 
 
 class TestRepeatRecordDBAccessors(TestCase):
@@ -146,6 +160,11 @@ class TestRepeatRecordDBAccessors(TestCase):
         overdue_count = get_overdue_repeat_record_count()
         self.assertEqual(overdue_count, 1)
 
+    @override_settings(REPEAT_RECORDS_SQL_QUEUE=True)
+    def test_get_overdue_repeat_record_count_sql(self):
+        overdue_count = get_overdue_repeat_record_count()
+        self.assertEqual(overdue_count, 1)
+
     def test_get_all_repeat_records_by_domain_wrong_domain(self):
         records = list(iter_repeat_records_by_domain("wrong-domain"))
         self.assertEqual(len(records), 0)
@@ -201,6 +220,100 @@ class TestRepeatRecordDBAccessors(TestCase):
         self.assertItemsEqual([r._id for r in id_2_records], [r._id for r in self.records[2:6]])
 
 
+class TestSQLRepeatRecordQueue(TestCase):
+    domain = 'test-sql-repeat-record-queue'
+
+    def setUp(self):
+        super(TestSQLRepeatRecordQueue, self).setUp()
+        self.now = datetime.utcnow()
+        before = self.now - timedelta(minutes=5)
+        self.pending = self._make_record(next_check=before - timedelta(minutes=5))
+        self.failed = self._make_record(next_check=before, failure_reason='Some python error')
+        self.succeeded = self._make_record(next_check=None, succeeded=True)
+        self.later = self._make_record(next_check=self.now + timedelta(hours=1))
+
+    def _make_record(self, **kwargs):
+        record = RepeatRecord(
+            domain=self.domain,
+            repeater_id='1234',
+            payload_id=uuid.uuid4().hex,
+            **kwargs
+        )
+        record.save()
+        self.addCleanup(record.delete)
+        return record
+
+    def _get_sql_record(self, record):
+        return SQLRepeatRecord.objects.get(couch_id=record._id)
+
+    def test_sync_on_save(self):
+        self.assertEqual(
+            {
+                self.pending._id: (RECORD_PENDING_STATE, self.pending.next_check),
+                self.failed._id: (RECORD_FAILURE_STATE, self.failed.next_check),
+                self.succeeded._id: (RECORD_SUCCESS_STATE, None),
+                self.later._id: (RECORD_PENDING_STATE, self.later.next_check),
+            },
+            {
+                couch_id: (state, next_check)
+                for couch_id, state, next_check in SQLRepeatRecord.objects.filter(
+                    domain=self.domain
+                ).values_list('couch_id', 'state', 'next_check')
+            }
+        )
+
+    def test_attempts(self):
+        self.pending.add_attempt(self.pending.make_set_next_try_attempt('Timed out'))
+        self.pending.save()
+        self.pending.add_attempt(RepeatRecordAttempt(
+            datetime=datetime.utcnow() + timedelta(seconds=1),
+            succeeded=True,
+            success_response='200: OK.',
+        ))
+        self.pending.save()
+        # nothing changed so the attempts aren't inserted again
+        self.pending.save()
+
+        attempts = SQLRepeatRecordAttempt.objects.filter(repeat_record__couch_id=self.pending._id)
+        self.assertEqual(
+            [(RECORD_FAILURE_STATE, 'Timed out'), (RECORD_SUCCESS_STATE, '200: OK.')],
+            list(attempts.order_by('id').values_list('state', 'message'))
+        )
+        self.assertEqual(RECORD_SUCCESS_STATE, self._get_sql_record(self.pending).state)
+        self.assertIsNone(self._get_sql_record(self.pending).next_check)
+
+    def test_delete(self):
+        self.later.delete()
+        self.assertFalse(SQLRepeatRecord.objects.filter(couch_id=self.later._id).exists())
+
+    def test_claim_due_repeat_records(self):
+        self.assertEqual([self.pending._id], claim_due_repeat_records(self.now, limit=1))
+        self.assertEqual([self.failed._id], claim_due_repeat_records(self.now, limit=10))
+        self.assertEqual([], claim_due_repeat_records(self.now, limit=10))
+
+    def test_save_releases_claim(self):
+        claim_due_repeat_records(self.now, limit=10)
+        self.failed.postpone_by(timedelta(0))
+        self.assertEqual([self.failed._id], claim_due_repeat_records(datetime.utcnow(), limit=10))
+
+    def test_iter_claimed_repeat_records(self):
+        cutoff = self.now + timedelta(minutes=1)
+        records = list(iter_claimed_repeat_records(self.now, cutoff, chunk_size=1))
+        self.assertEqual([self.pending._id, self.failed._id], [record._id for record in records])
+
+    def test_iter_claimed_repeat_records_out_of_sync(self):
+        SQLRepeatRecord.objects.filter(couch_id=self.succeeded._id).update(
+            state=RECORD_PENDING_STATE,
+            next_check=self.now - timedelta(minutes=1),
+        )
+        cutoff = self.now + timedelta(minutes=1)
+        records = list(iter_claimed_repeat_records(self.now, cutoff))
+        self.assertItemsEqual([self.pending._id, self.failed._id], [record._id for record in records])
+        sql_record = self._get_sql_record(self.succeeded)
+        self.assertEqual(RECORD_SUCCESS_STATE, sql_record.state)
+        self.assertIsNone(sql_record.next_check)
+
+
 class TestRepeatersDBAccessors(TestCase):
     domain = 'test-domain'
 
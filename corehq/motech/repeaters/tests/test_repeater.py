@@ -4,9 +4,9 @@ import uuid
 from collections import namedtuple
 from datetime import datetime, timedelta
 import json
-from mock import patch
+from mock import Mock, patch
 
-from django.test import override_settings, TestCase
+from django.test import override_settings, SimpleTestCase, TestCase
 
 from casexml.apps.case.mock import CaseBlock, CaseFactory
 from casexml.apps.case.xform import cases_referenced_by_xform
@@ -18,7 +18,7 @@ from corehq.apps.receiverwrapper.exceptions import DuplicateFormatException, Ign
 from corehq.apps.receiverwrapper.util import submit_form_locally
 from corehq.motech.repeaters.repeater_generators import FormRepeaterXMLPayloadGenerator, RegisterGenerator, \
     BasePayloadGenerator
-from corehq.motech.repeaters.tasks import check_repeaters, process_repeat_record
+from corehq.motech.repeaters.tasks import check_repeaters, process_repeat_record, _send_repeat_records
 from corehq.motech.repeaters.models import (
     CaseRepeater,
     FormRepeater,
@@ -26,7 +26,12 @@ from corehq.motech.repeaters.models import (
     LocationRepeater,
     RepeatRecord,
     ShortFormRepeater)
-from corehq.motech.repeaters.const import MIN_RETRY_WAIT, POST_TIMEOUT, RECORD_SUCCESS_STATE
+from corehq.motech.repeaters.const import (
+    MAX_CONSECUTIVE_REPEATER_FAILURES,
+    MIN_RETRY_WAIT,
+    POST_TIMEOUT,
+    RECORD_SUCCESS_STATE,
+)
 from corehq.motech.repeaters.dbaccessors import delete_all_repeat_records, delete_all_repeaters
 from corehq.apps.users.models import CommCareUser
 from corehq.form_processor.tests.utils import run_with_all_backends, FormProcessorTestUtils
@@ -235,6 +240,21 @@ class RepeaterTest(BaseRepeaterTest):
             check_repeaters()
             self.assertEqual(mock_fire.call_count, 0)
 
+    @run_with_all_backends
+    @flag_enabled('BATCH_REPEAT_RECORDS')
+    def test_check_repeat_records_batched(self):
+        self.assertEqual(len(RepeatRecord.all()), 2)
+
+        with patch('corehq.motech.repeaters.models.simple_post',
+                   return_value=MockResponse(status_code=200, reason='')) as mock_fire:
+            check_repeaters()
+            self.assertEqual(mock_fire.call_count, 2)
+            self.assertIsNotNone(mock_fire.call_args[1]['session'])
+
+        with patch('corehq.motech.repeaters.models.simple_post') as mock_fire:
+            check_repeaters()
+            self.assertEqual(mock_fire.call_count, 0)
+
     @run_with_all_backends
     def test_repeat_record_status_check(self):
         self.assertEqual(len(RepeatRecord.all()), 2)
@@ -303,6 +323,31 @@ class RepeaterTest(BaseRepeaterTest):
         self.assertNotEqual(None, repeat_record.next_check)
 
 
+class SendRepeatRecordsTest(SimpleTestCase):
+
+    def test_postpone_after_consecutive_failures(self):
+        repeat_records = [Mock(overall_tries=0, succeeded=False) for i in range(8)]
+
+        def fail(repeat_record, repeater):
+            repeat_record.overall_tries += 1
+
+        with patch('corehq.motech.repeaters.tasks._process_repeat_record', side_effect=fail) as process:
+            _send_repeat_records(Mock(_id='abc123'), repeat_records, concurrency=1)
+        self.assertEqual(process.call_count, MAX_CONSECUTIVE_REPEATER_FAILURES)
+        for repeat_record in repeat_records[MAX_CONSECUTIVE_REPEATER_FAILURES:]:
+            repeat_record.postpone_by.assert_called_once_with(MIN_RETRY_WAIT)
+
+    def test_success_resets_failures(self):
+        repeat_records = [Mock(overall_tries=0, succeeded=i % 2 == 0) for i in range(12)]
+
+        def send(repeat_record, repeater):
+            repeat_record.overall_tries += 1
+
+        with patch('corehq.motech.repeaters.tasks._process_repeat_record', side_effect=send) as process:
+            _send_repeat_records(Mock(_id='abc123'), repeat_records, concurrency=3)
+        self.assertEqual(process.call_count, 12)
+
+
 class FormPayloadGeneratorTest(BaseRepeaterTest, TestXmlMixin):
 
     @classmethod
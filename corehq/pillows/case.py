@@ -14,6 +14,7 @@ from corehq.pillows.utils import get_user_type
 from corehq.util.doc_processor.couch import CouchDocumentProvider
 from corehq.util.doc_processor.sql import SqlDocumentProvider
 from pillowtop.checkpoints.manager import get_checkpoint_for_elasticsearch_pillow
+from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE, PROCESSOR_CHUNK_HEARTBEAT_MS
 from pillowtop.pillow.interface import ConstructedPillow
 from pillowtop.processors.elastic import ElasticProcessor
 from pillowtop.reindexer.reindexer import ResumableBulkElasticPillowReindexer, ReindexerFactory
@@ -38,7 +39,8 @@ def transform_case_for_elasticsearch(doc_dict):
 
 
 def get_case_to_elasticsearch_pillow(pillow_id='CaseToElasticsearchPillow', num_processes=1,
-                                     process_num=0, **kwargs):
+                                     process_num=0,
+                                     processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE, **kwargs):
     assert pillow_id == 'CaseToElasticsearchPillow', 'Pillow ID is not allowed to change'
     checkpoint = get_checkpoint_for_elasticsearch_pillow(pillow_id, CASE_INDEX_INFO, topics.CASE_TOPICS)
     case_processor = ElasticProcessor(
@@ -47,7 +49,8 @@ def get_case_to_elasticsearch_pillow(pillow_id='CaseToElasticsearchPillow', num_
         doc_prep_fn=transform_case_for_elasticsearch
     )
     kafka_change_feed = KafkaChangeFeed(
-        topics=topics.CASE_TOPICS, group_id='cases-to-es', num_processes=num_processes, process_num=process_num
+        topics=topics.CASE_TOPICS, group_id='cases-to-es', num_processes=num_processes, process_num=process_num,
+        heartbeat_ms=PROCESSOR_CHUNK_HEARTBEAT_MS if processor_chunk_size else None,
     )
     return ConstructedPillow(
         name=pillow_id,
@@ -57,6 +60,7 @@ def get_case_to_elasticsearch_pillow(pillow_id='CaseToElasticsearchPillow', num_
         change_processed_event_handler=KafkaCheckpointEventHandler(
             checkpoint=checkpoint, checkpoint_frequency=100, change_feed=kafka_change_feed
         ),
+        processor_chunk_size=processor_chunk_size,
     )
 
 
@@ -39,6 +39,7 @@ from dimagi.utils.parsing import json_format_datetime
 from pillowtop.checkpoints.manager import (
     get_checkpoint_for_elasticsearch_pillow,
 )
+from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE, PROCESSOR_CHUNK_HEARTBEAT_MS
 from pillowtop.es_utils import initialize_index_and_mapping
 from pillowtop.feed.interface import Change
 from pillowtop.pillow.interface import ConstructedPillow
@@ -94,6 +95,15 @@ def _get_case_properties(doc_dict):
 class CaseSearchPillowProcessor(ElasticProcessor):
 
     def process_change(self, pillow_instance, change):
+        if self._needs_search_index(change):
+            super(CaseSearchPillowProcessor, self).process_change(pillow_instance, change)
+
+    def process_changes_chunk(self, pillow_instance, changes_chunk):
+        changes_chunk = [change for change in changes_chunk if self._needs_search_index(change)]
+        return super(CaseSearchPillowProcessor, self).process_changes_chunk(pillow_instance, changes_chunk)
+
+    @staticmethod
+    def _needs_search_index(change):
         assert isinstance(change, Change)
         if change.metadata is not None:
             # Comes from KafkaChangeFeed (i.e. running pillowtop)
@@ -102,12 +112,12 @@ class CaseSearchPillowProcessor(ElasticProcessor):
             # comes from ChangeProvider (i.e reindexing)
             domain = change.get_document()['domain']
 
-        if domain and domain_needs_search_index(domain):
-            super(CaseSearchPillowProcessor, self).process_change(pillow_instance, change)
+        return domain and domain_needs_search_index(domain)
 
 
 def get_case_search_to_elasticsearch_pillow(pillow_id='CaseSearchToElasticsearchPillow', num_processes=1,
-                                            process_num=0, **kwargs):
+                                            process_num=0,
+                                            processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE, **kwargs):
     assert pillow_id == 'CaseSearchToElasticsearchPillow', 'Pillow ID is not allowed to change'
     checkpoint = get_checkpoint_for_elasticsearch_pillow(pillow_id, CASE_SEARCH_INDEX_INFO, topics.CASE_TOPICS)
     case_processor = CaseSearchPillowProcessor(
@@ -116,7 +126,8 @@ def get_case_search_to_elasticsearch_pillow(pillow_id='CaseSearchToElasticsearch
         doc_prep_fn=transform_case_for_elasticsearch
     )
     change_feed = KafkaChangeFeed(
-        topics=topics.CASE_TOPICS, group_id='cases-to-es', num_processes=num_processes, process_num=process_num
+        topics=topics.CASE_TOPICS, group_id='cases-to-es', num_processes=num_processes, process_num=process_num,
+        heartbeat_ms=PROCESSOR_CHUNK_HEARTBEAT_MS if processor_chunk_size else None,
     )
     return ConstructedPillow(
         name=pillow_id,
@@ -126,6 +137,7 @@ def get_case_search_to_elasticsearch_pillow(pillow_id='CaseSearchToElasticsearch
         change_processed_event_handler=KafkaCheckpointEventHandler(
             checkpoint=checkpoint, checkpoint_frequency=100, change_feed=change_feed,
         ),
+        processor_chunk_size=processor_chunk_size,
     )
 
 
@@ -13,6 +13,7 @@ from corehq.elastic import (
 from corehq.pillows.mappings.user_mapping import USER_INDEX, USER_INDEX_INFO
 from corehq.util.quickcache import quickcache
 from pillowtop.checkpoints.manager import get_checkpoint_for_elasticsearch_pillow
+from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE, PROCESSOR_CHUNK_HEARTBEAT_MS
 from pillowtop.pillow.interface import ConstructedPillow
 from pillowtop.processors import ElasticProcessor, PillowProcessor
 from pillowtop.reindexer.change_providers.couch import CouchViewChangeProvider
@@ -113,7 +114,8 @@ def add_demo_user_to_user_index():
     )
 
 
-def get_user_pillow(pillow_id='UserPillow', num_processes=1, process_num=0, **kwargs):
+def get_user_pillow(pillow_id='UserPillow', num_processes=1, process_num=0,
+                    processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE, **kwargs):
     assert pillow_id == 'UserPillow', 'Pillow ID is not allowed to change'
     checkpoint = get_checkpoint_for_elasticsearch_pillow(pillow_id, USER_INDEX_INFO, topics.USER_TOPICS)
     user_processor = ElasticProcessor(
@@ -122,7 +124,8 @@ def get_user_pillow(pillow_id='UserPillow', num_processes=1, process_num=0, **kw
         doc_prep_fn=transform_user_for_elasticsearch,
     )
     change_feed = KafkaChangeFeed(
-        topics=topics.USER_TOPICS, group_id='users-to-es', num_processes=num_processes, process_num=process_num
+        topics=topics.USER_TOPICS, group_id='users-to-es', num_processes=num_processes, process_num=process_num,
+        heartbeat_ms=PROCESSOR_CHUNK_HEARTBEAT_MS if processor_chunk_size else None,
     )
     return ConstructedPillow(
         name=pillow_id,
@@ -132,6 +135,7 @@ def get_user_pillow(pillow_id='UserPillow', num_processes=1, process_num=0, **kw
         change_processed_event_handler=KafkaCheckpointEventHandler(
             checkpoint=checkpoint, checkpoint_frequency=100, change_feed=change_feed
         ),
+        processor_chunk_size=processor_chunk_size,
     )
 
 
@@ -25,6 +25,7 @@ from couchforms.models import XFormInstance, XFormArchived, XFormError, XFormDep
     XFormDuplicate, SubmissionErrorLog
 from dimagi.utils.parsing import string_to_utc_datetime
 from pillowtop.checkpoints.manager import get_checkpoint_for_elasticsearch_pillow
+from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE, PROCESSOR_CHUNK_HEARTBEAT_MS
 from pillowtop.pillow.interface import ConstructedPillow
 from pillowtop.processors.elastic import ElasticProcessor
 from pillowtop.reindexer.reindexer import ResumableBulkElasticPillowReindexer, ReindexerFactory
@@ -134,7 +135,8 @@ def transform_xform_for_elasticsearch(doc_dict):
 
 
 def get_xform_to_elasticsearch_pillow(pillow_id='XFormToElasticsearchPillow', num_processes=1,
-                                      process_num=0, **kwargs):
+                                      process_num=0,
+                                      processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE, **kwargs):
     assert pillow_id == 'XFormToElasticsearchPillow', 'Pillow ID is not allowed to change'
     checkpoint = get_checkpoint_for_elasticsearch_pillow(pillow_id, XFORM_INDEX_INFO, topics.FORM_TOPICS)
     form_processor = ElasticProcessor(
@@ -144,7 +146,8 @@ def get_xform_to_elasticsearch_pillow(pillow_id='XFormToElasticsearchPillow', nu
         doc_filter_fn=xform_pillow_filter,
     )
     kafka_change_feed = KafkaChangeFeed(
-        topics=topics.FORM_TOPICS, group_id='forms-to-es', num_processes=num_processes, process_num=process_num
+        topics=topics.FORM_TOPICS, group_id='forms-to-es', num_processes=num_processes, process_num=process_num,
+        heartbeat_ms=PROCESSOR_CHUNK_HEARTBEAT_MS if processor_chunk_size else None,
     )
     return ConstructedPillow(
         name=pillow_id,
@@ -154,6 +157,7 @@ def get_xform_to_elasticsearch_pillow(pillow_id='XFormToElasticsearchPillow', nu
         change_processed_event_handler=KafkaCheckpointEventHandler(
             checkpoint=checkpoint, checkpoint_frequency=100, change_feed=kafka_change_feed
         ),
+        processor_chunk_size=processor_chunk_size,
     )
 
 
@@ -0,0 +1,16 @@
+DROP FUNCTION IF EXISTS get_cases_by_external_ids(TEXT, TEXT[], TEXT);
+
+CREATE FUNCTION get_cases_by_external_ids(p_domain TEXT, p_external_ids TEXT[], p_type TEXT DEFAULT NULL) RETURNS SETOF form_processor_commcarecasesql AS $$
+DECLARE
+    query_expr    TEXT := 'SELECT * FROM form_processor_commcarecasesql WHERE domain = $1 AND external_id = ANY($2) AND deleted = FALSE';
+    type_filter   TEXT := ' AND type = $3';
+BEGIN
+    IF p_type <> '' THEN
+        query_expr := query_expr || type_filter;
+    END IF;
+
+    RETURN QUERY
+    EXECUTE query_expr
+        USING p_domain, p_external_ids, p_type;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,30 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from datetime import timedelta
+
+from celery.task import periodic_task
+from django.conf import settings
+
+from corehq.sql_db.util import (
+    REPLICATION_CHECK_FREQUENCY,
+    get_replication_delays,
+    get_standby_databases,
+    publish_replication_delays,
+)
+from corehq.util.datadog.gauges import datadog_gauge
+
+
+@periodic_task(run_every=timedelta(seconds=REPLICATION_CHECK_FREQUENCY), queue=settings.CELERY_PERIODIC_QUEUE,
+               expires=REPLICATION_CHECK_FREQUENCY, ignore_result=True)
+def track_standby_replication_delays():
+    """
+    Publish the replication delay of each standby database so that reads
+    can be routed away from stale standbys without querying them in the
+    request
+    """
+    delays = get_replication_delays()
+    publish_replication_delays(delays)
+    for db_alias in get_standby_databases():
+        datadog_gauge('commcare.sql_db.replication_delay', delays[db_alias], tags=[
+            'database:{}'.format(db_alias),
+        ])
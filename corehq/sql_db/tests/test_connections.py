@@ -149,3 +149,13 @@ class ConnectionManagerTests(SimpleTestCase):
                 filter_out_stale_standbys(['ucr', 'default']),
                 ['ucr']
             )
+
+    @mock.patch('corehq.sql_db.util.get_replication_delay_for_standby')
+    def test_filter_out_stale_standbys_published(self, get_replication_delay):
+        delays = {'ucr': 2, 'default': 4}
+        with mock.patch('corehq.sql_db.util.get_published_replication_delays', return_value=delays):
+            self.assertEqual(
+                filter_out_stale_standbys(['ucr', 'default']),
+                ['ucr']
+            )
+        get_replication_delay.assert_not_called()
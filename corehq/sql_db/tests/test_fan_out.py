@@ -0,0 +1,38 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from django.test import SimpleTestCase
+
+from corehq.sql_db.util import fan_out_across_databases
+
+RESULTS = {
+    'db1': [1, 4, 7, 10],
+    'db2': [2, 3, 8],
+    'db3': [],
+    'db4': [5, 6, 9, 11, 12],
+}
+
+
+class FanOutAcrossDatabasesTest(SimpleTestCase):
+
+    def get_results(self, db_alias):
+        return iter(RESULTS[db_alias])
+
+    def test_unordered(self):
+        for max_workers in [1, 2, 8]:
+            results = fan_out_across_databases(sorted(RESULTS), self.get_results, max_workers=max_workers)
+            self.assertItemsEqual(list(results), list(range(1, 13)))
+
+    def test_sorted(self):
+        for max_workers in [1, 8]:
+            results = fan_out_across_databases(
+                sorted(RESULTS), self.get_results, key=lambda x: x, max_workers=max_workers)
+            self.assertEqual(list(results), list(range(1, 13)))
+
+    def test_error(self):
+        def get_results(db_alias):
+            if db_alias == 'db2':
+                raise ValueError(db_alias)
+            return RESULTS[db_alias]
+
+        with self.assertRaises(ValueError):
+            list(fan_out_across_databases(sorted(RESULTS), get_results, max_workers=8))
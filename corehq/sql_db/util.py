@@ -1,16 +1,23 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
+import heapq
+import sys
+import threading
 import uuid
 from collections import defaultdict
+from itertools import chain
+from operator import attrgetter, itemgetter
 from numpy import random
 
 from django.conf import settings
 from django import db
+from django.core.cache import cache
 from django.db.utils import InterfaceError as DjangoInterfaceError
 from functools import wraps
 from psycopg2._psycopg import InterfaceError as Psycopg2InterfaceError
 import six
+from six.moves.queue import Empty, Full, Queue
 from memoized import memoized
 
 from corehq.sql_db.config import partition_config
@@ -20,11 +27,22 @@ from corehq.util.quickcache import quickcache
 ACCEPTABLE_STANDBY_DELAY_SECONDS = 3
 STALE_CHECK_FREQUENCY = 30
 
+# replication delays are published by corehq.sql_db.tasks.track_standby_replication_delays
+REPLICATION_DELAYS_CACHE_KEY = 'sql-db-replication-delays'
+REPLICATION_CHECK_FREQUENCY = 10
+# ignore published delays if the task stops running
+REPLICATION_DELAYS_TIMEOUT = 6 * REPLICATION_CHECK_FREQUENCY
 
-def run_query_across_partitioned_databases(model_class, q_expression, values=None, annotate=None):
+# maximum number of results buffered for each query in fan_out_across_databases
+FAN_OUT_BUFFER_SIZE = 1000
+
+
+def run_query_across_partitioned_databases(model_class, q_expression, values=None, annotate=None,
+                                           order_by=None):
     """
     Runs a query across all partitioned databases and produces a generator
-    with the results.
+    with the results. The databases are queried concurrently (see
+    ``fan_out_across_databases``).
 
     :param model_class: A Django model class
 
@@ -39,6 +57,10 @@ def run_query_across_partitioned_databases(model_class, q_expression, values=Non
     :param annotate: (optional) If specified, should by a dictionary of annotated fields
     and their calculations. The dictionary will be splatted into the `.annotate` function
 
+    :param order_by: (optional) If specified, should be a list of fields to sort the
+    results by (ascending only). When used with ``values`` these fields must be included
+    in ``values``. Otherwise results are returned in no particular order.
+
     :return: A generator with the results
     """
     db_names = get_db_aliases_for_partitioned_query()
@@ -46,20 +68,172 @@ def run_query_across_partitioned_databases(model_class, q_expression, values=Non
     if values and not isinstance(values, (list, tuple)):
         raise ValueError("Expected a list or tuple")
 
-    for db_name in db_names:
+    key = None
+    if order_by:
+        if any(field.startswith('-') for field in order_by):
+            raise ValueError("Only ascending order is supported")
+        key = _get_sort_key(values, order_by)
+
+    def get_results(db_name):
         qs = model_class.objects.using(db_name)
         if annotate:
             qs = qs.annotate(**annotate)
 
         qs = qs.filter(q_expression)
+        if order_by:
+            qs = qs.order_by(*order_by)
         if values:
             if len(values) == 1:
                 qs = qs.values_list(*values, flat=True)
             else:
                 qs = qs.values_list(*values)
 
-        for result in qs.iterator():
+        return qs.iterator()
+
+    return fan_out_across_databases(db_names, get_results, key=key)
+
+
+def _get_sort_key(values, order_by):
+    if not values:
+        return attrgetter(*order_by)
+    if len(values) == 1:
+        if list(order_by) != list(values):
+            raise ValueError("order_by fields must be included in values")
+        return lambda value: value
+    try:
+        indexes = [list(values).index(field) for field in order_by]
+    except ValueError:
+        raise ValueError("order_by fields must be included in values")
+    return itemgetter(*indexes)
+
+
+def fan_out_across_databases(db_aliases, get_results, key=None, max_workers=None):
+    """
+    Run a query on several databases concurrently and stream the results back
+
+    Each query runs in a worker thread, which uses its own database connections
+    and closes them when done. At most ``FAN_OUT_BUFFER_SIZE`` results are
+    buffered for each worker.
+
+    :param db_aliases: The databases to query.
+    :param get_results: Function called with a database alias which returns an
+    iterable of results from that database.
+    :param key: (optional) If specified, the results from each database must be
+    sorted by this key function and the combined results are merge sorted by
+    it. Otherwise results are yielded in the order they are received.
+    :param max_workers: (optional) Maximum number of databases queried at once
+    when results are unordered. Defaults to ``settings.PARTITIONED_QUERY_MAX_WORKERS``.
+    Merge sorting queries all databases at once. Databases are queried one after
+    another in the current thread if this is 1.
+    :return: A generator with the results
+    """
+    db_aliases = list(db_aliases)
+    if max_workers is None:
+        max_workers = settings.PARTITIONED_QUERY_MAX_WORKERS
+    if len(db_aliases) < 2 or max_workers < 2:
+        streams = (get_results(db_alias) for db_alias in db_aliases)
+        if key is None:
+            return chain.from_iterable(streams)
+        return _merge_sorted(list(streams), key)
+
+    if key is None:
+        return _fan_out_unordered(db_aliases, get_results, min(max_workers, len(db_aliases)))
+    return _fan_out_sorted(db_aliases, get_results, key)
+
+
+_RESULT = 'result'
+_ERROR = 'error'
+_DONE = 'done'
+
+
+def _fan_out_unordered(db_aliases, get_results, num_workers):
+    pending = Queue()
+    for db_alias in db_aliases:
+        pending.put(db_alias)
+
+    def iter_pending():
+        while True:
+            try:
+                yield pending.get_nowait()
+            except Empty:
+                return
+
+    results = Queue(FAN_OUT_BUFFER_SIZE)
+    stopped = threading.Event()
+    for i in range(num_workers):
+        _start_worker(iter_pending(), get_results, results, stopped)
+    try:
+        for result in _iter_worker_results(results, stopped, num_workers):
+            yield result
+    finally:
+        stopped.set()
+
+
+def _fan_out_sorted(db_aliases, get_results, key):
+    stopped = threading.Event()
+    streams = []
+    for db_alias in db_aliases:
+        results = Queue(FAN_OUT_BUFFER_SIZE)
+        _start_worker([db_alias], get_results, results, stopped)
+        streams.append(_iter_worker_results(results, stopped, 1))
+    try:
+        for result in _merge_sorted(streams, key):
             yield result
+    finally:
+        stopped.set()
+
+
+def _start_worker(db_aliases, get_results, results, stopped):
+    def put(item):
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def work():
+        try:
+            for db_alias in db_aliases:
+                for result in get_results(db_alias):
+                    if not put((_RESULT, result)):
+                        return
+        except Exception:
+            put((_ERROR, sys.exc_info()))
+        finally:
+            # connections are per thread
+            db.connections.close_all()
+            put((_DONE, None))
+
+    thread = threading.Thread(target=work, name='fan-out-query')
+    thread.daemon = True
+    thread.start()
+
+
+def _iter_worker_results(results, stopped, num_workers):
+    remaining = num_workers
+    while remaining:
+        kind, value = results.get()
+        if kind == _RESULT:
+            yield value
+        elif kind == _DONE:
+            remaining -= 1
+        else:
+            stopped.set()
+            six.reraise(*value)
+
+
+def _merge_sorted(streams, key):
+    # heapq.merge has no key argument in Python 2. The stream index and
+    # position break ties so that results are never compared directly.
+    def decorate(index, stream):
+        for position, result in enumerate(stream):
+            yield key(result), index, position, result
+
+    merged = heapq.merge(*[decorate(index, stream) for index, stream in enumerate(streams)])
+    for _, _, _, result in merged:
+        yield result
 
 
 def split_list_by_db_partition(partition_values):
@@ -214,10 +388,49 @@ def get_standby_delays_by_db():
     return ret
 
 
-@quickcache(['dbs'], timeout=STALE_CHECK_FREQUENCY, skip_arg=lambda *args: settings.UNIT_TESTING)
+def get_replication_delays():
+    """
+    :returns: dict of ``{db_alias: replication delay in seconds}`` for every
+        database (zero if it isn't a standby)
+    """
+    return {
+        db_alias: get_replication_delay_for_standby(db_alias)
+        for db_alias in settings.DATABASES
+    }
+
+
+def publish_replication_delays(delays):
+    cache.set(REPLICATION_DELAYS_CACHE_KEY, delays, REPLICATION_DELAYS_TIMEOUT)
+
+
+def get_published_replication_delays():
+    return cache.get(REPLICATION_DELAYS_CACHE_KEY) or {}
+
+
 def filter_out_stale_standbys(dbs):
-    # from given list of databases filters out those with more than
-    #   acceptable standby delay, if that database is a standby
+    """
+    From given list of databases filters out those with more than acceptable
+    standby delay, if that database is a standby
+
+    Uses the delays published in the background by
+    ``track_standby_replication_delays`` and only queries the databases
+    directly if they aren't available.
+    """
+    delays_by_db = get_standby_delays_by_db()
+    published_delays = get_published_replication_delays()
+    if not all(db in published_delays for db in dbs):
+        from corehq.util.datadog.gauges import datadog_counter
+        datadog_counter('commcare.sql_db.replication_delays_missing')
+        return _filter_out_stale_standbys(dbs)
+    return [
+        db
+        for db in dbs
+        if published_delays[db] <= delays_by_db.get(db, ACCEPTABLE_STANDBY_DELAY_SECONDS)
+    ]
+
+
+@quickcache(['dbs'], timeout=STALE_CHECK_FREQUENCY, skip_arg=lambda *args: settings.UNIT_TESTING)
+def _filter_out_stale_standbys(dbs):
     delays_by_db = get_standby_delays_by_db()
     return [
         db
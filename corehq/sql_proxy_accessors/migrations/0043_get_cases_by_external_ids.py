@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from __future__ import absolute_import
+
+from django.conf import settings
+from django.db import migrations
+
+from corehq.sql_db.operations import RawSQLMigration
+
+migrator = RawSQLMigration(('corehq', 'sql_proxy_accessors', 'sql_templates'), {
+    'PL_PROXY_CLUSTER_NAME': settings.PL_PROXY_CLUSTER_NAME
+})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sql_proxy_accessors', '0042_case_attachment_drops'),
+    ]
+
+    operations = [
+        migrator.get_migration('get_cases_by_external_ids.sql'),
+    ]
@@ -0,0 +1,6 @@
+DROP FUNCTION IF EXISTS get_cases_by_external_ids(TEXT, TEXT[], TEXT);
+
+CREATE FUNCTION get_cases_by_external_ids(p_domain TEXT, p_external_ids TEXT[], p_type TEXT DEFAULT NULL) RETURNS SETOF form_processor_commcarecasesql AS $$
+    CLUSTER '{{ PL_PROXY_CLUSTER_NAME }}';
+    RUN ON ALL;
+$$ LANGUAGE plproxy;
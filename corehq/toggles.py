@@ -661,6 +661,20 @@ LIVEQUERY_SYNC = StaticToggle(
     namespaces=[NAMESPACE_DOMAIN]
 )
 
+BATCH_REPEAT_RECORDS = StaticToggle(
+    'batch_repeat_records',
+    'Send repeat records in batches per repeater, reusing connections',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN]
+)
+
+LIVEQUERY_PREFETCH = StaticToggle(
+    'livequery_prefetch',
+    'Load the next batch of cases while serializing the current one in livequery restores',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN]
+)
+
 NO_VELLUM = StaticToggle(
     'no_vellum',
     'Allow disabling Form Builder per form '
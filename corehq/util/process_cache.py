@@ -0,0 +1,249 @@
+"""
+A bounded, process-local LRU cache used as an extra quickcache tier.
+
+Values are kept coherent between processes by publishing the keys that are
+cleared or explicitly set on a Redis channel that every process subscribes to.
+Until a process is subscribed to that channel the cache is bypassed entirely
+so it can never serve a value that may have been invalidated elsewhere.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from collections import Counter, OrderedDict
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from six.moves import cPickle as pickle
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'quickcache-lru-invalidation'
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# values larger than this are never stored locally
+DEFAULT_MAX_ITEM_BYTES = 1024 * 1024
+STATS_FLUSH_INTERVAL = 60
+RESUBSCRIBE_DELAY = 5
+
+HITS = 'hits'
+MISSES = 'misses'
+EVICTIONS = 'evictions'
+
+
+def _get_stats_name(key):
+    # quickcache keys look like 'quickcache.{function_name}.{source_hash}/{args}'
+    return key.split('/', 1)[0]
+
+
+class LocalLRUCache(object):
+    """
+    Thread safe LRU cache bounded by the total pickled size of its values.
+
+    Values are pickled on the way in and unpickled on the way out, like
+    Django's LocMemCache, so callers can't modify the cached copy.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_item_bytes=DEFAULT_MAX_ITEM_BYTES):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {HITS: Counter(), MISSES: Counter(), EVICTIONS: Counter()}
+        self._unflushed_stats = {HITS: Counter(), MISSES: Counter(), EVICTIONS: Counter()}
+        self._last_stats_flush = time.time()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                expires, pickled = entry
+                if expires > time.time():
+                    self._entries[key] = entry
+                    self._record(HITS, key)
+                    value = pickle.loads(pickled)
+                else:
+                    self.size -= len(pickled)
+                    entry = None
+            if entry is None:
+                self._record(MISSES, key)
+                value = default
+        self._maybe_flush_stats()
+        return value
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._delete(key)
+            if len(pickled) > self.max_item_bytes:
+                return
+            self._entries[key] = (time.time() + timeout, pickled)
+            self.size += len(pickled)
+            while self.size > self.max_bytes:
+                evicted_key, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self._record(EVICTIONS, evicted_key)
+
+    def delete(self, key):
+        with self._lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """
+        :returns: ``{stats_name: {'hits': n, 'misses': n, 'evictions': n}}``
+            where ``stats_name`` identifies the cached function
+        """
+        with self._lock:
+            names = set()
+            for counter in self._stats.values():
+                names.update(counter)
+            return {
+                name: {stat: counter[name] for stat, counter in self._stats.items()}
+                for name in names
+            }
+
+    def _record(self, stat, key):
+        name = _get_stats_name(key)
+        self._stats[stat][name] += 1
+        self._unflushed_stats[stat][name] += 1
+
+    def _maybe_flush_stats(self):
+        if time.time() - self._last_stats_flush < STATS_FLUSH_INTERVAL:
+            return
+
+        with self._lock:
+            unflushed, self._unflushed_stats = self._unflushed_stats, {
+                HITS: Counter(), MISSES: Counter(), EVICTIONS: Counter()
+            }
+            self._last_stats_flush = time.time()
+
+        from corehq.util.datadog.gauges import datadog_counter, datadog_gauge
+        for stat, counter in unflushed.items():
+            for name, value in counter.items():
+                datadog_counter('commcare.quickcache.lru.{}'.format(stat), value, tags=[
+                    'function:{}'.format(name),
+                ])
+        datadog_gauge('commcare.quickcache.lru.bytes', self.size)
+
+
+class _InvalidationSubscriber(object):
+    """
+    Listens for invalidated keys on the Redis channel in a daemon thread
+    and removes them from the local cache.
+    """
+
+    def __init__(self, local_cache):
+        self.local_cache = local_cache
+        self.subscribed = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        # the thread doesn't survive forking so check which process started it
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.subscribed.clear()
+                self.local_cache.clear()
+                thread = threading.Thread(target=self._listen_forever, name='quickcache-lru-invalidation')
+                thread.daemon = True
+                thread.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Lost subscription to quickcache invalidation channel')
+            # invalidations may have been missed while disconnected
+            self.subscribed.clear()
+            self.local_cache.clear()
+            time.sleep(RESUBSCRIBE_DELAY)
+
+    def _listen(self):
+        pubsub = _get_raw_redis_client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        self.local_cache.clear()
+        self.subscribed.set()
+        for message in pubsub.listen():
+            if message['type'] != 'message':
+                continue
+            key = message['data']
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            self.local_cache.delete(key)
+
+
+def _get_raw_redis_client():
+    from dimagi.utils.couch.cache.cache_core import get_redis_client
+    return get_redis_client().client.get_client()
+
+
+class InvalidatedLRUCache(object):
+    """
+    The local cache as seen by quickcache: reads miss and writes are dropped
+    whenever the process isn't listening for invalidations.
+    """
+
+    def __init__(self, local_cache):
+        self.local_cache = local_cache
+        self.subscriber = _InvalidationSubscriber(local_cache)
+
+    @property
+    def enabled(self):
+        if settings.UNIT_TESTING and not getattr(settings, 'QUICKCACHE_LRU_IN_TESTS', False):
+            return False
+        self.subscriber.ensure_running()
+        return self.subscriber.subscribed.is_set()
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            return default
+        return self.local_cache.get(key, default)
+
+    def set(self, key, value, timeout=None):
+        if self.enabled:
+            self.local_cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.local_cache.delete(key)
+
+    def get_stats(self):
+        return self.local_cache.get_stats()
+
+
+def publish_invalidation(key):
+    """
+    Remove ``key`` from the local cache of every process
+    """
+    local_lru_cache.delete(key)
+    if settings.UNIT_TESTING:
+        return
+    try:
+        _get_raw_redis_client().publish(INVALIDATION_CHANNEL, key)
+    except Exception:
+        # the key is still removed from the shared cache so other processes only
+        # serve the old value until their local copy expires
+        logger.exception('Unable to publish quickcache invalidation for %s', key)
+
+
+local_lru_cache = InvalidatedLRUCache(LocalLRUCache(
+    max_bytes=getattr(settings, 'QUICKCACHE_LRU_MAX_BYTES', DEFAULT_MAX_BYTES),
+))
@@ -1,11 +1,16 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
+from collections import namedtuple
 import warnings
 import hashlib
-from quickcache.django_quickcache import get_django_quickcache
-from quickcache import ForceSkipCache
+from django.core.cache import caches
+from quickcache.cache_helpers import CacheWithPresets, TieredCache
+from quickcache.django_quickcache import DjangoQuickCache
+from quickcache.quickcache import ConfigMixin
+from quickcache import ForceSkipCache, QuickCacheHelper, get_quickcache
 from celery._state import get_current_task
 from corehq.util.global_request import get_request
+from corehq.util.process_cache import local_lru_cache, publish_invalidation
 
 from corehq.util.soft_assert import soft_assert
 
@@ -43,9 +48,75 @@ def get_session_key():
         raise ForceSkipCache("Not part of a session")
 
 
-quickcache = get_django_quickcache(timeout=5 * 60, memoize_timeout=10,
-                                   assert_function=quickcache_soft_assert,
-                                   session_function=get_session_key)
+class LRUQuickCacheHelper(QuickCacheHelper):
+    """
+    Tells every process to drop its local copy of a value when it is
+    cleared or explicitly replaced
+    """
+
+    def __call__(self, *args, **kwargs):
+        content = super(LRUQuickCacheHelper, self).__call__(*args, **kwargs)
+        if self.skip(*args, **kwargs):
+            publish_invalidation(self.get_cache_key(*args, **kwargs))
+        return content
+
+    def set_cached_value(self, *args, **kwargs):
+        key = self.get_cache_key(*args, **kwargs)
+
+        def to(value):
+            self.cache.set(key, value)
+            publish_invalidation(key)
+
+        return namedtuple('Settable', ['to'])(to)
+
+    def clear(self, *args, **kwargs):
+        super(LRUQuickCacheHelper, self).clear(*args, **kwargs)
+        publish_invalidation(self.get_cache_key(*args, **kwargs))
+
+
+class HQQuickCache(namedtuple('HQQuickCache', DjangoQuickCache._fields + ('lru_timeout',)), ConfigMixin):
+    """
+    Like quickcache's DjangoQuickCache with an optional process-local LRU tier
+    between the per-session memoize tier and the shared cache.
+
+    Passing ``lru_timeout`` keeps values in every process for up to that many
+    seconds (but no longer than ``timeout``). Calls to ``.clear()`` and
+    ``.set_cached_value()`` are broadcast to all processes so they don't serve
+    stale values. Only use it for values that change through those functions;
+    anything that updates the shared cache directly can be stale for up to
+    ``lru_timeout`` seconds.
+    """
+
+    def call(self):
+        tiers = [CacheWithPresets(caches['locmem'], self.memoize_timeout, self.session_function)]
+        helper_class = self.helper_class
+        if self.lru_timeout:
+            lru_timeout = min(self.lru_timeout, self.timeout) if self.timeout else self.lru_timeout
+            tiers.append(CacheWithPresets(local_lru_cache, lru_timeout))
+            if helper_class is QuickCacheHelper:
+                helper_class = LRUQuickCacheHelper
+            assert issubclass(helper_class, LRUQuickCacheHelper), \
+                "lru_timeout needs a helper_class that broadcasts invalidations"
+        tiers.append(CacheWithPresets(caches['default'], self.timeout))
+        return get_quickcache(
+            cache=TieredCache([tier for tier in tiers if tier.timeout]),
+            vary_on=self.vary_on,
+            skip_arg=self.skip_arg,
+            helper_class=helper_class,
+            assert_function=self.assert_function,
+        ).call()
+
+
+quickcache = HQQuickCache(
+    vary_on=Ellipsis,
+    skip_arg=None,
+    timeout=5 * 60,
+    memoize_timeout=10,
+    helper_class=QuickCacheHelper,
+    assert_function=quickcache_soft_assert,
+    session_function=get_session_key,
+    lru_timeout=None,
+)
 
 
 def skippable_quickcache(*args, **kwargs):
@@ -0,0 +1,100 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from django.test import SimpleTestCase
+from mock import patch
+
+from corehq.util.process_cache import LocalLRUCache
+from corehq.util.quickcache import quickcache
+
+
+class LocalLRUCacheTest(SimpleTestCase):
+
+    def test_get_set(self):
+        cache = LocalLRUCache()
+        cache.set('quickcache.fn/a', {'value': 1}, timeout=60)
+        self.assertEqual({'value': 1}, cache.get('quickcache.fn/a'))
+        self.assertIsNone(cache.get('quickcache.fn/b'))
+        self.assertEqual(Ellipsis, cache.get('quickcache.fn/b', default=Ellipsis))
+
+    def test_returns_copy(self):
+        cache = LocalLRUCache()
+        cache.set('quickcache.fn/a', ['value'], timeout=60)
+        cache.get('quickcache.fn/a').append('other')
+        self.assertEqual(['value'], cache.get('quickcache.fn/a'))
+
+    def test_expiry(self):
+        cache = LocalLRUCache()
+        with patch('corehq.util.process_cache.time.time', return_value=1000):
+            cache.set('quickcache.fn/a', 1, timeout=60)
+        with patch('corehq.util.process_cache.time.time', return_value=1059):
+            self.assertEqual(1, cache.get('quickcache.fn/a'))
+        with patch('corehq.util.process_cache.time.time', return_value=1061):
+            self.assertIsNone(cache.get('quickcache.fn/a'))
+        self.assertEqual(0, cache.size)
+
+    def test_evicts_least_recently_used(self):
+        value = 'x' * 100
+        cache = LocalLRUCache(max_bytes=350)
+        for key in ['a', 'b', 'c']:
+            cache.set('quickcache.fn/' + key, value, timeout=60)
+        cache.get('quickcache.fn/a')
+        cache.set('quickcache.fn/d', value, timeout=60)
+        self.assertEqual(3, len(cache))
+        self.assertIsNone(cache.get('quickcache.fn/b'))
+        for key in ['a', 'c', 'd']:
+            self.assertEqual(value, cache.get('quickcache.fn/' + key))
+        self.assertLessEqual(cache.size, 350)
+
+    def test_skips_large_values(self):
+        cache = LocalLRUCache(max_item_bytes=50)
+        cache.set('quickcache.fn/a', 'x' * 100, timeout=60)
+        self.assertEqual(0, len(cache))
+
+    def test_stats(self):
+        cache = LocalLRUCache(max_bytes=150)
+        cache.set('quickcache.fn/a', 'x' * 100, timeout=60)
+        cache.get('quickcache.fn/a')
+        cache.get('quickcache.other_fn/a')
+        cache.set('quickcache.fn/b', 'x' * 100, timeout=60)
+        self.assertEqual({
+            'quickcache.fn': {'hits': 1, 'misses': 0, 'evictions': 1},
+            'quickcache.other_fn': {'hits': 0, 'misses': 1, 'evictions': 0},
+        }, cache.get_stats())
+
+
+@patch('corehq.util.quickcache.publish_invalidation')
+class LRUQuickCacheInvalidationTest(SimpleTestCase):
+
+    def test_clear(self, publish_invalidation):
+        @quickcache(['arg'], lru_timeout=60)
+        def cached(arg):
+            return arg
+
+        cached.clear('a')
+        publish_invalidation.assert_called_once_with(cached.get_cache_key('a'))
+
+    def test_set_cached_value(self, publish_invalidation):
+        @quickcache(['arg'], lru_timeout=60)
+        def cached(arg):
+            return arg
+
+        cached.set_cached_value('a').to('b')
+        publish_invalidation.assert_called_once_with(cached.get_cache_key('a'))
+
+    def test_skip_arg(self, publish_invalidation):
+        @quickcache(['arg'], skip_arg='refresh', lru_timeout=60)
+        def cached(arg, refresh=False):
+            return arg
+
+        cached('a')
+        publish_invalidation.assert_not_called()
+        cached('a', refresh=True)
+        publish_invalidation.assert_called_once_with(cached.get_cache_key('a'))
+
+    def test_no_lru(self, publish_invalidation):
+        @quickcache(['arg'])
+        def cached(arg):
+            return arg
+
+        cached.clear('a')
+        publish_invalidation.assert_not_called()
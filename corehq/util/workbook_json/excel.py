@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
+import shutil
 from tempfile import NamedTemporaryFile
 from zipfile import BadZipfile
 import openpyxl
@@ -194,7 +195,7 @@ class WorkbookJSONReader(object):
         elif not isinstance(f, file):
             tmp = NamedTemporaryFile(mode='wb', suffix='.xlsx', delete=False)
             filename = tmp.name
-            tmp.write(f.read())
+            shutil.copyfileobj(f, tmp)
             tmp.close()
         else:
             filename = f
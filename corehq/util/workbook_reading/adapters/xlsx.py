@@ -64,6 +64,10 @@ class _XLSXWorksheetAdaptor(object):
             yield [Cell(self._make_cell_value(cell)) for cell in row]
 
     def to_worksheet(self):
+        if self._worksheet.max_row is None:
+            # the file doesn't record the sheet's dimensions so count the rows
+            # in a single streaming pass rather than loading the sheet
+            self._worksheet.calculate_dimension(force=True)
         # Note that an empty sheet and a sheet with one row both have max_row = 1
         return Worksheet(title=self._worksheet.title, max_row=self._worksheet.max_row,
                          iter_rows=self.iter_rows)
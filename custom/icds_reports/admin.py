@@ -3,7 +3,7 @@ from __future__ import unicode_literals
 
 from django.contrib import admin
 
-from custom.icds_reports.models import AggregateSQLProfile
+from custom.icds_reports.models import AggregateSQLProfile, AggregationStepRecord
 
 
 class AggregateSQLProfileAdmin(admin.ModelAdmin):
@@ -13,3 +13,12 @@ class AggregateSQLProfileAdmin(admin.ModelAdmin):
 
 
 admin.site.register(AggregateSQLProfile, AggregateSQLProfileAdmin)
+
+
+class AggregationStepRecordAdmin(admin.ModelAdmin):
+    model = AggregationStepRecord
+    list_display = ('run_id', 'step', 'month', 'state_id', 'status', 'started_on', 'duration')
+    list_filter = ('status', 'step', 'aggregation_date')
+
+
+admin.site.register(AggregationStepRecord, AggregationStepRecordAdmin)
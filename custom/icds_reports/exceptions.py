@@ -1,3 +1,7 @@
 
 class TableauTokenException(Exception):
     pass
+
+
+class AggregationStepsFailed(Exception):
+    pass
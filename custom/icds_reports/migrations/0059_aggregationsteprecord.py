@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2018-08-20 10:12
+from __future__ import unicode_literals
+
+from __future__ import absolute_import
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('icds_reports', '0058_new_agg_ccs_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationStepRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(db_index=True, max_length=32)),
+                ('aggregation_date', models.DateField()),
+                ('step', models.TextField()),
+                ('month', models.DateField()),
+                ('state_id', models.TextField(null=True)),
+                ('status', models.CharField(max_length=16)),
+                ('started_on', models.DateTimeField(null=True)),
+                ('duration', models.FloatField(null=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='aggregationsteprecord',
+            unique_together=set([('run_id', 'step', 'month', 'state_id')]),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2018-08-22 09:31
+from __future__ import unicode_literals
+
+from __future__ import absolute_import
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('icds_reports', '0059_aggregationsteprecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UCRStateChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ucr_data_source_id', models.CharField(max_length=255)),
+                ('state_id', models.CharField(max_length=40)),
+                ('last_modified', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='ucrstatechange',
+            unique_together=set([('ucr_data_source_id', 'state_id')]),
+        ),
+    ]
@@ -32,7 +32,9 @@ from custom.icds_reports.models.views import (
 from custom.icds_reports.models.util import (
     UcrTableNameMapping,
     AggregateSQLProfile,
-    ICDSAuditEntryRecord
+    AggregationStepRecord,
+    ICDSAuditEntryRecord,
+    UCRStateChange,
 )
 from custom.icds_reports.models.helper import (
     IcdsMonths
@@ -2,9 +2,10 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import architect
+from datetime import datetime, timedelta
 import uuid
 
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 from django.contrib.postgres.fields import ArrayField, JSONField
 
 from dimagi.utils.web import get_ip
@@ -16,6 +17,71 @@ class AggregateSQLProfile(models.Model):
     duration = models.PositiveIntegerField()
 
 
+class AggregationStepRecord(models.Model):
+    """The outcome of a step of a dashboard aggregation run.
+    See ``custom.icds_reports.utils.aggregation_dag``.
+
+    Retrying a run updates its records, so that a run can be retried until
+    every step has succeeded.
+    """
+    run_id = models.CharField(max_length=32, db_index=True)
+    aggregation_date = models.DateField()
+    step = models.TextField()
+    month = models.DateField()
+    state_id = models.TextField(null=True)
+    status = models.CharField(max_length=16)
+    started_on = models.DateTimeField(null=True)
+    duration = models.FloatField(null=True)
+
+    class Meta(object):
+        app_label = 'icds_reports'
+        unique_together = ('run_id', 'step', 'month', 'state_id')
+
+
+class UCRStateChange(models.Model):
+    """The last time rows were saved to or removed from a UCR data source
+    used by the dashboard aggregation for a state. Aggregation steps for a
+    state whose data sources have not changed since the step last succeeded
+    are skipped by incremental runs.
+
+    Populated by ``custom.icds_reports.signals.record_dashboard_ucr_changes``
+    """
+    ucr_data_source_id = models.CharField(max_length=255)
+    state_id = models.CharField(max_length=40)
+    last_modified = models.DateTimeField()
+
+    # Changes are recorded for every chunk of rows saved, so a row's
+    # last_modified is only updated once it is older than this, to avoid
+    # contention between processes saving rows for the same state.
+    # last_modified can be this far behind the actual last change.
+    UPDATE_INTERVAL = timedelta(minutes=5)
+
+    class Meta(object):
+        app_label = 'icds_reports'
+        unique_together = ('ucr_data_source_id', 'state_id')
+
+    @classmethod
+    def record(cls, ucr_data_source_id, state_ids):
+        now = datetime.utcnow()
+        state_ids = set(state_ids)
+        changes = cls.objects.filter(ucr_data_source_id=ucr_data_source_id, state_id__in=state_ids)
+        existing = set(changes.values_list('state_id', flat=True))
+        changes.filter(last_modified__lt=now - cls.UPDATE_INTERVAL).update(last_modified=now)
+        missing = state_ids - existing
+        if not missing:
+            return
+
+        try:
+            with transaction.atomic(using=router.db_for_write(cls)):
+                cls.objects.bulk_create([
+                    cls(ucr_data_source_id=ucr_data_source_id, state_id=state_id, last_modified=now)
+                    for state_id in missing
+                ])
+        except IntegrityError:
+            # created by another process since the query above
+            changes.filter(state_id__in=missing).update(last_modified=now)
+
+
 class UcrTableNameMapping(models.Model):
     table_type = models.TextField(primary_key=True)
     table_name = models.TextField(blank=True, null=True)
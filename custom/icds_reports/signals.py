@@ -0,0 +1,34 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from django.dispatch import receiver
+
+from corehq.apps.userreports.signals import pre_save_indicator_rows
+from custom.icds_reports.const import DASHBOARD_DOMAIN
+
+
+@receiver(pre_save_indicator_rows)
+def record_dashboard_ucr_changes(sender, adapter, rows, doc_ids, **kwargs):
+    """Record the states whose rows in a data source used by an incremental
+    aggregation step are about to change. This includes the states of the
+    rows being replaced, in case a doc moved to another state or its rows
+    are being removed.
+    """
+    from custom.icds_reports.models import UCRStateChange
+    from custom.icds_reports.tasks import INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES
+
+    config = adapter.config
+    if config.domain != DASHBOARD_DOMAIN:
+        return
+    if config.table_id not in set(INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES.values()):
+        return
+
+    state_ids = {row['state_id'] for row in rows}
+    if doc_ids:
+        table = adapter.get_table()
+        with adapter.session_helper.session_context() as session:
+            query = session.query(table.c.state_id).filter(table.c.doc_id.in_(doc_ids)).distinct()
+            state_ids.update(state_id for state_id, in query)
+    state_ids.discard(None)
+    if state_ids:
+        UCRStateChange.record(config.table_id, state_ids)
@@ -4,17 +4,19 @@ from __future__ import unicode_literals
 from collections import namedtuple
 import csv342 as csv
 from datetime import date, datetime, timedelta
+from functools import partial
 import io
 import logging
 import os
+import uuid
 
-from celery import chain, group
+from celery import chain
 from celery.schedules import crontab
 from celery.task import periodic_task, task
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.management import call_command
-from django.db import Error, IntegrityError, connections, transaction
+from django.db import Error, IntegrityError, connections, router, transaction
 from django.db.models import F
 from io import BytesIO
 from couchexport.export import export_from_tables
@@ -40,6 +42,7 @@ from corehq.util.soft_assert import soft_assert
 from corehq.util.view_utils import reverse
 from custom.icds_reports.const import DASHBOARD_DOMAIN, CHILDREN_EXPORT, PREGNANT_WOMEN_EXPORT, \
     DEMOGRAPHICS_EXPORT, SYSTEM_USAGE_EXPORT, AWC_INFRASTRUCTURE_EXPORT, BENEFICIARY_LIST_EXPORT
+from custom.icds_reports.exceptions import AggregationStepsFailed
 from custom.icds_reports.models import (
     AggChildHealth,
     AggChildHealthMonthly,
@@ -54,8 +57,10 @@ from custom.icds_reports.models import (
     AggregateChildHealthPostnatalCareForms,
     AggregateChildHealthTHRForms,
     AggregateAwcInfrastructureForms,
+    AggregationStepRecord,
     ChildHealthMonthly,
     CcsRecordMonthly,
+    UCRStateChange,
     UcrTableNameMapping)
 from custom.icds_reports.models.aggregate import AggregateInactiveAWW
 from custom.icds_reports.models.helper import IcdsFile
@@ -66,6 +71,28 @@ from custom.icds_reports.sqldata.exports.children import ChildrenExport
 from custom.icds_reports.sqldata.exports.demographics import DemographicsExport
 from custom.icds_reports.sqldata.exports.pregnant_women import PregnantWomenExport
 from custom.icds_reports.sqldata.exports.system_usage import SystemUsageExport
+from custom.icds_reports.utils.aggregation import (
+    AwcInfrastructureAggregationHelper,
+    BirthPreparednessFormsAggregationHelper,
+    ComplementaryFormsAggregationHelper,
+    DailyFeedingFormsChildHealthAggregationHelper,
+    DeliveryFormsAggregationHelper,
+    GrowthMonitoringFormsAggregationHelper,
+    PostnatalCareFormsCcsRecordAggregationHelper,
+    PostnatalCareFormsChildHealthAggregationHelper,
+    THRFormsCcsRecordAggregationHelper,
+    THRFormsChildHealthAggregationHelper,
+)
+from custom.icds_reports.utils.aggregation_dag import (
+    AggregationDAG,
+    AggregationNode,
+    AggregationScheduler,
+    AggregationStep,
+    FAILED,
+    StepResult,
+    SUCCEEDED,
+    UNCHANGED,
+)
 from custom.icds_reports.utils import zip_folder, create_pdf_file, icds_pre_release_features, track_time, \
     create_excel_file
 from dimagi.utils.chunked import chunked
@@ -135,27 +162,52 @@ SQL_VIEWS_PATHS = [
 
 @periodic_task(run_every=crontab(minute=30, hour=23), acks_late=True, queue='icds_aggregation_queue')
 def run_move_ucr_data_into_aggregation_tables_task(date=None):
-    move_ucr_data_into_aggregation_tables.delay(date)
+    move_ucr_data_into_aggregation_tables.delay(date, incremental=True)
 
 
 @serial_task('move-ucr-data-into-aggregate-tables', timeout=30 * 60, queue='icds_aggregation_queue')
-def move_ucr_data_into_aggregation_tables(date=None, intervals=2):
-    date = date or datetime.utcnow().date()
-    monthly_dates = []
+def move_ucr_data_into_aggregation_tables(date=None, intervals=2, retry_run_id=None, incremental=False):
+    """
+    Run the steps in AGGREGATION_STEPS for the last ``intervals`` months,
+    starting each step as soon as the steps it depends on have finished.
+
+    The outcome of each step is saved as an AggregationStepRecord. Pass the
+    ``retry_run_id`` of a run that had failures to run only the steps of that
+    run that did not succeed.
+
+    With ``incremental``, per state steps in INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES
+    are skipped for states with no changes to their data source since the
+    step last succeeded for that month.
+    """
+    completed_nodes = []
+    if retry_run_id:
+        run_id = retry_run_id
+        records = list(AggregationStepRecord.objects.filter(run_id=run_id))
+        if not records:
+            raise ValueError("No aggregation steps were recorded for run '{}'".format(run_id))
+        date = records[0].aggregation_date
+        monthly_dates = sorted({record.month for record in records})
+        completed_nodes = [
+            AggregationNode(record.step, record.month, record.state_id)
+            for record in records if record.status in (SUCCEEDED, UNCHANGED)
+        ]
+    else:
+        run_id = uuid.uuid4().hex
+        date = date or datetime.utcnow().date()
+        monthly_dates = []
+        first_day_of_month = date.replace(day=1)
+        for interval in range(intervals - 1, 0, -1):
+            # calculate the last day of the previous months to send to the aggregation script
+            first_day_next_month = first_day_of_month - relativedelta(months=interval - 1)
+            monthly_dates.append(first_day_next_month - relativedelta(days=1))
+
+        monthly_dates.append(date)
 
     # probably this should be run one time, for now I leave this in aggregations script (not a big cost)
     # but remove issues when someone add new table to mapping, also we don't need to add new rows manually
     # on production servers
     _update_ucr_table_mapping()
 
-    first_day_of_month = date.replace(day=1)
-    for interval in range(intervals - 1, 0, -1):
-        # calculate the last day of the previous months to send to the aggregation script
-        first_day_next_month = first_day_of_month - relativedelta(months=interval - 1)
-        monthly_dates.append(first_day_next_month - relativedelta(days=1))
-
-    monthly_dates.append(date)
-
     db_alias = get_icds_ucr_db_alias()
     if db_alias:
         with connections[db_alias].cursor() as cursor:
@@ -166,71 +218,28 @@ def move_ucr_data_into_aggregation_tables(date=None, intervals=2):
                      .filter(domain=DASHBOARD_DOMAIN, location_type__name='state')
                      .values_list('location_id', flat=True))
 
-        for monthly_date in monthly_dates:
-            calculation_date = monthly_date.strftime('%Y-%m-%d')
-            stage_1_tasks = [
-                icds_state_aggregation_task.si(state_id=state_id, date=monthly_date, func=_aggregate_gm_forms)
-                for state_id in state_ids
-            ]
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(state_id=state_id, date=monthly_date, func=_aggregate_df_forms)
-                for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(state_id=state_id, date=monthly_date, func=_aggregate_cf_forms)
-                for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(state_id=state_id, date=monthly_date, func=_aggregate_child_health_thr_forms)
-                for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(state_id=state_id, date=monthly_date, func=_aggregate_ccs_record_thr_forms)
-                for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(
-                    state_id=state_id, date=monthly_date, func=_aggregate_child_health_pnc_forms
-                ) for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(
-                    state_id=state_id, date=monthly_date, func=_aggregate_ccs_record_pnc_forms
-                ) for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(
-                    state_id=state_id, date=monthly_date, func=_aggregate_delivery_forms
-                ) for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(
-                    state_id=state_id, date=monthly_date, func=_aggregate_bp_forms
-                ) for state_id in state_ids
-            ])
-            stage_1_tasks.extend([
-                icds_state_aggregation_task.si(state_id=state_id, date=monthly_date, func=_aggregate_awc_infra_forms)
-                for state_id in state_ids
-            ])
-            stage_1_tasks.append(icds_aggregation_task.si(date=calculation_date, func=_update_months_table))
-            res = group(*stage_1_tasks).apply_async()
-            res_daily = icds_aggregation_task.delay(date=calculation_date, func=_daily_attendance_table)
-            res.get()
-
-            res_child = chain(
-                icds_aggregation_task.si(date=calculation_date, func=_child_health_monthly_table),
-                icds_aggregation_task.si(date=calculation_date, func=_agg_child_health_table),
-            ).apply_async()
-            res_ccs = chain(
-                icds_aggregation_task.si(date=calculation_date, func=_ccs_record_monthly_table),
-                icds_aggregation_task.si(date=calculation_date, func=_agg_ccs_record_table),
-            ).apply_async()
-            res_daily.get()
-            res_ccs.get()
-            res_child.get()
-
-            res_awc = icds_aggregation_task.delay(date=calculation_date, func=_agg_awc_table)
-            res_awc.get()
+        dag = AggregationDAG(AGGREGATION_STEPS, monthly_dates, list(state_ids)).without(completed_nodes)
+        record_step = partial(_record_aggregation_step, run_id, date)
+        if incremental:
+            unchanged_nodes = _get_unchanged_aggregation_nodes(dag)
+            for node in unchanged_nodes:
+                record_step(node, StepResult(UNCHANGED, None, None))
+            dag = dag.without(unchanged_nodes)
+        results = AggregationScheduler(dag, _submit_aggregation_step, on_result=record_step).run()
+
+        failed_steps = sorted(
+            '{} {} {}'.format(node.step, node.month, node.state_id or '')
+            for node, result in results.items() if result.status == FAILED
+        )
+        if failed_steps:
+            message = (
+                "{} aggregation steps failed on {}, steps that depend on them were skipped. "
+                "Retry them with move_ucr_data_into_aggregation_tables.delay(retry_run_id='{}')\n{}".format(
+                    len(failed_steps), settings.SERVER_ENVIRONMENT, run_id, '\n'.join(failed_steps)
+                )
+            )
+            _dashboard_team_soft_assert(False, message)
+            raise AggregationStepsFailed(message)
 
         chain(
             icds_aggregation_task.si(date=date.strftime('%Y-%m-%d'), func=aggregate_awc_daily),
@@ -238,6 +247,81 @@ def move_ucr_data_into_aggregation_tables(date=None, intervals=2):
         ).delay()
 
 
+def _submit_aggregation_step(node):
+    func = AGGREGATION_STEPS_BY_NAME[node.step].func
+    if node.state_id:
+        return icds_state_aggregation_task.delay(state_id=node.state_id, date=node.month, func=func)
+    return icds_aggregation_task.delay(date=node.month.strftime('%Y-%m-%d'), func=func)
+
+
+def _get_unchanged_aggregation_nodes(dag):
+    """Return the nodes of incremental steps whose data source has not
+    changed for the node's state since the step last succeeded for the
+    node's month, and whose previous month is also unchanged.
+    """
+    incremental_nodes = [node for node in dag.nodes if node.step in INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES]
+    if not incremental_nodes:
+        return set()
+
+    # read from the primary, as a lagging replica could hide recent changes
+    last_succeeded = {}
+    records = (AggregationStepRecord.objects
+               .using(router.db_for_write(AggregationStepRecord))
+               .filter(step__in=set(node.step for node in incremental_nodes),
+                       month__gte=min(_month_start(node.month) for node in incremental_nodes),
+                       status=SUCCEEDED)
+               .values_list('step', 'month', 'state_id', 'started_on'))
+    for step, month, state_id, started_on in records:
+        key = (step, _month_start(month), state_id)
+        last_succeeded[key] = max(started_on, last_succeeded.get(key, started_on))
+
+    last_changed = {
+        (ucr_data_source_id, state_id): last_modified
+        for ucr_data_source_id, state_id, last_modified in UCRStateChange.objects.using(
+            router.db_for_write(UCRStateChange)
+        ).filter(
+            ucr_data_source_id__in=set(INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES.values())
+        ).values_list('ucr_data_source_id', 'state_id', 'last_modified')
+    }
+
+    unchanged = set()
+    for node in incremental_nodes:
+        succeeded_on = last_succeeded.get((node.step, _month_start(node.month), node.state_id))
+        changed_on = last_changed.get((INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES[node.step], node.state_id))
+        previous_month_nodes = [
+            dependency for dependency in dag.dependencies[node]
+            if dependency.step == node.step and dependency.state_id == node.state_id
+        ]
+        # states without a recorded change are always aggregated, as they
+        # may have changed before changes were recorded
+        if (
+            succeeded_on and changed_on
+            and changed_on < succeeded_on - UCR_CHANGE_SAFETY_MARGIN
+            and all(dependency in unchanged for dependency in previous_month_nodes)
+        ):
+            unchanged.add(node)
+    return unchanged
+
+
+def _month_start(day):
+    return force_to_date(day).replace(day=1)
+
+
+def _record_aggregation_step(run_id, aggregation_date, node, result):
+    AggregationStepRecord.objects.update_or_create(
+        run_id=run_id,
+        step=node.step,
+        month=node.month,
+        state_id=node.state_id,
+        defaults={
+            'aggregation_date': aggregation_date,
+            'status': result.status,
+            'started_on': result.started_on,
+            'duration': result.duration,
+        }
+    )
+
+
 def create_views(cursor):
     try:
         celery_task_logger.info("Starting icds reports create_sql_views")
@@ -472,6 +556,59 @@ def _agg_awc_table(day):
     ], day)
 
 
+AGGREGATION_STEPS = [
+    AggregationStep('update_months_table', _update_months_table, depends_on=[], per_state=False),
+    AggregationStep('daily_attendance', _daily_attendance_table, depends_on=[], per_state=False),
+    AggregationStep('gm_forms', _aggregate_gm_forms, depends_on=[], per_state=True),
+    AggregationStep('df_forms', _aggregate_df_forms, depends_on=[], per_state=True),
+    AggregationStep('cf_forms', _aggregate_cf_forms, depends_on=[], per_state=True),
+    AggregationStep('child_health_thr_forms', _aggregate_child_health_thr_forms, depends_on=[], per_state=True),
+    AggregationStep('ccs_record_thr_forms', _aggregate_ccs_record_thr_forms, depends_on=[], per_state=True),
+    AggregationStep('child_health_pnc_forms', _aggregate_child_health_pnc_forms, depends_on=[], per_state=True),
+    AggregationStep('ccs_record_pnc_forms', _aggregate_ccs_record_pnc_forms, depends_on=[], per_state=True),
+    AggregationStep('delivery_forms', _aggregate_delivery_forms, depends_on=[], per_state=True),
+    AggregationStep('bp_forms', _aggregate_bp_forms, depends_on=[], per_state=True),
+    AggregationStep('awc_infra_forms', _aggregate_awc_infra_forms, depends_on=[], per_state=True),
+    AggregationStep('child_health_monthly', _child_health_monthly_table, depends_on=[
+        'update_months_table', 'gm_forms', 'df_forms', 'cf_forms', 'child_health_thr_forms',
+        'child_health_pnc_forms',
+    ], per_state=False),
+    AggregationStep('agg_child_health', _agg_child_health_table, depends_on=[
+        'child_health_monthly',
+    ], per_state=False),
+    AggregationStep('ccs_record_monthly', _ccs_record_monthly_table, depends_on=[
+        'update_months_table', 'ccs_record_thr_forms', 'ccs_record_pnc_forms', 'delivery_forms', 'bp_forms',
+    ], per_state=False),
+    AggregationStep('agg_ccs_record', _agg_ccs_record_table, depends_on=[
+        'ccs_record_monthly',
+    ], per_state=False),
+    AggregationStep('agg_awc', _agg_awc_table, depends_on=[
+        'daily_attendance', 'awc_infra_forms', 'agg_child_health', 'agg_ccs_record',
+    ], per_state=False),
+]
+AGGREGATION_STEPS_BY_NAME = {step.name: step for step in AGGREGATION_STEPS}
+
+# Per state steps that only read from the data source's rows for their state
+# and their own table for the previous month, so they can be skipped when
+# none of those rows have changed. See UCRStateChange.
+INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES = {
+    'gm_forms': GrowthMonitoringFormsAggregationHelper.ucr_data_source_id,
+    'df_forms': DailyFeedingFormsChildHealthAggregationHelper.ucr_data_source_id,
+    'cf_forms': ComplementaryFormsAggregationHelper.ucr_data_source_id,
+    'child_health_thr_forms': THRFormsChildHealthAggregationHelper.ucr_data_source_id,
+    'ccs_record_thr_forms': THRFormsCcsRecordAggregationHelper.ucr_data_source_id,
+    'child_health_pnc_forms': PostnatalCareFormsChildHealthAggregationHelper.ucr_data_source_id,
+    'ccs_record_pnc_forms': PostnatalCareFormsCcsRecordAggregationHelper.ucr_data_source_id,
+    'delivery_forms': DeliveryFormsAggregationHelper.ucr_data_source_id,
+    'bp_forms': BirthPreparednessFormsAggregationHelper.ucr_data_source_id,
+    'awc_infra_forms': AwcInfrastructureAggregationHelper.ucr_data_source_id,
+}
+# changes are recorded just before they are written, by processes whose
+# clocks may differ from the one running the aggregation, and the recorded
+# time may be up to UCRStateChange.UPDATE_INTERVAL older than the change
+UCR_CHANGE_SAFETY_MARGIN = timedelta(minutes=15) + UCRStateChange.UPDATE_INTERVAL
+
+
 @task(queue='icds_aggregation_queue')
 def email_dashboad_team(aggregation_date):
     # temporary soft assert to verify it's completing
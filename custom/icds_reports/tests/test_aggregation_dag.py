@@ -0,0 +1,179 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from datetime import date, datetime, timedelta
+
+from django.test import SimpleTestCase, TestCase
+import six
+
+from custom.icds_reports.models import AggregationStepRecord, UCRStateChange
+from custom.icds_reports.tasks import (
+    AGGREGATION_STEPS,
+    INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES,
+    _get_unchanged_aggregation_nodes,
+    move_ucr_data_into_aggregation_tables,
+)
+from custom.icds_reports.utils.aggregation_dag import (
+    AggregationDAG,
+    AggregationNode,
+    AggregationScheduler,
+    AggregationStep,
+    FAILED,
+    SKIPPED,
+    SUCCEEDED,
+)
+
+APRIL = date(2017, 4, 30)
+MAY = date(2017, 5, 28)
+
+STEPS = [
+    AggregationStep('forms', None, depends_on=[], per_state=True),
+    AggregationStep('state_summary', None, depends_on=['forms'], per_state=True),
+    AggregationStep('monthly', None, depends_on=['forms'], per_state=False),
+    AggregationStep('agg', None, depends_on=['monthly'], per_state=False),
+]
+
+
+class FakeResult(object):
+
+    def __init__(self, failed):
+        self.failed = failed
+
+    def ready(self):
+        return True
+
+    def successful(self):
+        return not self.failed
+
+
+class AggregationDAGTest(SimpleTestCase):
+
+    def test_dependencies(self):
+        dag = AggregationDAG(STEPS, [APRIL, MAY], ['st1', 'st2'])
+        self.assertEqual(len(dag.nodes), 12)
+        self.assertEqual(dag.dependencies[AggregationNode('forms', APRIL, 'st1')], set())
+        self.assertEqual(dag.dependencies[AggregationNode('state_summary', APRIL, 'st1')], {
+            AggregationNode('forms', APRIL, 'st1'),
+        })
+        self.assertEqual(dag.dependencies[AggregationNode('monthly', APRIL, None)], {
+            AggregationNode('forms', APRIL, 'st1'),
+            AggregationNode('forms', APRIL, 'st2'),
+        })
+        self.assertEqual(dag.dependencies[AggregationNode('agg', MAY, None)], {
+            AggregationNode('monthly', MAY, None),
+            AggregationNode('agg', APRIL, None),
+        })
+
+    def test_without(self):
+        dag = AggregationDAG(STEPS, [APRIL], ['st1', 'st2']).without([
+            AggregationNode('forms', APRIL, 'st1'),
+        ])
+        self.assertNotIn(AggregationNode('forms', APRIL, 'st1'), dag.nodes)
+        self.assertEqual(dag.dependencies[AggregationNode('monthly', APRIL, None)], {
+            AggregationNode('forms', APRIL, 'st2'),
+        })
+
+
+class AggregationSchedulerTest(SimpleTestCase):
+
+    def test_run(self):
+        dag = AggregationDAG(STEPS, [APRIL], ['st1', 'st2'])
+        submitted = []
+
+        def submit(node):
+            for dependency in dag.dependencies[node]:
+                self.assertIn(dependency, submitted)
+            submitted.append(node)
+            return FakeResult(failed=False)
+
+        results = AggregationScheduler(dag, submit).run()
+        self.assertEqual(set(submitted), set(dag.nodes))
+        self.assertEqual({result.status for result in results.values()}, {SUCCEEDED})
+
+    def test_failure_skips_dependent_steps(self):
+        dag = AggregationDAG(STEPS, [APRIL], ['st1', 'st2'])
+        failed_node = AggregationNode('forms', APRIL, 'st2')
+        recorded = {}
+
+        def record(node, result):
+            recorded[node] = result.status
+
+        results = AggregationScheduler(
+            dag, lambda node: FakeResult(failed=node == failed_node), on_result=record
+        ).run()
+        self.assertEqual(recorded, {node: result.status for node, result in results.items()})
+        self.assertEqual(recorded, {
+            AggregationNode('forms', APRIL, 'st1'): SUCCEEDED,
+            AggregationNode('forms', APRIL, 'st2'): FAILED,
+            AggregationNode('state_summary', APRIL, 'st1'): SUCCEEDED,
+            AggregationNode('state_summary', APRIL, 'st2'): SKIPPED,
+            AggregationNode('monthly', APRIL, None): SKIPPED,
+            AggregationNode('agg', APRIL, None): SKIPPED,
+        })
+
+
+class IncrementalAggregationTest(TestCase):
+
+    def tearDown(self):
+        AggregationStepRecord.objects.all().delete()
+        UCRStateChange.objects.all().delete()
+        super(IncrementalAggregationTest, self).tearDown()
+
+    def test_unchanged_nodes(self):
+        last_run = datetime(2017, 5, 28, 23, 30)
+        for month in [APRIL, date(2017, 5, 27)]:
+            for state_id in ['st1', 'st2']:
+                AggregationStepRecord.objects.create(
+                    run_id='previous', aggregation_date=month, step='gm_forms', month=month,
+                    state_id=state_id, status=SUCCEEDED, started_on=last_run, duration=1,
+                )
+        ucr_data_source_id = INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES['gm_forms']
+        UCRStateChange.objects.create(
+            ucr_data_source_id=ucr_data_source_id, state_id='st1', last_modified=last_run - timedelta(days=1)
+        )
+        UCRStateChange.objects.create(
+            ucr_data_source_id=ucr_data_source_id, state_id='st2', last_modified=last_run + timedelta(hours=1)
+        )
+
+        dag = AggregationDAG(AGGREGATION_STEPS, [APRIL, MAY], ['st1', 'st2', 'st3'])
+        self.assertEqual(_get_unchanged_aggregation_nodes(dag), {
+            AggregationNode('gm_forms', APRIL, 'st1'),
+            AggregationNode('gm_forms', MAY, 'st1'),
+        })
+
+    def test_changed_previous_month(self):
+        last_run = datetime(2017, 5, 28, 23, 30)
+        AggregationStepRecord.objects.create(
+            run_id='previous', aggregation_date=MAY, step='gm_forms', month=MAY,
+            state_id='st1', status=SUCCEEDED, started_on=last_run, duration=1,
+        )
+        UCRStateChange.objects.create(
+            ucr_data_source_id=INCREMENTAL_AGGREGATION_UCR_DATA_SOURCES['gm_forms'],
+            state_id='st1',
+            last_modified=last_run - timedelta(days=1),
+        )
+
+        # April has never been aggregated, so May has to be aggregated again
+        dag = AggregationDAG(AGGREGATION_STEPS, [APRIL, MAY], ['st1'])
+        self.assertEqual(_get_unchanged_aggregation_nodes(dag), set())
+
+    def test_record_state_changes(self):
+        UCRStateChange.record('static-dashboard_thr_forms', ['st1'])
+        first_change = UCRStateChange.objects.get(state_id='st1').last_modified
+        UCRStateChange.record('static-dashboard_thr_forms', ['st1', 'st2'])
+        changes = dict(UCRStateChange.objects.values_list('state_id', 'last_modified'))
+        self.assertEqual(set(changes), {'st1', 'st2'})
+        # recorded too recently to be updated again
+        self.assertEqual(changes['st1'], first_change)
+
+    def test_record_old_state_change(self):
+        old_change = datetime.utcnow() - UCRStateChange.UPDATE_INTERVAL - timedelta(minutes=1)
+        UCRStateChange.objects.create(
+            ucr_data_source_id='static-dashboard_thr_forms', state_id='st1', last_modified=old_change
+        )
+        UCRStateChange.record('static-dashboard_thr_forms', ['st1'])
+        self.assertGreater(UCRStateChange.objects.get(state_id='st1').last_modified, old_change)
+
+    def test_retry_unknown_run(self):
+        with self.assertRaises(ValueError) as context:
+            move_ucr_data_into_aggregation_tables(retry_run_id='unknown')
+        self.assertIn('unknown', six.text_type(context.exception))
@@ -0,0 +1,139 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from collections import namedtuple, OrderedDict
+from datetime import datetime
+import time
+
+# A step of the dashboard aggregation.
+#   name: unique name of the step
+#   func: the aggregation function, called with the month, and the state for
+#       per state steps
+#   depends_on: names of the steps that have to succeed before this one starts
+#   per_state: whether the step runs separately for each state. Per state steps
+#       only wait for the same state of the per state steps they depend on.
+AggregationStep = namedtuple('AggregationStep', ['name', 'func', 'depends_on', 'per_state'])
+
+# A single run of a step for a month, and a state for per state steps
+AggregationNode = namedtuple('AggregationNode', ['step', 'month', 'state_id'])
+
+StepResult = namedtuple('StepResult', ['status', 'started_on', 'duration'])
+
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+# not run because nothing it depends on has changed since it last succeeded
+UNCHANGED = 'unchanged'
+
+
+class AggregationDAG(object):
+    """The aggregation steps for a set of months and states and the
+    dependencies between them.
+
+    Each month is aggregated after the previous one, as most tables are built
+    from the same table for the previous month, but only the same step for
+    the previous month (and the same state) has to have finished.
+    """
+
+    def __init__(self, steps, months, state_ids):
+        self.steps = OrderedDict((step.name, step) for step in steps)
+        self.dependencies = OrderedDict()
+        for month_index, month in enumerate(months):
+            for step in self.steps.values():
+                for node in self._nodes_for_step(step, month, state_ids):
+                    dependencies = set()
+                    for dependency_name in step.depends_on:
+                        dependencies.update(self._get_dependency_nodes(
+                            node, self.steps[dependency_name], state_ids
+                        ))
+                    if month_index:
+                        dependencies.add(node._replace(month=months[month_index - 1]))
+                    self.dependencies[node] = dependencies
+
+    @staticmethod
+    def _nodes_for_step(step, month, state_ids):
+        if step.per_state:
+            return [AggregationNode(step.name, month, state_id) for state_id in state_ids]
+        return [AggregationNode(step.name, month, None)]
+
+    def _get_dependency_nodes(self, node, dependency, state_ids):
+        if dependency.per_state and node.state_id:
+            return [AggregationNode(dependency.name, node.month, node.state_id)]
+        return self._nodes_for_step(dependency, node.month, state_ids)
+
+    @property
+    def nodes(self):
+        return list(self.dependencies)
+
+    def without(self, nodes):
+        """Return a copy of the graph with ``nodes`` removed. Dependencies on
+        removed nodes are treated as already met, which is used to run only
+        the steps that did not succeed in a previous run.
+        """
+        nodes = set(nodes)
+        dag = AggregationDAG([], [], [])
+        dag.steps = self.steps
+        for node, dependencies in self.dependencies.items():
+            if node not in nodes:
+                dag.dependencies[node] = dependencies - nodes
+        return dag
+
+
+class AggregationScheduler(object):
+    """Run the nodes of an AggregationDAG, each one as soon as all of its
+    dependencies have succeeded.
+
+    :param submit: function that starts a node and returns a celery
+    ``AsyncResult`` for it
+    :param on_result: optional function called with each node and its
+    ``StepResult`` once it is known
+    """
+    poll_interval = 5
+
+    def __init__(self, dag, submit, on_result=None):
+        self.dag = dag
+        self.submit = submit
+        self.on_result = on_result
+
+    def run(self):
+        """Run the graph and return a dict of ``StepResult`` by node.
+
+        Nodes that depend on a failed node are not run and are reported as
+        skipped.
+        """
+        results = {}
+        waiting = OrderedDict((node, set(dependencies)) for node, dependencies in self.dag.dependencies.items())
+        running = {}
+        while waiting or running:
+            changed = True
+            while changed:
+                changed = False
+                for node, dependencies in list(waiting.items()):
+                    statuses = [results[dependency].status for dependency in dependencies if dependency in results]
+                    if any(status != SUCCEEDED for status in statuses):
+                        del waiting[node]
+                        self._set_result(results, node, StepResult(SKIPPED, None, None))
+                        changed = True
+                    elif len(statuses) == len(dependencies):
+                        del waiting[node]
+                        running[node] = (self.submit(node), datetime.utcnow(), time.time())
+
+            if waiting and not running:
+                raise ValueError("Aggregation steps depend on steps that are not in the graph: {}".format(
+                    ', '.join(sorted(set(node.step for node in waiting)))
+                ))
+
+            finished = [node for node, (async_result, _, _) in running.items() if async_result.ready()]
+            for node in finished:
+                async_result, started_on, start = running.pop(node)
+                status = SUCCEEDED if async_result.successful() else FAILED
+                self._set_result(results, node, StepResult(status, started_on, time.time() - start))
+
+            if running and not finished:
+                time.sleep(self.poll_interval)
+        return results
+
+    def _set_result(self, results, node, result):
+        results[node] = result
+        if self.on_result:
+            self.on_result(node, result)
@@ -577,6 +577,14 @@ HQ_ACCOUNT_ROOT = "commcarehq.org"
 XFORMS_PLAYER_URL = "http://localhost:4444/"  # touchform's setting
 FORMPLAYER_URL = 'http://localhost:8080'
 
+# maximum number of forms sent to formplayer for validation at once when
+# building an app
+APP_BUILD_MAX_CONCURRENT_VALIDATIONS = 4
+
+# maximum number of form attachments downloaded at once when building a
+# multimedia zip export
+MULTIMEDIA_ZIP_MAX_CONCURRENT_DOWNLOADS = 4
+
 ####### SMS Queue Settings #######
 
 CUSTOM_PROJECT_SMS_QUEUES = {
@@ -611,6 +619,13 @@ SMS_QUEUE_DOMAIN_RESTRICTED_RETRY_INTERVAL = 15
 # messages will not be processed.
 SMS_QUEUE_STALE_MESSAGE_DURATION = 7 * 24
 
+# The maximum number of queued SMS that run_sms_queue hands to a single
+# process_sms_batch task. Set to 1 to process each SMS in its own task.
+SMS_QUEUE_BATCH_SIZE = 50
+
+# The maximum number of SMS a process_sms_batch task sends at the same time
+SMS_QUEUE_MAX_CONCURRENT_SENDS = 4
+
 
 ####### Reminders Queue Settings #######
 
@@ -796,6 +811,22 @@ PL_PROXY_CLUSTER_NAME = 'commcarehq'
 
 USE_PARTITIONED_DATABASE = False
 
+# maximum number of concurrent requests to each repeater's endpoint when
+# repeat records are sent in batches
+REPEATER_MAX_CONCURRENT_REQUESTS = 4
+
+# claim due repeat records from the SQL queue instead of the couch view.
+# Run the populate_sql_repeat_records management command before setting this.
+REPEAT_RECORDS_SQL_QUEUE = False
+
+# submit each chunk of cases from the case importer in a background thread
+# while the next chunk is read
+CASE_IMPORTER_BACKGROUND_SUBMISSION = True
+
+# maximum number of partitioned databases queried concurrently
+# (see corehq.sql_db.util.fan_out_across_databases)
+PARTITIONED_QUERY_MAX_WORKERS = 8
+
 # number of days since last access after which a saved export is considered unused
 SAVED_EXPORT_ACCESS_CUTOFF = 35
 
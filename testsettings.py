@@ -52,6 +52,13 @@ if "SKIP_TESTS_REQUIRING_EXTRA_SETUP" not in globals():
     SKIP_TESTS_REQUIRING_EXTRA_SETUP = False
 
 CELERY_ALWAYS_EAGER = True
+# data saved by a test is not visible to connections opened by worker threads
+PARTITIONED_QUERY_MAX_WORKERS = 1
+REPEATER_MAX_CONCURRENT_REQUESTS = 1
+SMS_QUEUE_MAX_CONCURRENT_SENDS = 1
+APP_BUILD_MAX_CONCURRENT_VALIDATIONS = 1
+MULTIMEDIA_ZIP_MAX_CONCURRENT_DOWNLOADS = 1
+CASE_IMPORTER_BACKGROUND_SUBMISSION = False
 # keep a copy of the original PILLOWTOPS setting around in case other tests want it.
 _PILLOWTOPS = PILLOWTOPS
 PILLOWTOPS = {}